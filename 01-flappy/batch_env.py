@@ -0,0 +1,131 @@
+import numpy as np
+
+from flappy_bird import Bird, GROUND_Y, LIFT, get_mask, image, rotated_bird
+
+
+class FlappyBatchEnv:
+    """The whole flock as NumPy arrays.
+
+    Every bird gets the exact same update as Bird.move / Bird.jump, just for
+    the whole population at once. Pipes stay normal Pipe objects (there are
+    only ever 2-3 of them), and birds are tested against their rects in one
+    go. Only birds whose box touches a pipe get the pixel test.
+
+    The arrays only hold living birds; `ids` maps each row back to its
+    index in the population, and kill() drops rows.
+    """
+
+    def __init__(self, n, x=230, y=350):
+        self.x = x
+        self.img = image("bird")
+        self.width, self.height_px = self.img.get_size()
+
+        self.ids = np.arange(n)
+        self.y = np.full(n, float(y))
+        self.vel = np.zeros(n)
+        self.tilt = np.zeros(n)
+        self.tick_count = np.zeros(n, dtype=np.int64)
+        self.height = self.y.copy()  # y at the last jump
+
+        # Same rect as Bird: x never changes, only the top edge does
+        self.rect_x = self.img.get_rect(center=(x, y)).x
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_state(self, row):
+        """Bird.get_state() of one bird."""
+        return {
+            "x": self.x,
+            "y": float(self.y[row]),
+            "vel": float(self.vel[row]),
+            "tilt": float(self.tilt[row]),
+            "tick_count": int(self.tick_count[row]),
+            "height": float(self.height[row]),
+        }
+
+    def set_state(self, state):
+        """Puts every bird in the same Bird.get_state() state. They all fly
+        at self.x, so the state's x is ignored."""
+        self.y[:] = state["y"]
+        self.vel[:] = state["vel"]
+        self.tilt[:] = state["tilt"]
+        self.tick_count[:] = state["tick_count"]
+        self.height[:] = state["height"]
+
+    def jump(self, mask):
+        self.vel[mask] = LIFT
+        self.tick_count[mask] = 0
+        self.height[mask] = self.y[mask]
+
+    def move(self):
+        self.tick_count += 1
+
+        t = self.tick_count
+        d = self.vel * t + 1.5 * t**2
+        np.minimum(d, 16, out=d)
+        climbing = d < 0
+        d[climbing] -= 2
+
+        self.y += d
+
+        tilt = self.tilt
+        up = climbing | (self.y < self.height + 50)
+        tilt[up] = np.maximum(tilt[up], Bird.MAX_ROTATION)
+        tilt[~up & (tilt > -35)] -= Bird.ROT_VEL
+
+    def rect_y(self):
+        # rect.center = (x, int(y))
+        return np.trunc(self.y).astype(np.int64) - self.height_px // 2
+
+    def collide(self, pipe):
+        """Bool array of which birds hit this pipe, or None if none can."""
+        left = self.rect_x
+        right = self.rect_x + self.width
+        # Every bird shares the same x, so this is one check for the flock.
+        # Both pipe halves share their x too.
+        if not (left < pipe.top_rect.right and pipe.top_rect.left < right):
+            return None
+
+        hits = np.zeros(len(self), dtype=bool)
+        top = self.rect_y()
+        bottom = top + self.height_px
+        bird_mask = get_mask(self.img)
+
+        for rect, img in (
+            (pipe.top_rect, pipe.top_img),
+            (pipe.bottom_rect, pipe.bottom_img),
+        ):
+            near = ~hits & (top < rect.bottom) & (rect.top < bottom)
+            for i in np.flatnonzero(near):
+                offset = (rect.x - left, rect.y - int(top[i]))
+                if bird_mask.overlap(get_mask(img), offset):
+                    hits[i] = True
+
+        return hits
+
+    def out_of_bounds(self):
+        return (self.y + self.height_px >= GROUND_Y) | (self.y < 0)
+
+    def kill(self, dead):
+        keep = ~dead
+        self.ids = self.ids[keep]
+        self.y = self.y[keep]
+        self.vel = self.vel[keep]
+        self.tilt = self.tilt[keep]
+        self.tick_count = self.tick_count[keep]
+        self.height = self.height[keep]
+
+    def sprites(self, rows=None):
+        """(image, position) of every bird in `rows` (all by default), ready
+        for Surface.blits()."""
+        if rows is None:
+            rows = slice(None)
+        out = []
+        for y, tilt in zip(self.y[rows], self.tilt[rows]):
+            rotated = rotated_bird(tilt)
+            out.append((rotated, rotated.get_rect(center=(self.x, int(y))).topleft))
+        return out
+
+    def draw(self, win):
+        win.blits(self.sprites(), doreturn=False)
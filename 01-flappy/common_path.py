@@ -0,0 +1,10 @@
+"""Import this before anything from the common package: puts the repo root
+(the folder above this game's) on sys.path, whatever directory the game
+is started from."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
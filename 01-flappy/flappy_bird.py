@@ -1,6 +1,8 @@
 import pygame
 import random
 import os
+import argparse
+import functools
 
 
 # ---- Config
@@ -11,23 +13,71 @@ PIPE_VEL = 5
 GRAVITY = 0.15
 LIFT = -7.2
 
-pygame.init()
-pygame.font.init()
-FONT = pygame.font.SysFont("comicsans", 50)
-
 # ---- Paths
 BASE_DIR = os.path.dirname(__file__)
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 
-# ---- Load assets
-BIRD_IMG = pygame.image.load(os.path.join(ASSETS_DIR, "fatBird.png"))
-PIPE_TOP_IMG = pygame.image.load(os.path.join(ASSETS_DIR, "full pipe top.png"))
-PIPE_BOTTOM_IMG = pygame.image.load(os.path.join(ASSETS_DIR, "full pipe bottom.png"))
+# ---- Assets: file and size (None = as is) of every image
+# Nothing is loaded on import. image() and font() load on first use, so the
+# physics can be imported (by the trainer's workers, say) without a display.
+IMAGES = {
+    "bird": ("fatBird.png", None),
+    "pipe_top": ("full pipe top.png", None),
+    "pipe_bottom": ("full pipe bottom.png", None),
+    # Scaled to fit the window exactly
+    "background": ("background.png", (WIN_WIDTH, WIN_HEIGHT)),
+}
+
+
+@functools.cache
+def image(name):
+    file, size = IMAGES[name]
+    img = pygame.image.load(os.path.join(ASSETS_DIR, file))
+    return pygame.transform.scale(img, size) if size else img
+
+
+@functools.cache
+def font():
+    pygame.font.init()
+    return pygame.font.SysFont("comicsans", 50)
+
+
+# ---- Drawing
+# Images in the window's pixel format, so blits don't convert every pixel on
+# every frame. Made on the first draw (there's no window before that); the
+# physics and the masks keep using the loaded images.
+CONVERTED = {}
+
+
+def converted(surface):
+    if pygame.display.get_surface() is None:
+        return surface  # drawing offscreen, there's no format to convert to
+    img = CONVERTED.get(surface)
+    if img is None:
+        if surface.get_flags() & pygame.SRCALPHA:
+            img = surface.convert_alpha()
+        else:
+            img = surface.convert()
+        CONVERTED[surface] = img
+    return img
+
+
+@functools.lru_cache(maxsize=64)
+def text(font, string, color):
+    """font.render() that only renders again when the string changes."""
+    return font.render(string, True, color)
 
-# Load bg
-bg_raw = pygame.image.load(os.path.join(ASSETS_DIR, "background.png"))
-# Scale it to fit the window exactly
-BG_IMG = pygame.transform.scale(bg_raw, (WIN_WIDTH, WIN_HEIGHT))
+
+# ---- Collision masks
+# The sprites never change, so every mask is built once and reused.
+MASKS = {}
+
+
+def get_mask(surface):
+    mask = MASKS.get(surface)
+    if mask is None:
+        mask = MASKS[surface] = pygame.mask.from_surface(surface)
+    return mask
 
 
 class Bird:
@@ -41,7 +91,7 @@ class Bird:
         self.tilt = 0
         self.tick_count = 0
         self.height = self.y
-        self.img = BIRD_IMG
+        self.img = image("bird")
         self.rect = self.img.get_rect(center=(self.x, self.y))
 
     def jump(self):
@@ -69,13 +119,60 @@ class Bird:
 
         self.rect.center = (self.x, int(self.y))
 
+    def get_state(self):
+        return {
+            "x": self.x,
+            "y": self.y,
+            "vel": self.vel,
+            "tilt": self.tilt,
+            "tick_count": self.tick_count,
+            "height": self.height,
+        }
+
+    def set_state(self, state):
+        self.x = state["x"]
+        self.y = state["y"]
+        self.vel = state["vel"]
+        self.tilt = state["tilt"]
+        self.tick_count = state["tick_count"]
+        self.height = state["height"]
+        self.rect.center = (self.x, int(self.y))
+
+    def sprite(self):
+        """The image to draw and where, ready for Surface.blits()."""
+        rotated = rotated_bird(self.tilt)
+        return rotated, rotated.get_rect(center=self.rect.center).topleft
+
     def draw(self, win):
-        rotated = pygame.transform.rotate(self.img, self.tilt)
-        rect = rotated.get_rect(center=self.rect.center)
-        win.blit(rotated, rect.topleft)
+        win.blit(*self.sprite())
 
     def get_mask(self):
-        return pygame.mask.from_surface(self.img)
+        # Collision uses the upright sprite, tilt is only for looks
+        return get_mask(self.img)
+
+
+# Lowest tilt a falling bird gets to: ROT_VEL steps from 0 stop below -35
+MIN_TILT = -45
+
+
+@functools.cache
+def rotation_atlas(img):
+    """`img` at every whole degree of tilt a bird can have, rotated once. Keyed
+    on the image: drawn before there's a window, the bird is the loaded image,
+    after that the converted one (see converted()), with an atlas each."""
+    return {
+        tilt: pygame.transform.rotate(img, tilt)
+        for tilt in range(MIN_TILT, Bird.MAX_ROTATION + 1)
+    }
+
+
+def rotated_bird(tilt):
+    img = converted(image("bird"))
+    atlas = rotation_atlas(img)
+    rotated = atlas.get(tilt)
+    if rotated is None:  # a tilt from outside the range, a restored state say
+        rotated = atlas[tilt] = pygame.transform.rotate(img, tilt)
+    return rotated
 
 
 class Pipe:
@@ -84,24 +181,33 @@ class Pipe:
     MOVING_Y = False
     PULSING_GAP = False
 
-    def __init__(self, x):
+    def __init__(self, x, rng=random, height=None):
         self.x = x
         self.height = 0
+        self.rng = rng  # any random.Random, or the module itself
 
         self.GAP = Pipe.GAP
         self.VEL = Pipe.VEL
 
         self.y_dir = 1
         self.gap_dir = 1
-        self.top_img = PIPE_TOP_IMG
-        self.bottom_img = PIPE_BOTTOM_IMG
+        self.top_img = image("pipe_top")
+        self.bottom_img = image("pipe_bottom")
         self.top_rect = self.top_img.get_rect()
         self.bottom_rect = self.bottom_img.get_rect()
         self.passed = False
-        self.set_height()
+        if height is None:
+            self.set_height()
+        else:  # from a course the trainer rolled ahead
+            self.height = height
+            self.update_rects()
+
+    @staticmethod
+    def roll_height(rng):
+        return rng.randrange(50, 400)
 
     def set_height(self):
-        self.height = random.randrange(50, 400)
+        self.height = self.roll_height(self.rng)
         self.update_rects()
 
     def update_rects(self):
@@ -130,79 +236,134 @@ class Pipe:
 
         self.update_rects()
 
+    def get_state(self):
+        # The difficulty flags are class-wide, they aren't part of a pipe
+        return {
+            "x": self.x,
+            "height": self.height,
+            "GAP": self.GAP,
+            "VEL": self.VEL,
+            "y_dir": self.y_dir,
+            "gap_dir": self.gap_dir,
+            "passed": self.passed,
+        }
+
+    def set_state(self, state):
+        self.x = state["x"]
+        self.height = state["height"]
+        self.GAP = state["GAP"]
+        self.VEL = state["VEL"]
+        self.y_dir = state["y_dir"]
+        self.gap_dir = state["gap_dir"]
+        self.passed = state["passed"]
+        self.update_rects()
+
     def draw(self, win):
-        win.blit(self.top_img, self.top_rect)
-        win.blit(self.bottom_img, self.bottom_rect)
+        win.blit(converted(self.top_img), self.top_rect)
+        win.blit(converted(self.bottom_img), self.bottom_rect)
 
     def collide(self, bird):
+        # Cheap rect test first, pixels only when the boxes actually touch
+        hit_top = bird.rect.colliderect(self.top_rect)
+        hit_bottom = bird.rect.colliderect(self.bottom_rect)
+        if not (hit_top or hit_bottom):
+            return False
+
         bird_mask = bird.get_mask()
-        top_mask = pygame.mask.from_surface(self.top_img)
-        bottom_mask = pygame.mask.from_surface(self.bottom_img)
 
-        top_offset = (self.top_rect.x - bird.rect.x, self.top_rect.y - bird.rect.y)
-        bottom_offset = (
-            self.bottom_rect.x - bird.rect.x,
-            self.bottom_rect.y - bird.rect.y,
-        )
+        if hit_top:
+            top_offset = (self.top_rect.x - bird.rect.x, self.top_rect.y - bird.rect.y)
+            if bird_mask.overlap(get_mask(self.top_img), top_offset):
+                return True
 
-        return bird_mask.overlap(top_mask, top_offset) or bird_mask.overlap(
-            bottom_mask, bottom_offset
-        )
+        if hit_bottom:
+            bottom_offset = (
+                self.bottom_rect.x - bird.rect.x,
+                self.bottom_rect.y - bird.rect.y,
+            )
+            if bird_mask.overlap(get_mask(self.bottom_img), bottom_offset):
+                return True
+
+        return False
 
 
 def draw_window(win, bird, pipes, score):
-    win.blit(BG_IMG, (0, 0))
+    win.blit(converted(image("background")), (0, 0))
     for pipe in pipes:
         pipe.draw(win)
     bird.draw(win)
     pygame.draw.rect(win, (200, 200, 200), (0, GROUND_Y, WIN_WIDTH, 70))
-    text = FONT.render(f"Score: {score}", True, (255, 255, 255))
-    win.blit(text, (WIN_WIDTH - 10 - text.get_width(), 10))
-    pygame.display.update()
-
-
-# --- HUMAN GAME LOOP  ---
-def main():
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-    pygame.display.set_caption("Flappy Bird (Pro Mode)")
-    clock = pygame.time.Clock()
-
-    # Reset Difficulty
-    Pipe.VEL = 5
-    Pipe.MOVING_Y = False
-    Pipe.PULSING_GAP = False
-
-    bird = Bird(230, 350)
-    pipes = [Pipe(600)]
-    score = 0
-
-    run = True
-    while run:
-        clock.tick(30)
-
+    label = text(font(), f"Score: {score}", (255, 255, 255))
+    win.blit(label, (WIN_WIDTH - 10 - label.get_width(), 10))
+
+
+# ---- Snapshots
+def world_state(pipes, score, rng, bird):
+    """Snapshot of the world, with `bird` (a Bird state) as the player."""
+    return {
+        "pipes": [pipe.get_state() for pipe in pipes],
+        "score": score,
+        "difficulty": (Pipe.VEL, Pipe.GAP, Pipe.MOVING_Y, Pipe.PULSING_GAP),
+        "rng": rng.getstate(),
+        "bird": bird,
+    }
+
+
+def restore_world(snapshot, rng):
+    """Pipes and score of a world_state() snapshot. The difficulty and `rng`
+    go back to where they were too."""
+    Pipe.VEL, Pipe.GAP, Pipe.MOVING_Y, Pipe.PULSING_GAP = snapshot["difficulty"]
+    pipes = []
+    for state in snapshot["pipes"]:
+        pipe = Pipe(0, rng)
+        pipe.set_state(state)
+        pipes.append(pipe)
+    # After the Pipe() calls, which draw from it
+    rng.setstate(snapshot["rng"])
+    return pipes, snapshot["score"]
+
+
+class Episode:
+    """One game of main(), a frame per step(): the difficulty ramp, the flap,
+    the bird, then the pipes. main() plays it from the keyboard and replay.py
+    from an episode log."""
+
+    FPS = 30
+
+    def __init__(self, seed=None):
+        # Reset Difficulty
+        Pipe.VEL = 5
+        Pipe.GAP = 200
+        Pipe.MOVING_Y = False
+        Pipe.PULSING_GAP = False
+
+        self.rng = random.Random(seed)
+        self.bird = Bird(230, 350)
+        self.pipes = [Pipe(600, self.rng)]
+        self.score = 0
+
+    def step(self, flap):
+        """One frame, with a flap first if `flap`. False once the bird crashed."""
         # --- DIFFICULTY CONTROLLER ---
-        if score > 0 and score % 15 == 0:
-            Pipe.VEL = min(10, 5 + (score // 15))
-        if score > 50:
+        if self.score > 0 and self.score % 15 == 0:
+            Pipe.VEL = min(10, 5 + (self.score // 15))
+        if self.score > 50:
             Pipe.MOVING_Y = True
-        if score > 200:
+        if self.score > 200:
             Pipe.PULSING_GAP = True
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    bird.jump()
-
+        bird = self.bird
+        if flap:
+            bird.jump()
         bird.move()
 
+        alive = True
         add_pipe = False
         rem = []
-        for pipe in pipes:
+        for pipe in self.pipes:
             pipe.move()
             if pipe.collide(bird):
-                run = False
+                alive = False
 
             if pipe.x + pipe.top_rect.width < 0:
                 rem.append(pipe)
@@ -212,19 +373,85 @@ def main():
                 add_pipe = True
 
         if add_pipe:
-            score += 1
-            pipes.append(Pipe(600))
+            self.score += 1
+            self.pipes.append(Pipe(600, self.rng))
 
         for r in rem:
-            pipes.remove(r)
+            self.pipes.remove(r)
 
         if bird.rect.bottom >= GROUND_Y or bird.rect.top <= 0:
+            alive = False
+        return alive
+
+    def get_state(self):
+        return world_state(self.pipes, self.score, self.rng, self.bird.get_state())
+
+    def set_state(self, state):
+        self.pipes, self.score = restore_world(state, self.rng)
+        self.bird.set_state(state["bird"])
+
+    def draw(self, win):
+        draw_window(win, self.bird, self.pipes, self.score)
+
+
+# --- HUMAN GAME LOOP  ---
+def main(seed=None, action_repeat=1, record=None):
+    pygame.init()
+    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
+    pygame.display.set_caption("Flappy Bird (Pro Mode)")
+    clock = pygame.time.Clock()
+
+    if seed is None and record:
+        seed = random.randrange(2**32)  # a log needs to know the course
+    episode = Episode(seed)
+    flaps = []  # every frame's flap, for the log
+    flap = False  # a press waiting for the next frame that reads the keys
+
+    run = True
+    while run:
+        clock.tick(Episode.FPS)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    flap = True
+
+        # Like the trainer's --action-repeat: keys only count every Kth frame
+        jump = flap and len(flaps) % action_repeat == 0
+        if jump:
+            flap = False
+        flaps.append(jump)
+
+        if not episode.step(jump):
             run = False
 
-        draw_window(win, bird, pipes, score)
+        episode.draw(win)
+        pygame.display.update()
 
     pygame.quit()
+    if record:
+        # Only needed here, the game itself doesn't need NumPy
+        import common_path  # noqa: F401
+        from common.episode_log import EpisodeLog
+
+        EpisodeLog("flappy", "human", seed, flaps, 1, score=episode.score).save(record)
+        print(f"Recorded {len(flaps)} frames to {record}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Play Flappy Bird")
+    parser.add_argument("--seed", type=int, help="pipe course seed")
+    parser.add_argument(
+        "--action-repeat",
+        type=int,
+        default=1,
+        metavar="K",
+        help="only act on the keys every Kth frame",
+    )
+    parser.add_argument(
+        "--record", metavar="PATH", help="save the game as an episode log (replay.py)"
+    )
+    args = parser.parse_args()
+    main(args.seed, max(1, args.action_repeat), args.record)
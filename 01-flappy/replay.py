@@ -0,0 +1,17 @@
+"""Plays an episode log back without the network: a game of flappy_bird.py
+(--record) or a champion of train_neat.py (--record, --record-winner).
+See common/episode_log.py for the options.
+
+    python replay.py winner.eplog --speed 8
+"""
+
+import flappy_bird
+import common_path  # noqa: F401
+import train_neat
+from common.episode_log import main
+
+# The rules a log was played by, and the Episode that plays them again
+EPISODES = {"human": flappy_bird.Episode, "trainer": train_neat.Episode}
+
+if __name__ == "__main__":
+    main("flappy", EPISODES, (flappy_bird.WIN_WIDTH, flappy_bird.WIN_HEIGHT))
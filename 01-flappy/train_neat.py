@@ -1,30 +1,451 @@
 import pygame
 import neat
 import os
-import pickle
+import random
+import argparse
+import multiprocessing
+import subprocess
+import sys
+import itertools
+import functools
+import numpy as np
 import visualizer
+import common_path  # noqa: F401
 
-from flappy_bird import Bird, Pipe, BG_IMG, WIN_WIDTH, WIN_HEIGHT, GROUND_Y
-
+from flappy_bird import Bird, Pipe, WIN_WIDTH, WIN_HEIGHT, GROUND_Y, image
+from flappy_bird import converted, rotated_bird, text, world_state, restore_world
+from collections import deque
+from batch_env import FlappyBatchEnv
+from common.batch_net import BatchNetwork
+from common.fitness_cache import FitnessCache
+from common.checkpointer import AsyncCheckpointer, node_ids_kept
+from common.profiler import Profiler, NullProfiler
+from common.episode_log import EpisodeLog
+from common.compiled_net import CompiledNetwork
+from common.hall_of_fame import HallOfFame, config_hash
+from common.dashboard import Publisher, NullPublisher
+from common.course import Course, attach, worker_lock
 
 # ---- Config
 GEN = 0
-pygame.font.init()
-STAT_FONT = pygame.font.SysFont("comicsans", 40)
-best_genome = None
+# Headless: no dashboard. Shown or not, generations train as fast as the CPU allows.
+HEADLESS = os.environ.get("NEAT_HEADLESS", "0") == "1"
+# When headless, still show every Nth generation on the dashboard (0 = never)
+RENDER_EVERY = int(os.environ.get("NEAT_RENDER_EVERY", "0"))
+# Worker processes for genome evaluation (0 = one shared world on this process)
+WORKERS = int(os.environ.get("NEAT_WORKERS", "0"))
+# Base seed for the pipe course; generation N plays seed SEED + N (None = random)
+SEED = int(os.environ["NEAT_SEED"]) if os.environ.get("NEAT_SEED") else None
+# Replay the same seed every generation (needs a SEED), so the cache can hit
+FIXED_SEED = os.environ.get("NEAT_FIXED_SEED", "0") == "1"
+# Remembers the fitness of genomes already played on the same seed (0 = off)
+CACHE_SIZE = int(os.environ.get("NEAT_CACHE_SIZE", "256"))
+FITNESS_CACHE = FitnessCache(CACHE_SIZE)
+# Simulate the flock as NumPy arrays (FlappyBatchEnv) and run every network in
+# one batched call (BatchNetwork) instead of Bird objects and activate()
+BATCH = os.environ.get("NEAT_BATCH", "0") == "1"
+# The networks decide every Nth frame and the birds stick with it in between
+# (1 = every frame). A flap is a tap, so sticking with it means no new flap.
+ACTION_REPEAT = int(os.environ.get("NEAT_ACTION_REPEAT", "1"))
+# The dashboard only draws the N fittest birds still flying (0 = all of them).
+# Hundreds of birds on top of each other look like one anyway.
+DRAW_TOP = int(os.environ.get("NEAT_DRAW_TOP", "0"))
+# Checkpoint every N generations and/or every M minutes (0 = off)
+CHECKPOINT_EVERY = int(os.environ.get("NEAT_CHECKPOINT_EVERY", "10"))
+CHECKPOINT_MINUTES = float(os.environ.get("NEAT_CHECKPOINT_MINUTES", "0"))
+# Only the newest N checkpoints are kept on disk (0 = keep all)
+KEEP_CHECKPOINTS = int(os.environ.get("NEAT_KEEP_CHECKPOINTS", "3"))
+# The hall of fame keeps every run's N fittest genomes (common/hall_of_fame.py)
+HALL_OF_FAME_SIZE = int(os.environ.get("NEAT_HALL_OF_FAME", "10"))
+# An episode ends after N frames even if birds are still flying (0 = no cap)
+MAX_FRAMES = int(os.environ.get("NEAT_MAX_FRAMES", "20000"))
+# A bird that reaches this fitness is done for the episode, and the run stops
+# once one has (None = fitness_threshold from config.txt)
+MAX_FITNESS = (
+    float(os.environ["NEAT_MAX_FITNESS"])
+    if os.environ.get("NEAT_MAX_FITNESS")
+    else None
+)
+# Every Nth generation starts from a snapshot of the hard phase (moving pipes)
+# instead of replaying the easy opening (0 = never, and no snapshots are taken)
+HARD_START_EVERY = int(os.environ.get("NEAT_HARD_START_EVERY", "0"))
+# Score where the pipes start moving, the snapshot is taken as it's passed
+HARD_SCORE = 50
+# The newest hard-phase snapshots, taken from earlier episodes
+SNAPSHOTS = deque(maxlen=8)
+SNAPSHOT_IDS = itertools.count()
+# Write per-phase timings of every generation to this JSON lines file
+PROFILER = (
+    Profiler(os.environ["NEAT_PROFILE"])
+    if os.environ.get("NEAT_PROFILE")
+    else NullProfiler()
+)
+# Write the champion's episode to this file when training ends, for replay.py
+RECORD = os.environ.get("NEAT_RECORD") or None
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+HALL_OF_FAME_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "hall_of_fame"
+)
+HALL_OF_FAME = None  # opened by run()
+# Workers extend a generation's shared course one at a time (common/course.py)
+COURSE_LOCK = None  # handed over by init_worker()
+# Where shown generations publish their frames (common/dashboard.py)
+DASHBOARD = NullPublisher()  # opened by run()
+
+
+@functools.cache
+def stat_font():
+    # Only windows need it, workers and headless runs never load a font
+    pygame.font.init()
+    return pygame.font.SysFont("comicsans", 40)
+
+
+def should_render():
+    if not HEADLESS:
+        return True
+    return RENDER_EVERY > 0 and GEN % RENDER_EVERY == 0
+
+
+def generation_seed():
+    if SEED is None:
+        return random.randrange(2**32)
+    if FIXED_SEED:
+        return SEED
+    return SEED + GEN
+
+
+def hard_start():
+    """The snapshot this generation starts from, or None for a normal start."""
+    if HARD_START_EVERY <= 0 or not SNAPSHOTS or GEN % HARD_START_EVERY:
+        return None
+    return SNAPSHOTS[GEN // HARD_START_EVERY % len(SNAPSHOTS)]
+
+
+def keep_snapshot(snapshot):
+    if snapshot is not None:
+        # The fitness cache tells episodes apart by this instead of the seed
+        snapshot["key"] = ("snapshot", next(SNAPSHOT_IDS))
+        SNAPSHOTS.append(snapshot)
+
+
+def checkpoint_state():
+    """What a resumed run needs back besides NEAT's own state: the hard-start
+    snapshots, or its generations would start from different worlds."""
+    return {"snapshots": list(SNAPSHOTS)}
+
+
+def restore_state(state):
+    global SNAPSHOT_IDS
+    if state is None:
+        if HARD_START_EVERY > 0:
+            print("No hard-start snapshots in this checkpoint, collecting anew")
+        return
+    SNAPSHOTS.clear()
+    SNAPSHOTS.extend(state["snapshots"])
+    # New snapshots need keys of their own for the fitness cache
+    ids = [snapshot["key"][1] for snapshot in SNAPSHOTS]
+    SNAPSHOT_IDS = itertools.count(max(ids, default=-1) + 1)
+
+
+def archive(genomes, seed, start):
+    """Offers the genomes just played to the hall of fame, as they are now."""
+    if HALL_OF_FAME is None:
+        return
+    for _, g in genomes:
+        HALL_OF_FAME.offer(g, GEN, seed, hard_start=start is not None)
+    HALL_OF_FAME.save()
 
 
 def eval_genomes(genomes, config):
-    global GEN, best_genome
+    global GEN
     GEN += 1
 
-    # Update the best genome
-    for _, g in genomes:
-        if best_genome is None or (
-            g.fitness is not None and g.fitness > best_genome.fitness
-        ):
-            best_genome = g
+    # Elites that already played this seed keep their fitness
+    seed = generation_seed()
+    start = hard_start()
+    todo, keys = FITNESS_CACHE.split(genomes, seed if start is None else start["key"])
+    PROFILER.lap("cache")
+    if todo:
+        caps, snapshot = simulate(todo, config, seed, should_render(), start)
+        report_caps(*caps, config)
+        keep_snapshot(snapshot)
+    FITNESS_CACHE.store(todo, keys)
+    archive(todo, seed, start)
+
+
+def eval_genome(genome, config, seed, start=None, course=None):
+    """Plays a single bird through its own copy of the generation's world.
+
+    The world (pipes, score, difficulty) doesn't depend on the birds, so this
+    gives the same fitness the bird gets in the shared serial world. The
+    hard-phase snapshot is the same too if this is the first bird to get there.
+    The pipes come from the generation's shared course, the block `course`.
+    """
+    course = attach(course, functools.partial(PipeCourse, seed, start), COURSE_LOCK)
+    caps, snapshot = simulate(
+        [(genome.key, genome)], config, seed, start=start, course=course
+    )
+    return genome.fitness, caps, snapshot
+
+
+# The settings eval_genome() plays by. Workers are handed this process's values:
+# with the spawn start method (Windows, macOS) they import this module afresh
+# and would only see the NEAT_* environment, not the command line.
+WORKER_SETTINGS = (
+    "SEED",
+    "FIXED_SEED",
+    "BATCH",
+    "ACTION_REPEAT",
+    "MAX_FRAMES",
+    "MAX_FITNESS",
+    "HARD_START_EVERY",
+    "HARD_SCORE",
+)
+
 
+def init_worker(settings, course_lock):
+    """Pool initializer: takes on the trainer's settings (see WORKER_SETTINGS)."""
+    global PROFILER, COURSE_LOCK
+    globals().update(settings)
+    COURSE_LOCK = course_lock
+    PROFILER = NullProfiler()  # the workers' phases aren't timed
+
+
+class ParallelEvaluator:
+    """Like neat.ParallelEvaluator, but every genome gets the generation seed."""
+
+    def __init__(self, num_workers, chunksize=1):
+        self.chunksize = chunksize
+        settings = {name: globals()[name] for name in WORKER_SETTINGS}
+        self.course_lock = worker_lock()
+        self.pool = multiprocessing.Pool(
+            num_workers,
+            initializer=init_worker,
+            initargs=(settings, self.course_lock),
+        )
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def evaluate(self, genomes, config):
+        global GEN
+        GEN += 1
+
+        seed = generation_seed()
+        start = hard_start()
+        todo, keys = FITNESS_CACHE.split(
+            genomes, seed if start is None else start["key"]
+        )
+        # Every bird flies the same pipes, rolled once and read in place
+        course = Course.create(
+            functools.partial(PipeCourse, seed, start), self.course_lock
+        )
+        jobs = [(g, config, seed, start, course.name) for _, g in todo]
+        PROFILER.lap("cache")
+        # The phases inside the workers aren't timed, only the wait for them
+        # Every job carries the config, and with it the node counter
+        try:
+            with node_ids_kept(config):
+                results = self.pool.starmap(eval_genome, jobs, self.chunksize)
+        finally:
+            course.close()
+        PROFILER.lap("workers")
+        frame_capped = fitness_capped = 0
+        snapshot = None
+        for (_, g), (fitness, caps, found) in zip(todo, results):
+            g.fitness = fitness
+            frame_capped += caps[0]
+            fitness_capped += caps[1]
+            # In the shared world the first bird to get there is the one kept
+            snapshot = snapshot or found
+        report_caps(frame_capped, fitness_capped, config)
+        keep_snapshot(snapshot)
+        FITNESS_CACHE.store(todo, keys)
+        archive(todo, seed, start)
+
+
+def simulate(genomes, config, seed, render=False, start=None, course=None):
+    """Plays one episode, from the start or from a hard-phase snapshot, with
+    the pipes of `course` (by default one of its own for the seed).
+
+    Returns how many birds each cap cut short, and the hard-phase snapshot
+    this episode took (None if it didn't take one).
+    """
+    if course is None:
+        course = Course(functools.partial(PipeCourse, seed, start))
+    if BATCH:
+        return play_batch(genomes, config, course, render, start)
+    return play(genomes, config, course, render, start)
+
+
+class PipeCourse:
+    """The course of a world (common/course.py): the height of every pipe,
+    in the order they spawn, rolled as Pipe() would from the world's stream.
+    NEAT's global `random` is left alone."""
+
+    width = 1
+
+    def __init__(self, seed, start=None):
+        self.rng = random.Random(seed)
+        if start is not None:
+            self.rng.setstate(start["rng"])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return [Pipe.roll_height(self.rng)]
+
+
+def course_pipe(course, i):
+    """The course's i-th pipe, at the right edge."""
+    return Pipe(600, height=course.row(i)[0])
+
+
+class Episode:
+    """One bird alone in its world, a frame per step(), the way play() plays
+    it (the world doesn't depend on the other birds, see eval_genome).
+    record_episode() plays it with a network, replay.py from an episode log."""
+
+    FPS = 100  # the game's frame rate, replay.py plays it at that
+
+    def __init__(self, seed=None):
+        Pipe.VEL = 5
+        Pipe.GAP = 200
+        Pipe.MOVING_Y = False
+        Pipe.PULSING_GAP = False
+
+        self.rng = random.Random(seed)
+        self.bird = Bird(230, 350)
+        self.pipes = [Pipe(600, self.rng)]
+        self.score = 0
+        self.fitness = 0
+        self.frames = 0
+        self.flapped = False  # the last frame's flap
+
+    def next_pipe(self):
+        pipes = self.pipes
+        if len(pipes) > 1 and self.bird.x > pipes[0].x + pipes[0].top_rect.width:
+            return pipes[1]
+        return pipes[0]
+
+    def step(self, flap):
+        """One frame. `flap` is whether the bird flaps after its move, or a
+        function of the episode that decides it right there, where play()
+        runs the networks. False once the bird crashed."""
+        self.frames += 1
+        score = self.score
+        if score > 0 and score % 15 == 0:
+            Pipe.VEL = min(10, 5 + (score // 15))
+        if score > 50:
+            Pipe.MOVING_Y = True
+        if score > 200:
+            Pipe.PULSING_GAP = True
+
+        bird = self.bird
+        bird.move()
+        self.fitness += 0.1
+        if callable(flap):
+            flap = flap(self)
+        self.flapped = bool(flap)
+        if flap:
+            bird.jump()
+
+        alive = True
+        add_pipe = False
+        rem = []
+        for pipe in self.pipes:
+            pipe.move()
+            if pipe.collide(bird):
+                self.fitness -= 1
+                alive = False
+            if pipe.x + pipe.top_rect.width < 0:
+                rem.append(pipe)
+            if not pipe.passed and pipe.x < bird.x:
+                pipe.passed = True
+                add_pipe = True
+
+        if add_pipe:
+            self.score += 1
+            self.fitness += 5
+            self.pipes.append(Pipe(600, self.rng))
+        for r in rem:
+            self.pipes.remove(r)
+
+        if bird.y + bird.img.get_height() >= GROUND_Y or bird.y < 0:
+            alive = False
+        return alive
+
+    def get_state(self):
+        state = world_state(self.pipes, self.score, self.rng, self.bird.get_state())
+        return {**state, "fitness": self.fitness, "frames": self.frames}
+
+    def set_state(self, state):
+        self.pipes, self.score = restore_world(state, self.rng)
+        self.bird.set_state(state["bird"])
+        self.fitness = state["fitness"]
+        self.frames = state["frames"]
+
+    def draw(self, win):
+        draw_world(win, self.pipes, [self.bird.sprite()], self.score)
+
+
+def record_episode(genome, config, path, seed=None):
+    """Plays `genome` alone on course `seed` (a random one if None), with the
+    same caps as play(), and writes the episode log to `path`."""
+    if seed is None:
+        seed = random.Random().randrange(2**32)  # NEAT's `random` is left alone
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+
+    def decide(episode):
+        if (episode.frames - 1) % ACTION_REPEAT:
+            return False
+        output = net.activate(net_inputs(episode.bird, episode.next_pipe()))
+        return output[0] > 0.5
+
+    episode = Episode(seed)
+    flaps = []
+    while not (MAX_FRAMES and episode.frames >= MAX_FRAMES):
+        alive = episode.step(decide)
+        flaps.append(episode.flapped)
+        if not alive or episode.fitness >= config.fitness_threshold:
+            break
+
+    log = EpisodeLog(
+        "flappy",
+        "trainer",
+        seed,
+        flaps,
+        1,
+        genome=genome.key,
+        fitness=episode.fitness,
+        action_repeat=ACTION_REPEAT,
+    )
+    log.save(path)
+    print(f"Recorded {len(log)} frames (fitness {episode.fitness:.1f}) to {path}")
+
+
+def net_inputs(bird, pipe):
+    # Use instance GAP if available (for pulsing), otherwise use Class GAP
+    gap_center = pipe.height + (pipe.GAP / 2)
+    diff_y = bird.y - gap_center
+    return (bird.y / WIN_HEIGHT, diff_y / WIN_HEIGHT, bird.vel / 10)
+
+
+def report_caps(frame_capped, fitness_capped, config):
+    """Log the birds an episode cap cut short this generation."""
+    if frame_capped:
+        print(
+            f"Frame cap: {frame_capped} bird(s) still flying after {MAX_FRAMES} frames"
+        )
+    if fitness_capped:
+        print(
+            f"Fitness cap: {fitness_capped} bird(s) reached {config.fitness_threshold}"
+        )
+
+
+def play(genomes, config, course, render, start=None):
     Pipe.VEL = 5
     Pipe.GAP = 200
     Pipe.MOVING_Y = False
@@ -40,22 +461,24 @@ def eval_genomes(genomes, config):
         nets.append(net)
         birds.append(Bird(230, 350))
         ge.append(g)
+    PROFILER.lap("create")
 
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-    clock = pygame.time.Clock()
-    pipes = [Pipe(600)]
-    score = 0
+    if start is None:
+        pipes = [course_pipe(course, 0)]
+        score = 0
+        spawned = 1  # course rows taken
+    else:
+        # Any stream will do, the snapshot's is the course's
+        pipes, score = restore_world(start, random.Random(0))
+        spawned = 0
+        for bird in birds:
+            bird.set_state(start["bird"])
+    frames = frame_capped = fitness_capped = 0
+    snapshot = None
+    capture = HARD_START_EVERY > 0 and start is None
 
     run = True
     while run:
-        clock.tick(100)  # Fast Training Speed
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-                pygame.quit()
-                return
-
         pipe_ind = 0
         if len(birds) > 0:
             if len(pipes) > 1 and birds[0].x > pipes[0].x + pipes[0].top_rect.width:
@@ -63,6 +486,17 @@ def eval_genomes(genomes, config):
         else:
             run = False
             break
+        if MAX_FRAMES and frames >= MAX_FRAMES:
+            # Out of time: the birds still flying keep the fitness they have
+            frame_capped = len(birds)
+            break
+        frames += 1
+        PROFILER.frame(len(birds))
+
+        if capture and score > HARD_SCORE:
+            rng = course.rng_after(spawned)
+            snapshot = world_state(pipes, score, rng, birds[0].get_state())
+            capture = False
 
         # --- DIFFICULTY RAMP ---
         if score > 0 and score % 15 == 0:
@@ -73,22 +507,17 @@ def eval_genomes(genomes, config):
             Pipe.PULSING_GAP = True
 
         # --- AI LOGIC ---
+        decide = (frames - 1) % ACTION_REPEAT == 0
         for x, bird in enumerate(birds):
             bird.move()
+            PROFILER.lap("physics")
             ge[x].fitness += 0.1
+            if not decide:
+                continue
 
-            # Use instance GAP if available (for pulsing), otherwise use Class GAP
-            current_gap = pipes[pipe_ind].GAP
-            gap_center = pipes[pipe_ind].height + (current_gap / 2)
-            diff_y = bird.y - gap_center
+            output = nets[x].activate(net_inputs(bird, pipes[pipe_ind]))
 
-            output = nets[x].activate(
-                (
-                    bird.y / WIN_HEIGHT,
-                    diff_y / WIN_HEIGHT,
-                    bird.vel / 10,
-                )
-            )
+            PROFILER.lap("inference")
 
             if output[0] > 0.5:
                 bird.jump()
@@ -100,16 +529,23 @@ def eval_genomes(genomes, config):
 
         for pipe in pipes:
             pipe.move()
-            for x, bird in enumerate(birds):
-                if pipe.collide(bird):
-                    ge[x].fitness -= 1
-                    if x not in birds_to_remove:
-                        birds_to_remove.append(x)
+            PROFILER.lap("physics")
+
+            # Every bird flies at the same x, so a pipe that isn't level with
+            # the flock can't hit any of them. Skip the per-bird checks.
+            flock = birds[0].rect
+            if pipe.top_rect.right >= flock.left and pipe.top_rect.left <= flock.right:
+                for x, bird in enumerate(birds):
+                    if pipe.collide(bird):
+                        ge[x].fitness -= 1
+                        if x not in birds_to_remove:
+                            birds_to_remove.append(x)
+            PROFILER.lap("collision")
 
             if pipe.x + pipe.top_rect.width < 0:
                 rem.append(pipe)
 
-            if not pipe.passed and pipe.x < bird.x:
+            if not pipe.passed and pipe.x < birds[0].x:
                 pipe.passed = True
                 add_pipe = True
 
@@ -117,57 +553,241 @@ def eval_genomes(genomes, config):
             score += 1
             for g in ge:
                 g.fitness += 5
-            pipes.append(Pipe(600))
+            pipes.append(course_pipe(course, spawned))
+            spawned += 1
 
         for r in rem:
             pipes.remove(r)
 
+        PROFILER.lap("other")
         for x, bird in enumerate(birds):
             if bird.y + bird.img.get_height() >= GROUND_Y or bird.y < 0:
                 if x not in birds_to_remove:
                     birds_to_remove.append(x)
+        PROFILER.lap("collision")
 
         for x in sorted(birds_to_remove, reverse=True):
             birds.pop(x)
             nets.pop(x)
             ge.pop(x)
 
+        # A bird at the fitness cap is done, no need to keep it flying
+        for x in reversed(range(len(birds))):
+            if ge[x].fitness >= config.fitness_threshold:
+                birds.pop(x)
+                nets.pop(x)
+                ge.pop(x)
+                fitness_capped += 1
+        PROFILER.lap("other")
+
         if len(birds) == 0:
             run = False
             break
 
-        # --- DRAWING ---
-        win.blit(BG_IMG, (0, 0))
-        for pipe in pipes:
-            pipe.draw(win)
-        for bird in birds:
-            bird.draw(win)
-        pygame.draw.rect(win, (200, 200, 200), (0, GROUND_Y, WIN_WIDTH, 70))
+        if not render or not DASHBOARD.due():
+            continue
+
+        # --- DASHBOARD ---
+        shown = [birds[x] for x in top_rows([g.fitness for g in ge])]
+        flock = [[bird.x, bird.y, bird.tilt] for bird in shown]
+        DASHBOARD.publish(world_frame(pipes, score, flock), ge[0])
+        PROFILER.lap("publish")
 
-        text = STAT_FONT.render(f"Score: {score}", 1, (255, 255, 255))
-        win.blit(text, (WIN_WIDTH - 10 - text.get_width(), 10))
+    return (frame_capped, fitness_capped), snapshot
 
-        level_text = "Lvl 1"
+
+def play_batch(genomes, config, course, render, start=None):
+    """Same rules as play(), but with a FlappyBatchEnv and a BatchNetwork."""
+    Pipe.VEL = 5
+    Pipe.GAP = 200
+    Pipe.MOVING_Y = False
+    Pipe.PULSING_GAP = False
+
+    ge = [g for _, g in genomes]
+    nets = BatchNetwork.create(ge, config)
+    env = FlappyBatchEnv(len(ge))
+    fitness = np.zeros(len(ge))
+    PROFILER.lap("create")
+
+    if start is None:
+        pipes = [course_pipe(course, 0)]
+        score = 0
+        spawned = 1  # course rows taken
+    else:
+        # Any stream will do, the snapshot's is the course's
+        pipes, score = restore_world(start, random.Random(0))
+        spawned = 0
+        env.set_state(start["bird"])
+    frames = frame_capped = fitness_capped = 0
+    snapshot = None
+    capture = HARD_START_EVERY > 0 and start is None
+
+    while len(env) > 0:
+        if MAX_FRAMES and frames >= MAX_FRAMES:
+            frame_capped = len(env)
+            break
+        frames += 1
+        PROFILER.frame(len(env))
+
+        if capture and score > HARD_SCORE:
+            rng = course.rng_after(spawned)
+            snapshot = world_state(pipes, score, rng, env.get_state(0))
+            capture = False
+
+        pipe_ind = 0
+        if len(pipes) > 1 and env.x > pipes[0].x + pipes[0].top_rect.width:
+            pipe_ind = 1
+
+        # --- DIFFICULTY RAMP ---
+        if score > 0 and score % 15 == 0:
+            Pipe.VEL = min(10, 5 + (score // 15))
+        if score > 50:
+            Pipe.MOVING_Y = True
         if score > 200:
-            level_text = "Lvl 4 (GOD)"
-        elif score > 50:
-            level_text = "Lvl 3 (Move)"
-        elif score > 15:
-            level_text = "Lvl 2 (Speed)"
+            Pipe.PULSING_GAP = True
+
+        # --- AI LOGIC ---
+        alive = env.ids
+        env.move()
+        fitness[alive] += 0.1
+        PROFILER.lap("physics")
+
+        if (frames - 1) % ACTION_REPEAT == 0:
+            gap_center = pipes[pipe_ind].height + (pipes[pipe_ind].GAP / 2)
+            inputs = np.column_stack(
+                (
+                    env.y / WIN_HEIGHT,
+                    (env.y - gap_center) / WIN_HEIGHT,
+                    env.vel / 10,
+                )
+            )
+            env.jump(nets.activate(inputs)[:, 0] > 0.5)
+            PROFILER.lap("inference")
+
+        # --- PHYSICS ---
+        add_pipe = False
+        rem = []
+        dead = np.zeros(len(env), dtype=bool)
+
+        for pipe in pipes:
+            pipe.move()
+            PROFILER.lap("physics")
+
+            hits = env.collide(pipe)
+            if hits is not None:
+                fitness[alive[hits]] -= 1
+                dead |= hits
+            PROFILER.lap("collision")
+
+            if pipe.x + pipe.top_rect.width < 0:
+                rem.append(pipe)
+
+            if not pipe.passed and pipe.x < env.x:
+                pipe.passed = True
+                add_pipe = True
+
+        if add_pipe:
+            score += 1
+            fitness[alive] += 5
+            pipes.append(course_pipe(course, spawned))
+            spawned += 1
+
+        for r in rem:
+            pipes.remove(r)
+
+        PROFILER.lap("other")
+        dead |= env.out_of_bounds()
+        PROFILER.lap("collision")
+        capped = ~dead & (fitness[alive] >= config.fitness_threshold)
+        fitness_capped += int(capped.sum())
+        dead |= capped
+        if dead.any():
+            env.kill(dead)
+            nets = nets.subset(~dead)
+        PROFILER.lap("other")
+
+        if render and len(env) > 0 and DASHBOARD.due():
+            rows = top_rows(fitness[env.ids])
+            flock = [[env.x, y, tilt] for y, tilt in zip(env.y[rows], env.tilt[rows])]
+            DASHBOARD.publish(world_frame(pipes, score, flock), ge[env.ids[0]])
+            PROFILER.lap("publish")
+
+    for g, f in zip(ge, fitness):
+        g.fitness = float(f)
+
+    return (frame_capped, fitness_capped), snapshot
+
 
-        lvl_lbl = STAT_FONT.render(level_text, 1, (255, 255, 255))
-        win.blit(lvl_lbl, (10, 10))
+def top_rows(fitness):
+    """Indices of the birds to draw: the DRAW_TOP fittest, in their order."""
+    if DRAW_TOP <= 0 or len(fitness) <= DRAW_TOP:
+        return np.arange(len(fitness))
+    return np.sort(np.argsort(-np.asarray(fitness), kind="stable")[:DRAW_TOP])
 
-        if len(ge) > 0:
-            try:
-                visualizer.draw_net(win, ge[0], config, pos=(WIN_WIDTH - 250, 500))
-            except:  # noqa: E722
-                pass
 
-        pygame.display.update()
+def world_frame(pipes, score, flock):
+    """A frame for the dashboard: the pipes, the score and the birds to draw
+    as [x, y, tilt]."""
+    return {
+        "pipes": [pipe.get_state() for pipe in pipes],
+        "score": score,
+        "birds": [[float(v) for v in bird] for bird in flock],
+    }
 
 
-def run(config_path):
+def draw_world(win, pipes, sprites, score):
+    """Everything but the network. `sprites` are the birds' (image, position)
+    pairs, Bird.sprite() or FlappyBatchEnv.sprites(), blitted in one go."""
+    win.blit(converted(image("background")), (0, 0))
+    for pipe in pipes:
+        pipe.draw(win)
+    win.blits(sprites, doreturn=False)
+    pygame.draw.rect(win, (200, 200, 200), (0, GROUND_Y, WIN_WIDTH, 70))
+
+    score_lbl = text(stat_font(), f"Score: {score}", (255, 255, 255))
+    win.blit(score_lbl, (WIN_WIDTH - 10 - score_lbl.get_width(), 10))
+
+    level_text = "Lvl 1"
+    if score > 200:
+        level_text = "Lvl 4 (GOD)"
+    elif score > 50:
+        level_text = "Lvl 3 (Move)"
+    elif score > 15:
+        level_text = "Lvl 2 (Speed)"
+
+    lvl_lbl = text(stat_font(), level_text, (255, 255, 255))
+    win.blit(lvl_lbl, (10, 10))
+
+
+def draw_frame(win, world, genome, config):
+    """Draws a world_frame() with the network of `genome`, for dashboard.py."""
+    pipes = []
+    for state in world["pipes"]:
+        pipe = Pipe(0, random.Random(0))  # set_state() overwrites what it rolls
+        pipe.set_state(state)
+        pipes.append(pipe)
+    sprites = []
+    for x, y, tilt in world["birds"]:
+        rotated = rotated_bird(tilt)
+        sprites.append((rotated, rotated.get_rect(center=(x, int(y))).topleft))
+    draw_world(win, pipes, sprites, world["score"])
+    try:
+        visualizer.draw_net(win, genome, config, pos=(WIN_WIDTH - 250, 500))
+    except:  # noqa: E722
+        pass
+
+
+def open_dashboard():
+    """Starts publishing frames, and the viewer that shows them."""
+    global DASHBOARD
+    DASHBOARD = Publisher("flappy")
+    viewer = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+    subprocess.Popen([sys.executable, viewer])
+
+
+def run(config_path, resume=None):
+    global GEN, HALL_OF_FAME
+
     config = neat.config.Config(
         neat.DefaultGenome,
         neat.DefaultReproduction,
@@ -175,34 +795,263 @@ def run(config_path):
         neat.DefaultStagnation,
         config_path,
     )
-    p = neat.Population(config)
+
+    HALL_OF_FAME = HallOfFame(
+        HALL_OF_FAME_DIR, config_hash(config_path), HALL_OF_FAME_SIZE
+    )
+
+    # With a fixed seed the whole run (evolution + every world) is reproducible
+    if SEED is not None:
+        random.seed(SEED)
+
+    if resume:
+        # Restores the population, species and NEAT's random state as saved
+        p = neat.Checkpointer.restore_checkpoint(resume)
+        GEN = p.generation
+        restore_state(AsyncCheckpointer.restore_extra(resume))
+        print(f"Resuming from {resume} at generation {p.generation}")
+    else:
+        p = neat.Population(config)
+    if MAX_FITNESS is not None:
+        # The cap is the threshold: NEAT ends the run once a bird reaches it
+        p.config.fitness_threshold = MAX_FITNESS
     p.add_reporter(neat.StdOutReporter(True))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
+    if PROFILER.enabled:
+        p.add_reporter(PROFILER)
+
+    checkpointer = None
+    if CHECKPOINT_EVERY > 0 or CHECKPOINT_MINUTES > 0:
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        checkpointer = AsyncCheckpointer(
+            CHECKPOINT_EVERY or None,
+            CHECKPOINT_MINUTES * 60 or None,
+            filename_prefix=os.path.join(CHECKPOINT_DIR, "neat-checkpoint-"),
+            keep=KEEP_CHECKPOINTS,
+            extra=checkpoint_state,
+        )
+        checkpointer.last_generation_checkpoint = p.generation
+        p.add_reporter(checkpointer)
+
+    evaluator = None
+    evaluate = eval_genomes
+    if WORKERS > 0:
+        evaluator = ParallelEvaluator(WORKERS)
+        evaluate = evaluator.evaluate
+    elif not HEADLESS or RENDER_EVERY > 0:
+        open_dashboard()
 
     try:
-        winner = p.run(eval_genomes, 100)
-        save_winner(winner)
+        p.run(evaluate, 100 - p.generation)
+        save_winner(p.config)
     except KeyboardInterrupt:
         print("\nUser interrupted! Saving best bird found so far...")
-        save_winner(best_genome)
+        save_winner(p.config)
+        # Nothing new to save if the last generation was just checkpointed
+        if checkpointer and checkpointer.last_generation_checkpoint != p.generation:
+            checkpointer.save_checkpoint(
+                p.config, p.population, p.species, p.generation
+            )
     except Exception as e:
         print(f"\nCrash! {e}. Saving best bird found so far...")
-        if best_genome:
-            save_winner(best_genome)
+        save_winner(p.config)
+        if checkpointer and checkpointer.last_generation_checkpoint != p.generation:
+            checkpointer.save_checkpoint(
+                p.config, p.population, p.species, p.generation
+            )
+    finally:
+        if evaluator:
+            evaluator.close()
+        if checkpointer:
+            checkpointer.wait()
+        DASHBOARD.close()
 
 
-def save_winner(winner):
-    if winner:
-        print(f"\nSaving champion with fitness: {winner.fitness}")
-        with open("winner.pkl", "wb") as f:
-            pickle.dump(winner, f)
-        print("Done!")
-    else:
+def save_winner(config):
+    """The run's champion from the hall of fame, compiled into the archive's
+    folder for anything that only wants to run it (NumPy only), and its
+    episode with --record."""
+    entry = HALL_OF_FAME.best(run=HALL_OF_FAME.run)
+    if entry is None:
         print("No valid genome to save.")
+        return
+    winner = HALL_OF_FAME.load(entry, config)
+    path = HALL_OF_FAME.path_for(entry, ".npz")
+    print(f"\nSaving champion with fitness: {winner.fitness}")
+    CompiledNetwork.create(winner, config).save(path)
+    print(f"Done! {path}")
+    if RECORD:
+        record_episode(winner, config, RECORD, SEED)
+
+
+def record_winner(config_path, path):
+    """Records the episode of the hall of fame's best genome, no training."""
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        config_path,
+    )
+    if MAX_FITNESS is not None:
+        config.fitness_threshold = MAX_FITNESS
+    hall = HallOfFame(HALL_OF_FAME_DIR, config_hash(config_path))
+    entry = hall.best()
+    if entry is None:
+        raise SystemExit(f"No genome trained under {config_path} in {HALL_OF_FAME_DIR}")
+    winner = hall.load(entry, config)
+    record_episode(winner, config, path, SEED)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train Flappy Bird with NEAT")
+    parser.add_argument("--headless", action="store_true", help="no dashboard")
+    parser.add_argument(
+        "--render-every",
+        type=int,
+        default=RENDER_EVERY,
+        metavar="N",
+        help="headless only: preview every Nth generation",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        metavar="N",
+        help="evaluate genomes in N worker processes (implies no dashboard)",
+    )
+    parser.add_argument("--seed", type=int, default=SEED, help="base course seed")
+    parser.add_argument(
+        "--fixed-seed",
+        action="store_true",
+        help="every generation replays --seed (lets the fitness cache hit)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=CACHE_SIZE,
+        metavar="N",
+        help="remember the fitness of N genome/seed pairs (0 = off)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="simulate the flock and its networks as NumPy arrays",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=CHECKPOINT_EVERY,
+        metavar="N",
+        help="save a checkpoint every N generations (0 = off)",
+    )
+    parser.add_argument(
+        "--checkpoint-minutes",
+        type=float,
+        default=CHECKPOINT_MINUTES,
+        metavar="M",
+        help="also save a checkpoint every M minutes",
+    )
+    parser.add_argument(
+        "--keep-checkpoints",
+        type=int,
+        default=KEEP_CHECKPOINTS,
+        metavar="N",
+        help="only keep the newest N checkpoints (0 = keep all)",
+    )
+    parser.add_argument(
+        "--hall-of-fame",
+        type=int,
+        default=HALL_OF_FAME_SIZE,
+        metavar="N",
+        help="keep the run's N fittest genomes in hall_of_fame/",
+    )
+    parser.add_argument(
+        "--resume", metavar="PATH", help="continue training from a checkpoint"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="append per-phase timings of every generation to this JSONL file",
+    )
+    parser.add_argument(
+        "--max-frames",
+        type=int,
+        default=MAX_FRAMES,
+        metavar="N",
+        help="end each episode after N frames (0 = no cap)",
+    )
+    parser.add_argument(
+        "--max-fitness",
+        type=float,
+        default=MAX_FITNESS,
+        metavar="F",
+        help="a bird is done at fitness F, and the run stops once one is "
+        "(default: fitness_threshold from config.txt)",
+    )
+    parser.add_argument(
+        "--hard-start-every",
+        type=int,
+        default=HARD_START_EVERY,
+        metavar="N",
+        help="every Nth generation starts where the pipes start moving (0 = off)",
+    )
+    parser.add_argument(
+        "--action-repeat",
+        type=int,
+        default=ACTION_REPEAT,
+        metavar="K",
+        help="the networks only decide every Kth frame",
+    )
+    parser.add_argument(
+        "--draw-top",
+        type=int,
+        default=DRAW_TOP,
+        metavar="K",
+        help="only draw the K fittest birds (0 = all)",
+    )
+    parser.add_argument(
+        "--record",
+        default=RECORD,
+        metavar="PATH",
+        help="write the champion's episode log here when training ends (replay.py)",
+    )
+    parser.add_argument(
+        "--record-winner",
+        metavar="PATH",
+        help="write the hall of fame's best episode log here and exit, no training",
+    )
+    args = parser.parse_args()
+    HEADLESS = HEADLESS or args.headless
+    RENDER_EVERY = args.render_every
+    WORKERS = args.workers
+    SEED = args.seed
+    FIXED_SEED = FIXED_SEED or args.fixed_seed
+    if FIXED_SEED and SEED is None:
+        parser.error("--fixed-seed needs --seed")
+    FITNESS_CACHE = FitnessCache(args.cache_size)
+    BATCH = BATCH or args.batch
+    CHECKPOINT_EVERY = args.checkpoint_every
+    CHECKPOINT_MINUTES = args.checkpoint_minutes
+    KEEP_CHECKPOINTS = args.keep_checkpoints
+    if args.hall_of_fame < 1:
+        parser.error("--hall-of-fame must be at least 1")
+    HALL_OF_FAME_SIZE = args.hall_of_fame
+    if args.profile:
+        PROFILER = Profiler(args.profile)
+    MAX_FRAMES = args.max_frames
+    MAX_FITNESS = args.max_fitness
+    HARD_START_EVERY = args.hard_start_every
+    if args.action_repeat < 1:
+        parser.error("--action-repeat must be at least 1")
+    ACTION_REPEAT = args.action_repeat
+    DRAW_TOP = args.draw_top
+    RECORD = args.record
+
     local_dir = os.path.dirname(__file__)
     config_path = os.path.join(local_dir, "config.txt")
-    run(config_path)
+    if args.record_winner:
+        record_winner(config_path, args.record_winner)
+    else:
+        run(config_path, resume=args.resume)
@@ -1,12 +1,51 @@
-import pygame
+import functools
+from collections import OrderedDict
 
+import pygame
 
+import common_path  # noqa: F401
+from common.fitness_cache import genome_hash
+
+# Rendered overlays, least recently drawn first. A preview shows the same
+# genome frame after frame, so its net is drawn once and then just blitted.
+OVERLAYS = OrderedDict()
+OVERLAY_CACHE_SIZE = 32
+
+
+def cached_overlay(win, key, draw, *args):
+    """Blits the overlay draw(surface, *args) draws, rendering it only the
+    first time `key` comes up (and again after it's been evicted)."""
+    key = (key, win.get_size())
+    overlay = OVERLAYS.get(key)
+    if overlay is None:
+        surface = pygame.Surface(win.get_size(), pygame.SRCALPHA)
+        draw(surface, *args)
+        # Only the part that was drawn on is kept
+        rect = surface.get_bounding_rect()
+        image = surface.subsurface(rect).copy()
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()  # the window's pixel format blits faster
+        overlay = OVERLAYS[key] = (image, rect.topleft)
+        if len(OVERLAYS) > OVERLAY_CACHE_SIZE:
+            OVERLAYS.popitem(last=False)
+    else:
+        OVERLAYS.move_to_end(key)
+    win.blit(*overlay)
+
+
+@functools.cache
 def get_font():
+    pygame.font.init()
     return pygame.font.SysFont("comicsans", 20)
 
 
 def draw_net(win, genome, config=None, pos=(400, 500)):
     """Draws the neural net"""
+    key = (genome.key, genome_hash(genome), pos)
+    cached_overlay(win, key, _draw_net, genome, pos)
+
+
+def _draw_net(win, genome, pos):
     node_position = {}
     start_x, start_y = pos
     layer_width = 150
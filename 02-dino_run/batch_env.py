@@ -0,0 +1,213 @@
+import functools
+
+import numpy as np
+
+from dino import Dino, SPRITES, GROUND_Y, VELOCITY, converted, sprite
+from collision import get_mask
+
+# Every sprite frame a dino can show, indexed by the `frame` array. The sizes
+# come from the scales, the images themselves are only loaded by frames().
+DINO_SPRITES = ("running", "ducking", "jumping")
+RUN, DUCK, JUMP = 0, 2, 4
+FRAME_W, FRAME_H = np.array(
+    [scale for name in DINO_SPRITES for _, scale in SPRITES[name]]
+).T
+RUN_H = FRAME_H[RUN]
+DUCK_H = FRAME_H[DUCK]
+
+
+@functools.cache
+def frames():
+    return [img for name in DINO_SPRITES for img in sprite(name)]
+
+
+def round_rect(v):
+    # Rect attributes round floats half away from zero
+    return np.where(v < 0, np.ceil(v - 0.5), np.floor(v + 0.5)).astype(np.int64)
+
+
+class DinoBatchEnv:
+    """The whole herd of dinos as NumPy arrays.
+
+    Every dino gets the exact same update as Dino.update / Dino.run, just for
+    the whole population at once, quirks included: a jump keeps the rect
+    height of the frame before it, and the trainer's extra run() call moves
+    the animation on a second step.
+
+    The arrays only hold living dinos; `ids` maps each row back to its
+    index in the population, and kill() drops rows.
+    """
+
+    x = Dino.X_POS
+
+    def __init__(self, n):
+        self.ids = np.arange(n)
+        self.y = np.full(n, Dino.Y_POS, dtype=np.int64)  # rect.y
+        self.rect_h = np.full(n, RUN_H, dtype=np.int64)
+        self.vel_y = np.zeros(n)
+        self.step_index = np.zeros(n, dtype=np.int64)
+        self.frame = np.full(n, RUN, dtype=np.int64)
+
+        self.ducking = np.zeros(n, dtype=bool)
+        self.running = np.zeros(n, dtype=bool)
+        self.jumping = np.zeros(n, dtype=bool)
+        self.want_jump = np.zeros(n, dtype=bool)
+        self.want_duck = np.zeros(n, dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_state(self, row):
+        """Dino.get_state() of one dino."""
+        width = FRAME_W[RUN] if self.rect_h[row] == RUN_H else FRAME_W[DUCK]
+        return {
+            "want_jump": bool(self.want_jump[row]),
+            "want_duck": bool(self.want_duck[row]),
+            "dino_duck": bool(self.ducking[row]),
+            "dino_run": bool(self.running[row]),
+            "dino_jump": bool(self.jumping[row]),
+            "step_index": int(self.step_index[row]),
+            "vel_y": float(self.vel_y[row]),
+            "image": int(self.frame[row]),
+            "rect": (self.x, int(self.y[row]), int(width), int(self.rect_h[row])),
+        }
+
+    def set_state(self, state):
+        """Puts every dino in the same Dino.get_state() state."""
+        self.want_jump[:] = state["want_jump"]
+        self.want_duck[:] = state["want_duck"]
+        self.ducking[:] = state["dino_duck"]
+        self.running[:] = state["dino_run"]
+        self.jumping[:] = state["dino_jump"]
+        self.step_index[:] = state["step_index"]
+        self.vel_y[:] = state["vel_y"]
+        self.frame[:] = state["image"]
+        self.y[:] = state["rect"][1]
+        self.rect_h[:] = state["rect"][3]
+
+    def _animate(self, mask, first, y, height):
+        self.frame[mask] = first + (self.step_index[mask] // 5) % 2
+        self.y[mask] = y
+        self.rect_h[mask] = height
+        self.step_index[mask] += 1
+
+    def run(self, mask):
+        """Dino.run() for the dinos in `mask`."""
+        self._animate(mask, RUN, Dino.Y_POS, RUN_H)
+
+    def update(self):
+        """Dino.update() for every dino."""
+        self._animate(self.ducking, DUCK, Dino.Y_POS_DUCK, DUCK_H)
+        self.run(self.running)
+
+        jumping = self.jumping
+        if jumping.any():
+            self.frame[jumping] = JUMP
+            self.vel_y[jumping] += VELOCITY
+            self.y[jumping] = round_rect(self.y[jumping] + self.vel_y[jumping] * 4)
+
+            landed = jumping & (self.y + self.rect_h >= GROUND_Y)
+            self.y[landed] = GROUND_Y - self.rect_h[landed]
+            self.vel_y[landed] = 0
+            jumping[landed] = False
+
+        self.step_index[self.step_index >= 10] = 0
+
+        start_jump = self.want_jump & ~jumping
+        start_duck = self.want_duck & ~self.want_jump & ~jumping
+        keep_running = ~self.want_jump & ~self.want_duck & ~jumping
+
+        self.vel_y[start_jump] = -Dino.JUMP_VEL
+        self.ducking[:] = start_duck
+        self.running[:] = keep_running
+        jumping |= start_jump
+
+        self.want_jump[:] = False
+        self.want_duck[:] = False
+
+    def act(self, outputs):
+        """The trainer's reaction to the net outputs: jump, duck, or run."""
+        jump = outputs[:, 0] > 0.5
+        duck = ~jump & (outputs[:, 1] > 0.5)
+        self.want_jump |= jump
+        self.want_duck |= duck
+        self.run(~jump & ~duck & ~self.jumping)
+
+    def steady(self):
+        """Bool array of dinos that are just running, with nothing queued."""
+        return (
+            self.running
+            & ~self.ducking
+            & ~self.jumping
+            & ~self.want_jump
+            & ~self.want_duck
+        )
+
+    def keep_running(self, frames):
+        """`frames` whole trainer frames (update(), then act() with neither
+        jump nor duck) for steady dinos, in one go. Only the animation moves:
+        the step counter goes up twice a frame and wraps once it's past 9."""
+        step = np.arange(self.step_index.max() + 1)
+        frame = np.full(len(step), RUN)
+        for _ in range(frames):
+            first = step + 1  # update()'s run()
+            first[first >= 10] = 0
+            frame = RUN + (first // 5) % 2  # act()'s run()
+            step = first + 1
+        self.frame = frame[self.step_index]
+        self.step_index = step[self.step_index]
+        self.y[:] = Dino.Y_POS
+        self.rect_h[:] = RUN_H
+
+    def collide(self, obstacle):
+        """Bool array of which dinos hit this obstacle, or None if none can."""
+        rect = obstacle.rect
+        width = FRAME_W[self.frame]
+        if not (rect.left < self.x + width.max() and self.x < rect.right):
+            return None
+
+        height = FRAME_H[self.frame]
+        near = (
+            (rect.left < self.x + width)
+            & (rect.top < self.y + height)
+            & (self.y < rect.bottom)
+        )
+        hits = np.zeros(len(self), dtype=bool)
+        obstacle_mask = get_mask(obstacle.get_current_image())
+        images = frames()
+        for i in np.flatnonzero(near):
+            offset = (rect.x - self.x, rect.y - int(self.y[i]))
+            if get_mask(images[self.frame[i]]).overlap(obstacle_mask, offset):
+                hits[i] = True
+        return hits
+
+    def kill(self, dead):
+        keep = ~dead
+        for name in (
+            "ids",
+            "y",
+            "rect_h",
+            "vel_y",
+            "step_index",
+            "frame",
+            "ducking",
+            "running",
+            "jumping",
+            "want_jump",
+            "want_duck",
+        ):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def sprites(self, rows=None):
+        """(image, position) of every dino in `rows` (all by default), ready
+        for Surface.blits()."""
+        if rows is None:
+            rows = slice(None)
+        images = [converted(img) for img in frames()]
+        return [
+            (images[frame], (self.x, int(y)))
+            for frame, y in zip(self.frame[rows], self.y[rows])
+        ]
+
+    def draw(self, win):
+        win.blits(self.sprites(), doreturn=False)
@@ -0,0 +1,156 @@
+"""Checks that --fast-forward plays every episode exactly like the batch path.
+
+Two checks, both on fixed seeds:
+
+- bounds: random networks on random input boxes. activate() at any point
+  inside a box has to stay within BatchNetwork.bounds() of that box.
+- episodes: the same populations on the same courses, with and without
+  fast-forward, have to end with the exact same fitness for every genome.
+  The populations are random genomes plus mutated copies of the hall of
+  fame's best dino (if there is one), so some of them run long enough to
+  meet the later obstacles.
+
+    python check_fast_forward.py
+    python check_fast_forward.py --seeds 10 --pop-size 300
+
+Prints how many frames were skipped and exits with 1 on any mismatch. The
+test suite (test_fast_forward.py) runs the same checks on a few random
+populations, this is the report: more courses, longer episodes and the time.
+"""
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat  # noqa: E402
+import numpy as np  # noqa: E402
+
+import common_path  # noqa: E402, F401
+import train_neat  # noqa: E402
+from common.batch_net import BatchNetwork  # noqa: E402
+from common.hall_of_fame import HallOfFame, config_hash  # noqa: E402
+from common.profiler import NullProfiler  # noqa: E402
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Inferences(NullProfiler):
+    """Counts the frames the networks actually ran on."""
+
+    def __init__(self):
+        self.count = 0
+
+    def lap(self, phase):
+        if phase == "inference":
+            self.count += 1
+
+
+def load_config(pop_size):
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        os.path.join(LOCAL_DIR, "config.txt"),
+    )
+    config.pop_size = pop_size
+    return config
+
+
+def population(config, seed):
+    random.seed(seed)
+    genomes = [g for _, g in neat.Population(config).population.items()]
+    for g in genomes:
+        for _ in range(random.randrange(8)):
+            g.mutate(config.genome_config)
+
+    # Half of them close to a trained dino, so the episodes get somewhere
+    hall = HallOfFame(
+        train_neat.HALL_OF_FAME_DIR, config_hash(os.path.join(LOCAL_DIR, "config.txt"))
+    )
+    entry = hall.best()
+    if entry is not None:
+        winner = hall.load(entry, config)
+        for i in range(0, len(genomes), 2):
+            g = copy.deepcopy(winner)
+            g.key = genomes[i].key
+            for cg in g.connections.values():
+                cg.weight += random.gauss(0, 0.3)
+            genomes[i] = g
+    return [(g.key, g) for g in genomes]
+
+
+def check_bounds(config, seed, boxes=200, points=50):
+    rng = np.random.default_rng(seed)
+    genomes = [g for _, g in population(config, seed)]
+    nets = BatchNetwork.create(genomes, config)
+    num_inputs = len(config.genome_config.input_keys)
+    worst = 0.0
+    for _ in range(boxes):
+        a = rng.uniform(-2, 2, (len(nets), num_inputs))
+        b = a + rng.uniform(0, 1, a.shape) * rng.integers(0, 2, a.shape)
+        low, high = nets.bounds(a, b)
+        for _ in range(points):
+            x = a + (b - a) * rng.uniform(0, 1, a.shape)
+            out = nets.activate(x)
+            worst = max(worst, (low - out).max(), (out - high).max())
+    # Only the rounding of a differently ordered sum may poke out
+    return worst <= 1e-12, worst
+
+
+def play(genomes, config, seed, fast):
+    train_neat.FAST_FORWARD = fast
+    train_neat.PROFILER = counter = Inferences()
+    start = time.perf_counter()
+    train_neat.simulate(genomes, config, seed)
+    seconds = time.perf_counter() - start
+    train_neat.PROFILER = NullProfiler()
+    return [g.fitness for _, g in genomes], counter.count, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seeds", type=int, default=5, help="courses to play")
+    parser.add_argument("--pop-size", type=int, default=100)
+    parser.add_argument(
+        "--max-frames", type=int, default=5000, help="per episode (0 = no cap)"
+    )
+    args = parser.parse_args()
+
+    config = load_config(args.pop_size)
+    ok, worst = check_bounds(config, 0)
+    print(f"bounds: {'ok' if ok else 'FAIL'} (worst overshoot {worst:.2e})")
+
+    train_neat.BATCH = True
+    train_neat.MAX_FRAMES = args.max_frames
+    ran = skipped = 0
+    plain_s = fast_s = 0.0
+    for seed in range(args.seeds):
+        genomes = population(config, seed)
+        plain, plain_frames, t0 = play(genomes, config, seed, fast=False)
+        fast, fast_frames, t1 = play(genomes, config, seed, fast=True)
+        same = plain == fast
+        ok = ok and same
+        ran += plain_frames
+        skipped += plain_frames - fast_frames
+        plain_s += t0
+        fast_s += t1
+        print(
+            f"seed {seed}: {'ok' if same else 'FAIL'}, best {max(plain):.1f}, "
+            f"{plain_frames - fast_frames}/{plain_frames} frames skipped"
+        )
+
+    print(
+        f"skipped {skipped}/{ran} frames ({100 * skipped / max(ran, 1):.0f}%), "
+        f"{plain_s:.2f}s -> {fast_s:.2f}s"
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import pygame
+
+# One mask per sprite frame, built the first time the frame is needed
+MASKS = {}
+
+
+def get_mask(surface):
+    mask = MASKS.get(surface)
+    if mask is None:
+        mask = MASKS[surface] = pygame.mask.from_surface(surface)
+    return mask
+
+
+def preload(*surfaces):
+    """Build the masks up front, so the first collisions don't pay for it."""
+    for surface in surfaces:
+        get_mask(surface)
+
+
+def collide(dino, obstacle):
+    """Pixel-perfect hit test between a dino and an obstacle.
+
+    Cheap rect test first, masks only when the boxes overlap. The box is the
+    size of the image that's drawn, not dino.rect: a jump keeps the rect of
+    the run/duck frame before it.
+    """
+    image = obstacle.get_current_image()
+    box = pygame.Rect(dino.rect.topleft, dino.image.get_size())
+    if not box.colliderect(obstacle.rect):
+        return False
+
+    offset = (obstacle.rect.x - dino.rect.x, obstacle.rect.y - dino.rect.y)
+    return get_mask(dino.image).overlap(get_mask(image), offset) is not None
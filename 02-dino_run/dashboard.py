@@ -0,0 +1,21 @@
+"""Shows the generations train_neat.py plays live, in a window of its own.
+train_neat.py opens it by itself; closing it doesn't stop training, and this
+brings it back. See common/dashboard.py.
+
+    python dashboard.py
+"""
+
+import os
+
+import dino
+import common_path  # noqa: F401
+import train_neat
+from common.dashboard import main
+
+if __name__ == "__main__":
+    main(
+        "dino",
+        train_neat.draw_frame,
+        (dino.WIN_WIDTH, dino.WIN_HEIGHT),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.txt"),
+    )
@@ -1,6 +1,10 @@
 import pygame
 import random
 import os
+import argparse
+import functools
+
+from collision import collide, preload
 
 # ---- Config
 WIN_WIDTH = 1200
@@ -39,31 +43,60 @@ def load_scale(name, scale):
     return pygame.transform.scale(img, scale)
 
 
-# ---- Load assets with scale (alternating images)
-RUNNING = [
-    load_scale("dinorun.png", DINO_SCALE),
-    load_scale("dinorun1.png", DINO_SCALE),
-]
-
-JUMPING = load_scale("dinoJump.png", DINO_SCALE)
-
-DUCKING = [
-    load_scale("dinoDuck.png", DUCK_SCALE),
-    load_scale("dinoDuck1.png", DUCK_SCALE),
-]
-
-SMALL_CACTUS = [
-    load_scale("cactusSmall.png", CACTUS_SCALE),
-    load_scale("cactusSmallMany.png", (100, 90)),
-]
-
-LARGE_CACTUS = [load_scale("cactusBig.png", (70, 100))]
+# ---- Sprites: file and scale of every frame (alternating images)
+# Nothing is loaded on import. sprite() and font() load on first use, so the
+# physics can be imported (by the trainer's workers, say) without a display.
+SPRITES = {
+    "running": [("dinorun.png", DINO_SCALE), ("dinorun1.png", DINO_SCALE)],
+    "jumping": [("dinoJump.png", DINO_SCALE)],
+    "ducking": [("dinoduck.png", DUCK_SCALE), ("dinoduck1.png", DUCK_SCALE)],
+    "small_cactus": [
+        ("cactusSmall.png", CACTUS_SCALE),
+        ("cactusSmallMany.png", (100, 90)),
+    ],
+    "large_cactus": [("cactusBig.png", (70, 100))],
+    "bird": [("bird.png", BIRD_SCALE), ("bird2.png", BIRD_SCALE)],
+}
+
+
+@functools.cache
+def sprite(name):
+    """The frames of one sprite, with their collision masks built."""
+    frames = [load_scale(file, scale) for file, scale in SPRITES[name]]
+    preload(*frames)
+    return frames
+
+
+@functools.cache
+def font():
+    pygame.font.init()
+    return pygame.font.SysFont("comicsans", 30)
+
+
+# ---- Drawing
+# Sprites in the window's pixel format, so blits don't convert every pixel on
+# every frame. Made on the first draw (there's no window before that); the
+# physics and the masks keep using the loaded frames.
+CONVERTED = {}
+
+
+def converted(surface):
+    if pygame.display.get_surface() is None:
+        return surface  # drawing offscreen, there's no format to convert to
+    img = CONVERTED.get(surface)
+    if img is None:
+        if surface.get_flags() & pygame.SRCALPHA:
+            img = surface.convert_alpha()
+        else:
+            img = surface.convert()
+        CONVERTED[surface] = img
+    return img
 
-BIRD = [load_scale("bird.png", BIRD_SCALE), load_scale("bird2.png", BIRD_SCALE)]
 
-pygame.init()
-pygame.font.init()
-FONT = pygame.font.SysFont("comicsans", 30)
+@functools.lru_cache(maxsize=64)
+def text(font, string, color):
+    """font.render() that only renders again when the string changes."""
+    return font.render(string, True, color)
 
 
 class Dino:
@@ -73,9 +106,9 @@ class Dino:
     JUMP_VEL = 8.5
 
     def __init__(self):
-        self.duck_img = DUCKING
-        self.run_img = RUNNING
-        self.jump_img = JUMPING
+        self.duck_img = sprite("ducking")
+        self.run_img = sprite("running")
+        self.jump_img = sprite("jumping")[0]
         self.want_jump = False
         self.want_duck = False
 
@@ -153,8 +186,39 @@ class Dino:
         self.rect.y = self.Y_POS
         self.step_index += 1
 
+    def get_state(self):
+        # The image is saved as its index in run + duck + jump frames
+        frames = self.run_img + self.duck_img + [self.jump_img]
+        return {
+            "want_jump": self.want_jump,
+            "want_duck": self.want_duck,
+            "dino_duck": self.dino_duck,
+            "dino_run": self.dino_run,
+            "dino_jump": self.dino_jump,
+            "step_index": self.step_index,
+            "vel_y": self.vel_y,
+            "image": frames.index(self.image),
+            "rect": tuple(self.rect),
+        }
+
+    def set_state(self, state):
+        frames = self.run_img + self.duck_img + [self.jump_img]
+        self.want_jump = state["want_jump"]
+        self.want_duck = state["want_duck"]
+        self.dino_duck = state["dino_duck"]
+        self.dino_run = state["dino_run"]
+        self.dino_jump = state["dino_jump"]
+        self.step_index = state["step_index"]
+        self.vel_y = state["vel_y"]
+        self.image = frames[state["image"]]
+        self.rect = pygame.Rect(state["rect"])
+
+    def sprite(self):
+        """The image to draw and where, ready for Surface.blits()."""
+        return converted(self.image), (self.rect.x, self.rect.y)
+
     def draw(self, win):
-        win.blit(self.image, (self.rect.x, self.rect.y))
+        win.blit(*self.sprite())
         # Uncomment to see hitboxes:
         # pygame.draw.rect(win, (255, 0, 0), self.rect, 2)
 
@@ -169,33 +233,47 @@ class Obstacle:
     def update(self, speed):
         self.rect.x -= speed
 
+    def get_current_image(self):
+        return self.image[self.type]
+
+    def get_state(self):
+        return {
+            "kind": type(self).__name__,
+            "type": self.type,
+            "rect": tuple(self.rect),
+        }
+
+    def set_state(self, state):
+        self.type = state["type"]
+        self.rect = pygame.Rect(state["rect"])
+
     def draw(self, win):
-        win.blit(self.image[self.type], self.rect)
+        win.blit(converted(self.image[self.type]), self.rect)
 
 
 class SmallCactus(Obstacle):  # Inheriting from Obstacle.
-    def __init__(self, image):
-        self.type = random.randint(0, len(image) - 1)
+    def __init__(self, image, rng=random):
+        self.type = rng.randint(0, len(image) - 1)
         super().__init__(image, self.type)
         self.rect.bottom = GROUND_Y
 
 
 class LargeCactus(Obstacle):
-    def __init__(self, image):
-        self.type = random.randint(0, len(image) - 1)
+    def __init__(self, image, rng=random):
+        self.type = rng.randint(0, len(image) - 1)
         super().__init__(image, self.type)
         self.rect.bottom = GROUND_Y
 
 
 class Bird(Obstacle):
-    def __init__(self, image):
+    def __init__(self, image, rng=random):
         self.type = 0  # Start with first frame
         super().__init__(image, self.type)
 
         self.index = 0  # required for animations
 
         # Birds can fly at different heights
-        self.rect.y = random.choice(
+        self.rect.y = rng.choice(
             [
                 GROUND_Y - 400,  # Do nothing
                 GROUND_Y - 135,  # Duck
@@ -203,20 +281,43 @@ class Bird(Obstacle):
             ]
         )
 
+    def update(self, speed):
+        super().update(speed)
+        # Animate Bird Wings. Done here and not in draw(), so the bird has the
+        # same hitbox whether or not anything gets drawn.
+        self.index = (self.index + 1) % 9
+
     def get_current_image(self):
         return self.image[(self.index // 5) % len(self.image)]
 
+    def get_state(self):
+        state = super().get_state()
+        state["index"] = self.index
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.index = state["index"]
+
     def draw(self, win):
-        # Animate Bird Wings
-        if self.index >= 9:
-            self.index = 0
+        win.blit(converted(self.get_current_image()), self.rect)
 
-        img_state = self.image[self.index // 5]
-        win.blit(img_state, self.rect)
-        self.index += 1
 
-        # Also update Rect for collision (in case shape changes)
-        # self.rect = img_state.get_rect() # (Optional, keeps hitbox precise)
+# Obstacle class and sprite by get_state()["kind"]
+OBSTACLE_KINDS = {
+    "SmallCactus": (SmallCactus, "small_cactus"),
+    "LargeCactus": (LargeCactus, "large_cactus"),
+    "Bird": (Bird, "bird"),
+}
+
+
+def obstacle_from_state(state):
+    cls, name = OBSTACLE_KINDS[state["kind"]]
+    # set_state() overwrites whatever the constructor rolls, so any stream will
+    # do. Just not the global one, that one belongs to NEAT.
+    obstacle = cls(sprite(name), random.Random(0))
+    obstacle.set_state(state)
+    return obstacle
 
 
 def draw_window(win, dino, obstacles, score, speed):
@@ -225,9 +326,8 @@ def draw_window(win, dino, obstacles, score, speed):
     # Draw Ground Line
     pygame.draw.line(win, BLACK, (0, GROUND_Y), (WIN_WIDTH, GROUND_Y), 2)
 
-    text = FONT.render(f"Points: {int(score)}", True, BLACK)
-    win.blit(text, (1000, 20))
-    text_speed = FONT.render(f"Speed: {int(speed)}", True, BLACK)
+    win.blit(text(font(), f"Points: {int(score)}", BLACK), (1000, 20))
+    text_speed = text(font(), f"Speed: {int(speed)}", BLACK)
     win.blit(text_speed, (1000, 50))
 
     dino.draw(win)
@@ -235,10 +335,8 @@ def draw_window(win, dino, obstacles, score, speed):
     for obstacle in obstacles:
         obstacle.draw(win)
 
-    pygame.display.update()
 
-
-def spawn_obstacle_group(start_x):
+def spawn_obstacle_group(start_x, rng=random):
     group = []
 
     # Patterns of obstacles (L=Large, S=Small)
@@ -250,7 +348,7 @@ def spawn_obstacle_group(start_x):
         ["L", "S", "L"],  # Mixed
     ]
 
-    pattern = random.choice(patterns)
+    pattern = rng.choice(patterns)
 
     # Current X position pointer
     current_x = start_x
@@ -258,9 +356,9 @@ def spawn_obstacle_group(start_x):
 
     for p in pattern:
         if p == "S":
-            obs = SmallCactus(SMALL_CACTUS)
+            obs = SmallCactus(sprite("small_cactus"), rng)
         else:
-            obs = LargeCactus(LARGE_CACTUS)
+            obs = LargeCactus(sprite("large_cactus"), rng)
 
         # Set the position
         obs.rect.x = current_x
@@ -279,89 +377,164 @@ def get_game_speed(score):
     return min(POST_500_MAX_SPEED, MAX_SPEED + (score - 500) * 0.04)
 
 
-def main():
-    global obstacles
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-    pygame.display.set_caption("Dino Run Human")
-    clock = pygame.time.Clock()
-
-    dino = Dino()
-    obstacles = []
-    score = 0
-
-    run = True
-    while run:
-        clock.tick(FPS)
-
-        userInput = pygame.key.get_pressed()
-
-        if userInput[pygame.K_SPACE]:
+# ---- Snapshots
+def world_state(obstacles, score, rng, dino):
+    """Snapshot of the world, with `dino` (a Dino state) as the player."""
+    return {
+        "obstacles": [obstacle.get_state() for obstacle in obstacles],
+        "score": score,
+        "rng": rng.getstate(),
+        "dino": dino,
+    }
+
+
+def restore_world(snapshot, rng):
+    """Obstacles and score of a world_state() snapshot, and `rng` goes back
+    to where it was."""
+    rng.setstate(snapshot["rng"])
+    states = snapshot["obstacles"]
+    obstacles = [obstacle_from_state(state) for state in states]
+    return obstacles, snapshot["score"]
+
+
+class Episode:
+    """One game of main(), a frame per step(): the keys, the dino, a new
+    obstacle if there's none left, then the obstacles. main() plays it from
+    the keyboard and replay.py from an episode log."""
+
+    FPS = FPS
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.dino = Dino()
+        self.obstacles = []
+        self.score = 0
+        self.speed = get_game_speed(0)
+
+    def step(self, keys):
+        """One frame with `keys` held: 1 = jump (SPACE), 2 = duck (DOWN), or
+        both. False once the dino hit something."""
+        dino = self.dino
+        if keys & 1:
             dino.want_jump = True
-        if userInput[pygame.K_DOWN]:
+        if keys & 2:
             dino.want_duck = True
+        dino.update(keys)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # Remember '===', is with javascript!!!!!
-                run = False
-
-        dino.update(userInput)
-
+        rng = self.rng
+        obstacles = self.obstacles
         # --- Spawn obstacles ---
         if len(obstacles) == 0:
-            speed = get_game_speed(score)
-            r = random.random()
+            speed = get_game_speed(self.score)
+            r = rng.random()
 
             # Spawn distance (Start off-screen)
-            spawn_x = WIN_WIDTH + random.randint(100, 300)
+            spawn_x = WIN_WIDTH + rng.randint(100, 300)
 
             # 1. Bird (20% chance)
             if r < 0.2:
-                obstacles.append(Bird(BIRD))
+                obstacles.append(Bird(sprite("bird"), rng))
                 obstacles[-1].rect.x = spawn_x  # Update bird pos
 
             # 2. Grouped Cacti (Only at high speeds, 50% chance)
             elif speed > 18 and r < 0.7:
-                new_group = spawn_obstacle_group(spawn_x)
+                new_group = spawn_obstacle_group(spawn_x, rng)
                 obstacles.extend(new_group)
 
             # 3. Single Cactus (Default)
             else:
-                if random.random() < 0.5:
-                    obs = SmallCactus(SMALL_CACTUS)
+                if rng.random() < 0.5:
+                    obs = SmallCactus(sprite("small_cactus"), rng)
                 else:
-                    obs = LargeCactus(LARGE_CACTUS)
+                    obs = LargeCactus(sprite("large_cactus"), rng)
 
                 obs.rect.x = spawn_x
                 obstacles.append(obs)
 
         # --- Update obstacles
-        speed = get_game_speed(score)
+        alive = True
+        speed = self.speed = get_game_speed(self.score)
         for obstacle in obstacles[:]:
             obstacle.update(speed)
 
-            # Use Masks for Pixel-Perfect Collision
-            dino_mask = pygame.mask.from_surface(dino.image)
+            # Pixel-perfect, with masks cached per sprite frame
+            if collide(dino, obstacle):
+                alive = False
 
-            # For Animated Bird, we should technically get the current frame mask
-            if isinstance(obstacle, Bird):
-                obs_mask = pygame.mask.from_surface(obstacle.get_current_image())
-            else:
-                obs_mask = pygame.mask.from_surface(obstacle.image[obstacle.type])
+            if obstacle.rect.right < 0:
+                obstacles.remove(obstacle)
 
-            offset = (obstacle.rect.x - dino.rect.x, obstacle.rect.y - dino.rect.y)
+        self.score += speed * 0.015
+        return alive
 
-            if dino_mask.overlap(obs_mask, offset):
-                print("GAME OVER")
-                run = False  # Or reset
+    def get_state(self):
+        state = world_state(self.obstacles, self.score, self.rng, self.dino.get_state())
+        return {**state, "speed": self.speed}
 
-            if obstacle.rect.right < 0:
-                obstacles.remove(obstacle)
+    def set_state(self, state):
+        self.obstacles, self.score = restore_world(state, self.rng)
+        self.dino.set_state(state["dino"])
+        self.speed = state["speed"]
+
+    def draw(self, win):
+        draw_window(win, self.dino, self.obstacles, self.score, self.speed)
+
+
+def main(seed=None, action_repeat=1, record=None):
+    pygame.init()
+    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
+    pygame.display.set_caption("Dino Run Human")
+    clock = pygame.time.Clock()
+
+    if seed is None and record:
+        seed = random.randrange(2**32)  # a log needs to know the course
+    episode = Episode(seed)
+    frames = []  # the keys of every frame, for the log
+
+    run = True
+    while run:
+        clock.tick(FPS)
 
-        score += speed * 0.015
-        draw_window(win, dino, obstacles, score, speed)
+        # Like the trainer's --action-repeat: the keys are read every Kth
+        # frame and held in between
+        if len(frames) % action_repeat == 0:
+            userInput = pygame.key.get_pressed()
+            keys = userInput[pygame.K_SPACE] | userInput[pygame.K_DOWN] << 1
+        frames.append(keys)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:  # Remember '===', is with javascript!!!!!
+                run = False
+
+        if not episode.step(keys):
+            print("GAME OVER")
+            run = False  # Or reset
+
+        episode.draw(win)
+        pygame.display.update()
 
     pygame.quit()
+    if record:
+        # Only needed here, the game itself doesn't need NumPy
+        import common_path  # noqa: F401
+        from common.episode_log import EpisodeLog
+
+        EpisodeLog("dino", "human", seed, frames, 2, score=episode.score).save(record)
+        print(f"Recorded {len(frames)} frames to {record}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Play Dino Run")
+    parser.add_argument("--seed", type=int, help="obstacle seed")
+    parser.add_argument(
+        "--action-repeat",
+        type=int,
+        default=1,
+        metavar="K",
+        help="only read the keys every Kth frame",
+    )
+    parser.add_argument(
+        "--record", metavar="PATH", help="save the game as an episode log (replay.py)"
+    )
+    args = parser.parse_args()
+    main(args.seed, max(1, args.action_repeat), args.record)
@@ -0,0 +1,17 @@
+"""Plays an episode log back without the network: a game of dino.py
+(--record) or a champion of train_neat.py (--record, --record-winner).
+See common/episode_log.py for the options.
+
+    python replay.py winner.eplog --speed 8
+"""
+
+import dino
+import common_path  # noqa: F401
+import train_neat
+from common.episode_log import main
+
+# The rules a log was played by, and the Episode that plays them again
+EPISODES = {"human": dino.Episode, "trainer": train_neat.Episode}
+
+if __name__ == "__main__":
+    main("dino", EPISODES, (dino.WIN_WIDTH, dino.WIN_HEIGHT))
@@ -0,0 +1,95 @@
+"""--fast-forward has to play every episode exactly like the plain batch path.
+
+Fixed seeds and fixed random genomes only, nothing from the hall of fame.
+check_fast_forward.py plays more and longer episodes and reports the frames
+skipped.
+
+    python -m pytest test_fast_forward.py
+"""
+
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat  # noqa: E402
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+import common_path  # noqa: E402, F401
+import train_neat  # noqa: E402
+from common.batch_net import BatchNetwork  # noqa: E402
+from common.profiler import NullProfiler  # noqa: E402
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+SEEDS = [0, 1, 2]
+
+
+class Inferences(NullProfiler):
+    """Counts the frames the networks actually ran on."""
+
+    def __init__(self):
+        self.count = 0
+
+    def lap(self, phase):
+        if phase == "inference":
+            self.count += 1
+
+
+def load_config(pop_size):
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        os.path.join(LOCAL_DIR, "config.txt"),
+    )
+    config.pop_size = pop_size
+    return config
+
+
+def random_genomes(config, seed, mutations=8):
+    """A fresh population, each genome mutated up to `mutations` times so
+    some have hidden nodes."""
+    random.seed(seed)
+    genomes = list(neat.Population(config).population.values())
+    for g in genomes:
+        for _ in range(random.randrange(mutations)):
+            g.mutate(config.genome_config)
+    return [(g.key, g) for g in genomes]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bounds_contain_activate(seed, boxes=100, points=20):
+    config = load_config(50)
+    nets = BatchNetwork.create([g for _, g in random_genomes(config, seed)], config)
+    rng = np.random.default_rng(seed)
+    num_inputs = len(config.genome_config.input_keys)
+    for _ in range(boxes):
+        # Some inputs a point (the ones that don't change over a stretch)
+        a = rng.uniform(-2, 2, (len(nets), num_inputs))
+        b = a + rng.uniform(0, 1, a.shape) * rng.integers(0, 2, a.shape)
+        low, high = nets.bounds(a, b)
+        for _ in range(points):
+            out = nets.activate(a + (b - a) * rng.uniform(0, 1, a.shape))
+            # Only the rounding of a differently ordered sum may poke out
+            assert (low - out).max() <= 1e-12
+            assert (out - high).max() <= 1e-12
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_same_fitness_with_and_without(seed, monkeypatch):
+    config = load_config(50)
+    genomes = random_genomes(config, seed)
+    monkeypatch.setattr(train_neat, "BATCH", True)
+    monkeypatch.setattr(train_neat, "MAX_FRAMES", 3000)
+    fitness, inferences = {}, {}
+    for fast in (False, True):
+        counter = Inferences()
+        monkeypatch.setattr(train_neat, "FAST_FORWARD", fast)
+        monkeypatch.setattr(train_neat, "PROFILER", counter)
+        train_neat.simulate(genomes, config, seed)
+        fitness[fast] = [g.fitness for _, g in genomes]
+        inferences[fast] = counter.count
+    assert fitness[True] == fitness[False]
+    assert inferences[True] < inferences[False]  # something was skipped
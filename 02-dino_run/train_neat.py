@@ -1,19 +1,125 @@
 import pygame
 import neat
 import os
-import pickle
 import random
+import argparse
+import multiprocessing
+import subprocess
+import sys
+import itertools
+import functools
+import numpy as np
 import visualizer
+import common_path  # noqa: F401
+from collections import deque
+from common.batch_net import BatchNetwork
+from common.fitness_cache import FitnessCache
+from common.checkpointer import AsyncCheckpointer, node_ids_kept
+from common.profiler import Profiler, NullProfiler
+from collision import collide
+from batch_env import DinoBatchEnv, frames as sprite_frames
+from common.episode_log import EpisodeLog
+from common.compiled_net import CompiledNetwork
+from common.hall_of_fame import HallOfFame, config_hash
+from common.dashboard import Publisher, NullPublisher
+from common.course import Course, attach, worker_lock
+from dino import (
+    Dino,
+    Bird,
+    SmallCactus,
+    LargeCactus,
+    WIN_WIDTH,
+    WIN_HEIGHT,
+    GROUND_Y,
+    DINO_SCALE,
+    DUCK_SCALE,
+    WHITE,
+    BLACK,
+    converted,
+    get_game_speed,
+    obstacle_from_state,
+    OBSTACLE_KINDS,
+    sprite,
+    text,
+    world_state,
+    restore_world,
+)
 
-# Import game assets ( the lazy way )
-from dino import *  # noqa: F403
-
-best_genome = None
-pygame.init()
-
-STAT_FONT = pygame.font.SysFont("comicsans", 30)
 RED = (255, 0, 0)
+# Right edge of the widest dino frame (ducking). Every dino starts at X_POS.
+DINO_RIGHT = Dino.X_POS + max(DINO_SCALE[0], DUCK_SCALE[0])
 GEN = 0  # Starting point of the genomes.
+# Headless: no dashboard. Shown or not, generations train as fast as the CPU allows.
+HEADLESS = os.environ.get("NEAT_HEADLESS", "0") == "1"
+# When headless, still show every Nth generation on the dashboard (0 = never)
+RENDER_EVERY = int(os.environ.get("NEAT_RENDER_EVERY", "0"))
+# Worker processes for genome evaluation (0 = one shared world on this process)
+WORKERS = int(os.environ.get("NEAT_WORKERS", "0"))
+# Base seed for the obstacles; generation N plays seed SEED + N (None = random)
+SEED = int(os.environ["NEAT_SEED"]) if os.environ.get("NEAT_SEED") else None
+# Replay the same seed every generation (needs a SEED), so the cache can hit
+FIXED_SEED = os.environ.get("NEAT_FIXED_SEED", "0") == "1"
+# Remembers the fitness of genomes already played on the same seed (0 = off)
+CACHE_SIZE = int(os.environ.get("NEAT_CACHE_SIZE", "256"))
+FITNESS_CACHE = FitnessCache(CACHE_SIZE)
+# Simulate the dinos as NumPy arrays (DinoBatchEnv) and run every network in
+# one batched call (BatchNetwork) instead of Dino objects and activate()
+BATCH = os.environ.get("NEAT_BATCH", "0") == "1"
+# Batch only: skip the network calls over stretches where none of them can
+# change its mind, and the dinos' physics while every dino just keeps running.
+# The obstacles and the score still step frame by frame, so this only saves the
+# inference's share of a frame: it pays off with small populations, not with
+# large ones (test_fast_forward.py checks it changes no fitness)
+FAST_FORWARD = os.environ.get("NEAT_FAST_FORWARD", "0") == "1"
+# Shortest stretch worth proving and skipping
+MIN_SKIP = 4
+# The networks decide every Nth frame and the dinos hold that decision (keep
+# jumping, ducking or running) in between (1 = every frame)
+ACTION_REPEAT = int(os.environ.get("NEAT_ACTION_REPEAT", "1"))
+# The dashboard only draws the N fittest dinos still running (0 = all of them).
+# Hundreds of dinos on top of each other look like one anyway.
+DRAW_TOP = int(os.environ.get("NEAT_DRAW_TOP", "0"))
+# Checkpoint every N generations and/or every M minutes (0 = off)
+CHECKPOINT_EVERY = int(os.environ.get("NEAT_CHECKPOINT_EVERY", "10"))
+CHECKPOINT_MINUTES = float(os.environ.get("NEAT_CHECKPOINT_MINUTES", "0"))
+# Only the newest N checkpoints are kept on disk (0 = keep all)
+KEEP_CHECKPOINTS = int(os.environ.get("NEAT_KEEP_CHECKPOINTS", "3"))
+# The hall of fame keeps every run's N fittest genomes (common/hall_of_fame.py)
+HALL_OF_FAME_SIZE = int(os.environ.get("NEAT_HALL_OF_FAME", "10"))
+# An episode ends after N frames even if dinos are still running (0 = no cap)
+MAX_FRAMES = int(os.environ.get("NEAT_MAX_FRAMES", "20000"))
+# A dino that reaches this fitness is done for the episode, and the run stops
+# once one has (None = fitness_threshold from config.txt)
+MAX_FITNESS = (
+    float(os.environ["NEAT_MAX_FITNESS"])
+    if os.environ.get("NEAT_MAX_FITNESS")
+    else None
+)
+# Every Nth generation starts from a snapshot of the hard phase (cactus groups)
+# instead of replaying the easy opening (0 = never, and no snapshots are taken)
+HARD_START_EVERY = int(os.environ.get("NEAT_HARD_START_EVERY", "0"))
+# Speed where cactus groups start spawning, the snapshot is taken as it's passed
+HARD_SPEED = 18
+# The newest hard-phase snapshots, taken from earlier episodes
+SNAPSHOTS = deque(maxlen=8)
+SNAPSHOT_IDS = itertools.count()
+# Write per-phase timings of every generation to this JSON lines file
+PROFILER = (
+    Profiler(os.environ["NEAT_PROFILE"])
+    if os.environ.get("NEAT_PROFILE")
+    else NullProfiler()
+)
+# Write the champion's episode to this file when training ends, for replay.py
+RECORD = os.environ.get("NEAT_RECORD") or None
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+HALL_OF_FAME_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "hall_of_fame"
+)
+HALL_OF_FAME = None  # opened by run()
+# Workers extend a generation's shared course one at a time (common/course.py)
+COURSE_LOCK = None  # handed over by init_worker()
+# Where shown generations publish their frames (common/dashboard.py)
+DASHBOARD = NullPublisher()  # opened by run()
 
 
 class DummyInput:
@@ -21,109 +127,583 @@ class DummyInput:
         return False  # For NEAT to work without keyboard inputs
 
 
+@functools.cache
+def stat_font():
+    # Only windows need it, workers and headless runs never load a font
+    pygame.font.init()
+    return pygame.font.SysFont("comicsans", 30)
+
+
+def should_render():
+    if not HEADLESS:
+        return True
+    return RENDER_EVERY > 0 and GEN % RENDER_EVERY == 0
+
+
+def generation_seed():
+    if SEED is None:
+        return random.randrange(2**32)
+    if FIXED_SEED:
+        return SEED
+    return SEED + GEN
+
+
+def hard_start():
+    """The snapshot this generation starts from, or None for a normal start."""
+    if HARD_START_EVERY <= 0 or not SNAPSHOTS or GEN % HARD_START_EVERY:
+        return None
+    return SNAPSHOTS[GEN // HARD_START_EVERY % len(SNAPSHOTS)]
+
+
+def keep_snapshot(snapshot):
+    if snapshot is not None:
+        # The fitness cache tells episodes apart by this instead of the seed
+        snapshot["key"] = ("snapshot", next(SNAPSHOT_IDS))
+        SNAPSHOTS.append(snapshot)
+
+
+def checkpoint_state():
+    """What a resumed run needs back besides NEAT's own state: the hard-start
+    snapshots, or its generations would start from different worlds."""
+    return {"snapshots": list(SNAPSHOTS)}
+
+
+def restore_state(state):
+    global SNAPSHOT_IDS
+    if state is None:
+        if HARD_START_EVERY > 0:
+            print("No hard-start snapshots in this checkpoint, collecting anew")
+        return
+    SNAPSHOTS.clear()
+    SNAPSHOTS.extend(state["snapshots"])
+    # New snapshots need keys of their own for the fitness cache
+    ids = [snapshot["key"][1] for snapshot in SNAPSHOTS]
+    SNAPSHOT_IDS = itertools.count(max(ids, default=-1) + 1)
+
+
+def archive(genomes, seed, start):
+    """Offers the genomes just played to the hall of fame, as they are now."""
+    if HALL_OF_FAME is None:
+        return
+    for _, g in genomes:
+        HALL_OF_FAME.offer(g, GEN, seed, hard_start=start is not None)
+    HALL_OF_FAME.save()
+
+
 def eval_genomes(genomes, config):
-    global GEN, best_genome
+    global GEN
     GEN += 1
 
-    # Update the best genome
-    for _, g in genomes:
-        if best_genome is None or (
-            g.fitness is not None and g.fitness > best_genome.fitness
+    # Elites that already played this seed keep their fitness
+    seed = generation_seed()
+    start = hard_start()
+    todo, keys = FITNESS_CACHE.split(genomes, seed if start is None else start["key"])
+    PROFILER.lap("cache")
+    if todo:
+        caps, snapshot = simulate(todo, config, seed, should_render(), start)
+        report_caps(*caps, config)
+        keep_snapshot(snapshot)
+    FITNESS_CACHE.store(todo, keys)
+    archive(todo, seed, start)
+
+
+def eval_genome(genome, config, seed, start=None, course=None):
+    """Runs a single dino through its own copy of the generation's world.
+
+    Obstacles and speed don't depend on the dinos, so this gives the same
+    fitness the dino gets in the shared serial world. The hard-phase snapshot
+    is the same too if this is the first dino to get there. The obstacles
+    come from the generation's shared course, the block `course`.
+    """
+    course = attach(course, functools.partial(ObstacleCourse, seed, start), COURSE_LOCK)
+    caps, snapshot = simulate(
+        [(genome.key, genome)], config, seed, start=start, course=course
+    )
+    return genome.fitness, caps, snapshot
+
+
+# The settings eval_genome() plays by. Workers are handed this process's values:
+# with the spawn start method (Windows, macOS) they import this module afresh
+# and would only see the NEAT_* environment, not the command line.
+WORKER_SETTINGS = (
+    "SEED",
+    "FIXED_SEED",
+    "BATCH",
+    "FAST_FORWARD",
+    "ACTION_REPEAT",
+    "MAX_FRAMES",
+    "MAX_FITNESS",
+    "HARD_START_EVERY",
+    "HARD_SPEED",
+)
+
+
+def init_worker(settings, course_lock):
+    """Pool initializer: takes on the trainer's settings (see WORKER_SETTINGS)."""
+    global PROFILER, COURSE_LOCK
+    globals().update(settings)
+    COURSE_LOCK = course_lock
+    PROFILER = NullProfiler()  # the workers' phases aren't timed
+
+
+class ParallelEvaluator:
+    """Like neat.ParallelEvaluator, but every genome gets the generation seed."""
+
+    def __init__(self, num_workers, chunksize=1):
+        self.chunksize = chunksize
+        settings = {name: globals()[name] for name in WORKER_SETTINGS}
+        self.course_lock = worker_lock()
+        self.pool = multiprocessing.Pool(
+            num_workers,
+            initializer=init_worker,
+            initargs=(settings, self.course_lock),
+        )
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def evaluate(self, genomes, config):
+        global GEN
+        GEN += 1
+
+        seed = generation_seed()
+        start = hard_start()
+        todo, keys = FITNESS_CACHE.split(
+            genomes, seed if start is None else start["key"]
+        )
+        # Every dino runs the same obstacles, rolled once and read in place
+        course = Course.create(
+            functools.partial(ObstacleCourse, seed, start), self.course_lock
+        )
+        jobs = [(g, config, seed, start, course.name) for _, g in todo]
+        PROFILER.lap("cache")
+        # The phases inside the workers aren't timed, only the wait for them
+        # Every job carries the config, and with it the node counter
+        try:
+            with node_ids_kept(config):
+                results = self.pool.starmap(eval_genome, jobs, self.chunksize)
+        finally:
+            course.close()
+        PROFILER.lap("workers")
+        frame_capped = fitness_capped = 0
+        snapshot = None
+        for (_, g), (fitness, caps, found) in zip(todo, results):
+            g.fitness = fitness
+            frame_capped += caps[0]
+            fitness_capped += caps[1]
+            # In the shared world the first dino to get there is the one kept
+            snapshot = snapshot or found
+        report_caps(frame_capped, fitness_capped, config)
+        keep_snapshot(snapshot)
+        FITNESS_CACHE.store(todo, keys)
+        archive(todo, seed, start)
+
+
+def simulate(genomes, config, seed, render=False, start=None, course=None):
+    """Plays one episode, from the start or from a hard-phase snapshot, with
+    the obstacles of `course` (by default one of its own for the seed).
+
+    Returns how many dinos each cap cut short, and the hard-phase snapshot
+    this episode took (None if it didn't take one).
+    """
+    if course is None:
+        course = Course(functools.partial(ObstacleCourse, seed, start))
+    if BATCH:
+        return play_batch(genomes, config, course, render, start)
+    return play(genomes, config, course, render, start)
+
+
+def report_caps(frame_capped, fitness_capped, config):
+    """Log the dinos an episode cap cut short this generation."""
+    if frame_capped:
+        print(
+            f"Frame cap: {frame_capped} dino(s) still running after {MAX_FRAMES} frames"
+        )
+    if fitness_capped:
+        print(
+            f"Fitness cap: {fitness_capped} dino(s) reached {config.fitness_threshold}"
+        )
+
+
+# Helper to spawn groups (Copied logic to ensure it works in trainer)
+def spawn_obstacle_group(start_x, rng):
+    group = []
+    patterns = [
+        ["L", "L"],
+        ["S", "S", "S"],
+        ["L", "L", "L"],
+        ["S", "L", "S"],
+        ["L", "S", "L"],
+    ]
+    pattern = rng.choice(patterns)
+    current_x = start_x
+    GAP = 10
+    for p in pattern:
+        if p == "S":
+            obs = SmallCactus(sprite("small_cactus"), rng)
+        else:
+            obs = LargeCactus(sprite("large_cactus"), rng)
+        obs.rect.x = current_x
+        current_x += obs.rect.width + GAP
+        group.append(obs)
+    return group
+
+
+def spawn_obstacles(obstacles, speed, rng):
+    # Spawn logic (simplified for trainer)
+    spawn_x = WIN_WIDTH + rng.randint(100, 300)
+    r = rng.random()
+    if r < 0.2:
+        obstacles.append(Bird(sprite("bird"), rng))
+        obstacles[-1].rect.x = spawn_x
+    elif speed > 18 and r < 0.7:
+        obstacles.extend(spawn_obstacle_group(spawn_x, rng))
+    else:
+        if rng.random() < 0.5:
+            obs = SmallCactus(sprite("small_cactus"), rng)
+        else:
+            obs = LargeCactus(sprite("large_cactus"), rng)
+        obs.rect.x = spawn_x
+        obstacles.append(obs)
+
+
+# Obstacle kinds by their number in a course row
+KINDS = list(OBSTACLE_KINDS)
+
+
+class ObstacleCourse:
+    """The course of a world (common/course.py): every group of obstacles, in
+    the order they spawn, as spawn_obstacles() rolls them from the world's
+    stream. A row is the group's size, then kind, type, x and y of each
+    obstacle (zeros past the group). NEAT's global `random` is left alone.
+
+    When the world spawns depends on how far its obstacles have moved, never
+    on the dinos, so this plays the world without them to find out."""
+
+    MAX_GROUP = 3  # the longest spawn_obstacle_group() pattern
+    width = 1 + 4 * MAX_GROUP
+
+    def __init__(self, seed, start=None):
+        self.rng = random.Random(seed)
+        if start is None:
+            self.obstacles, self.score = [], 0
+        else:
+            self.obstacles, self.score = restore_world(start, self.rng)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        obstacles = self.obstacles
+        while True:  # a frame of play(), minus the dinos
+            speed = get_game_speed(self.score)
+            row = None
+            if not obstacles:
+                spawn_obstacles(obstacles, speed, self.rng)
+                row = [len(obstacles)]
+                for o in obstacles:
+                    row += [KINDS.index(type(o).__name__), o.type, o.rect.x, o.rect.y]
+                row += [0] * (self.width - len(row))
+            for o in obstacles:
+                o.update(speed)
+            obstacles[:] = [o for o in obstacles if o.rect.x >= -o.rect.width]
+            self.score += speed * 0.015
+            if row is not None:
+                return row
+
+
+def course_obstacles(course, i):
+    """The course's i-th group of obstacles, as they spawn."""
+    row = course.row(i)
+    obstacles = []
+    for at in range(1, 1 + 4 * row[0], 4):
+        kind, variant, x, y = row[at : at + 4]
+        _, name = OBSTACLE_KINDS[KINDS[kind]]
+        size = sprite(name)[variant].get_size()
+        # A bird's wings start where Bird() starts them
+        state = {
+            "kind": KINDS[kind],
+            "type": variant,
+            "rect": (x, y, *size),
+            "index": 0,
+        }
+        obstacles.append(obstacle_from_state(state))
+    return obstacles
+
+
+def next_obstacle(obstacles):
+    # The AI needs to look at the NEXT obstacle, not one it has already passed.
+    # If the first obstacle is behind, look at the second one
+    if (
+        len(obstacles) > 1
+        and obstacles[0].rect.x + obstacles[0].rect.width < Dino.X_POS
+    ):
+        return obstacles[1]
+    return obstacles[0]
+
+
+def idle_frames(nets, obstacles, score, limit, capture):
+    """The frames from here on where no network can change its decision.
+
+    The world doesn't depend on the dinos, so it's played ahead on copies of
+    the obstacle rects until something other than a network could change a
+    dino's course: an obstacle reaching the dinos' column or leaving the
+    screen, the target switching, or the hard-phase snapshot. Over that
+    stretch every input stays inside a box. If the interval bounds of a
+    network keep each output on one side of 0.5 on the whole box, it jumps,
+    ducks or runs on every one of those frames. Shorter stretches are tried
+    if the long one can't be proven for every network.
+
+    The caller still plays the stretch frame by frame, only without the
+    networks. Returns the speed of every frame in the stretch and outputs that
+    make the same decisions (0 or 1 per output), or ([], None).
+    """
+    rects = [obstacle.rect.copy() for obstacle in obstacles]
+    target = next_obstacle(obstacles)
+    first = obstacles.index(target)
+    speeds, distances = [], []
+    while len(speeds) < limit:
+        speed = get_game_speed(score)
+        if speeds and capture and speed > HARD_SPEED:
+            break
+        # next_obstacle() on the rects
+        passed = len(rects) > 1 and rects[0].right < Dino.X_POS
+        if (1 if passed else 0) != first:
+            break
+        distance = (rects[first].x - Dino.X_POS) / WIN_WIDTH
+
+        for rect in rects:
+            rect.x -= speed
+        if any(
+            (rect.left < DINO_RIGHT and rect.right > Dino.X_POS) or rect.x < -rect.width
+            for rect in rects
         ):
-            best_genome = g
+            break
+        speeds.append(speed)
+        distances.append(distance)
+        score += speed * 0.015
+
+    k = len(speeds)
+    while k >= MIN_SKIP:
+        low = (
+            min(speeds[:k]) / 100,
+            min(distances[:k]),
+            target.rect.y / WIN_HEIGHT,
+            target.rect.width / WIN_WIDTH,
+        )
+        high = (max(speeds[:k]) / 100, max(distances[:k])) + low[2:]
+        out_low, out_high = nets.bounds(low, high)
+        # A hair away from 0.5, for the rounding between bounds() and activate()
+        above = out_low > 0.5 + 1e-9
+        below = out_high < 0.5 - 1e-9
+        jump, duck = above[:, 0], above[:, 1]
+        # act(): jump wins, otherwise duck, otherwise run
+        if (jump | (below[:, 0] & (duck | below[:, 1]))).all():
+            return speeds[:k], np.column_stack((jump, ~jump & duck)).astype(float)
+        k //= 2
+    return [], None
+
+
+def net_inputs(dino, target, speed):
+    # INPUTS:
+    # 1. Speed (Normalized)
+    # 2. Distance to Obstacle (Normalized)
+    # 3. Obstacle Y Height (Normalized) - Tells it if it's a bird or cactus
+    # 4. Obstacle Width (Normalized) - Tells it if it's a group
+    return (
+        speed / 100,
+        (target.rect.x - dino.rect.x) / WIN_WIDTH,
+        target.rect.y / WIN_HEIGHT,
+        target.rect.width / WIN_WIDTH,
+    )
+
+
+# What play() does with a dino after its update, as an Episode action. 0 is
+# nothing: no obstacle to look at, or no decision yet.
+JUMP, DUCK, RUN = 1, 2, 3
+
+
+class Episode:
+    """One dino alone in its world, a frame per step(), the way play() plays
+    it (the world doesn't depend on the other dinos, see eval_genome).
+    record_episode() plays it with a network, replay.py from an episode log."""
+
+    FPS = 30  # the game's frame rate, replay.py plays it at that
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.dino = Dino()
+        self.obstacles = []
+        self.score = 0
+        self.speed = get_game_speed(0)
+        self.fitness = 0
+        self.frames = 0
+        self.action = 0  # the last frame's
+
+    def step(self, action):
+        """One frame. `action` is JUMP, DUCK, RUN or 0, or a function of the
+        episode that decides it right there, where play() runs the networks
+        (only while there's an obstacle). False once the dino hit something."""
+        self.frames += 1
+        speed = self.speed = get_game_speed(self.score)
+        dino = self.dino
+        self.fitness += 0.1
+        dino.update(DummyInput())
+
+        obstacles = self.obstacles
+        if not obstacles:
+            action = 0
+        elif callable(action):
+            action = action(self)
+        self.action = action
+        if action == JUMP:
+            dino.want_jump = True
+        elif action == DUCK:
+            dino.want_duck = True
+        elif action == RUN and not dino.dino_jump:
+            dino.run()
 
+        if not obstacles:
+            spawn_obstacles(obstacles, speed, self.rng)
+        alive = True
+        rem = []
+        for obstacle in obstacles:
+            obstacle.update(speed)
+            if collide(dino, obstacle):
+                self.fitness -= 1
+                alive = False
+            if obstacle.rect.x < -obstacle.rect.width:
+                rem.append(obstacle)
+        for r in rem:
+            obstacles.remove(r)
+
+        self.score += speed * 0.015
+        return alive
+
+    def get_state(self):
+        state = world_state(self.obstacles, self.score, self.rng, self.dino.get_state())
+        return {
+            **state,
+            "speed": self.speed,
+            "fitness": self.fitness,
+            "frames": self.frames,
+        }
+
+    def set_state(self, state):
+        self.obstacles, self.score = restore_world(state, self.rng)
+        self.dino.set_state(state["dino"])
+        self.speed = state["speed"]
+        self.fitness = state["fitness"]
+        self.frames = state["frames"]
+
+    def draw(self, win):
+        draw_world(win, self.obstacles, [self.dino.sprite()], 1, self.score, GEN)
+
+
+def record_episode(genome, config, path, seed=None):
+    """Plays `genome` alone on course `seed` (a random one if None), with the
+    same caps as play(), and writes the episode log to `path`."""
+    if seed is None:
+        seed = random.Random().randrange(2**32)  # NEAT's `random` is left alone
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+    held = 0
+
+    def decide(episode):
+        nonlocal held
+        if (episode.frames - 1) % ACTION_REPEAT == 0:
+            target = next_obstacle(episode.obstacles)
+            output = net.activate(net_inputs(episode.dino, target, episode.speed))
+            held = JUMP if output[0] > 0.5 else DUCK if output[1] > 0.5 else RUN
+        return held
+
+    episode = Episode(seed)
+    actions = []
+    while not (MAX_FRAMES and episode.frames >= MAX_FRAMES):
+        alive = episode.step(decide)
+        actions.append(episode.action)
+        if not alive or episode.fitness >= config.fitness_threshold:
+            break
+
+    log = EpisodeLog(
+        "dino",
+        "trainer",
+        seed,
+        actions,
+        2,
+        genome=genome.key,
+        fitness=episode.fitness,
+        action_repeat=ACTION_REPEAT,
+    )
+    log.save(path)
+    print(f"Recorded {len(log)} frames (fitness {episode.fitness:.1f}) to {path}")
+
+
+def play(genomes, config, course, render, start=None):
     dummy_keys = DummyInput()  # Fix for crash keyboard inputs see line 93isch
 
     # Track Neural Networks, Genomes, and Dinos
     nets = []
     ge = []
     dinos = []
+    actions = []  # the decision each dino holds, None before its first one
 
     for _, g in genomes:
         g.fitness = 0
-        net = neat.nn.FeedForwardNetwork.create(g, config)
-        nets.append(net)
-        dinos.append(Dino())  # noqa: F405
+        nets.append(neat.nn.FeedForwardNetwork.create(g, config))
+        dinos.append(Dino())
         ge.append(g)
+        actions.append(None)
+    PROFILER.lap("create")
 
-    # Game Settings
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))  # noqa: F405
-    pygame.display.set_caption("Dino Run – NEAT AI")
-    clock = pygame.time.Clock()
-
-    obstacles = []
-    score = 0
-
-    # Helper to spawn groups (Copied logic to ensure it works in trainer)
-    def spawn_obstacle_group(start_x):
-        group = []
-        patterns = [
-            ["L", "L"],
-            ["S", "S", "S"],
-            ["L", "L", "L"],
-            ["S", "L", "S"],
-            ["L", "S", "L"],
-        ]
-        pattern = random.choice(patterns)
-        current_x = start_x
-        GAP = 10
-        for p in pattern:
-            if p == "S":
-                obs = SmallCactus(SMALL_CACTUS)  # noqa: F405
-            else:
-                obs = LargeCactus(LARGE_CACTUS)  # noqa: F405
-            obs.rect.x = current_x
-            current_x += obs.rect.width + GAP
-            group.append(obs)
-        return group
+    if start is None:
+        obstacles = []
+        score = 0
+    else:
+        # Any stream will do, the snapshot's is the course's
+        obstacles, score = restore_world(start, random.Random(0))
+        for dino in dinos:
+            dino.set_state(start["dino"])
+    spawned = 0  # course rows taken
+    frames = frame_capped = fitness_capped = 0
+    snapshot = None
+    capture = HARD_START_EVERY > 0 and start is None
 
     run = True
     while run:
-        clock.tick(30)  # Increase this to train faster (e.g. 100)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-                pygame.quit()
-                quit()
-                return
+        if MAX_FRAMES and frames >= MAX_FRAMES:
+            # Out of time: the dinos still running keep the fitness they have
+            frame_capped = len(dinos)
+            break
+        frames += 1
+        PROFILER.frame(len(dinos))
 
-        # The AI needs to look at the NEXT obstacle, not one it has already passed.
-        obstacle_ind = 0
-        if len(obstacles) > 0:
-            # If the first obstacle is behind, look at the second one
-            if (
-                len(obstacles) > 1
-                and obstacles[0].rect.x + obstacles[0].rect.width < dinos[0].rect.x
-            ):
-                obstacle_ind = 1
+        if capture and get_game_speed(score) > HARD_SPEED:
+            rng = course.rng_after(spawned)
+            snapshot = world_state(obstacles, score, rng, dinos[0].get_state())
+            capture = False
 
         # --- AI DECISION ---
-        speed = get_game_speed(score)  # noqa: F405
+        speed = get_game_speed(score)
 
         for x, dino in enumerate(dinos):
             # Increase fitness for surviving every frame
             ge[x].fitness += 0.1
 
             dino.update(dummy_keys)
+        PROFILER.lap("physics")
 
-            if len(obstacles) > 0:
-                target = obstacles[obstacle_ind]
-
-                # INPUTS:
-                # 1. Speed (Normalized)
-                # 2. Distance to Obstacle (Normalized)
-                # 3. Obstacle Y Height (Normalized) - Tells it if it's a bird or cactus
-                # 4. Obstacle Width (Normalized) - Tells it if it's a group
-
-                inputs = (
-                    speed / 100,
-                    (target.rect.x - dino.rect.x) / WIN_WIDTH,  # noqa: F405
-                    target.rect.y / WIN_HEIGHT,  # noqa: F405
-                    target.rect.width / WIN_WIDTH,  # noqa: F405
-                )
+        if len(obstacles) > 0:
+            target = next_obstacle(obstacles)
 
-                output = nets[x].activate(inputs)
+            decide = (frames - 1) % ACTION_REPEAT == 0
+            for x, dino in enumerate(dinos):
+                if decide:
+                    actions[x] = nets[x].activate(net_inputs(dino, target, speed))
+                    PROFILER.lap("inference")
+                output = actions[x]
+                if output is None:
+                    continue
 
                 # OUTPUTS:
                 # Output 0: Jump
@@ -137,45 +717,32 @@ def eval_genomes(genomes, config):
                     # If not jumping or ducking, ensure we are running
                     if not dino.dino_jump:
                         dino.run()
+                PROFILER.lap("physics")
 
         # --- OBSTACLE LOGIC ---
         if len(obstacles) == 0:
-            # Spawn logic (simplified for trainer)
-            spawn_x = WIN_WIDTH + random.randint(100, 300)  # noqa: F405
-            r = random.random()
-            if r < 0.2:
-                obstacles.append(Bird(BIRD))  # noqa: F405
-                obstacles[-1].rect.x = spawn_x
-            elif speed > 18 and r < 0.7:
-                obstacles.extend(spawn_obstacle_group(spawn_x))
-            else:
-                if random.random() < 0.5:
-                    obs = SmallCactus(SMALL_CACTUS)  # noqa: F405
-                else:
-                    obs = LargeCactus(LARGE_CACTUS)  # noqa: F405
-                obs.rect.x = spawn_x
-                obstacles.append(obs)
+            obstacles.extend(course_obstacles(course, spawned))
+            spawned += 1
+        PROFILER.lap("other")
 
         rem = []
         dinos_to_remove = []
 
         for obstacle in obstacles:
             obstacle.update(speed)
+            PROFILER.lap("physics")
 
-            # Check Collision
-            # Note: We use the mask logic from your game file if possible,
-            # otherwise fallback to rects for speed if needed.
-            # Assuming 'obstacle.collide' isn't a method in your snippet, we do it manually:
-
-            for i, dino in enumerate(dinos):
-                if dino.rect.colliderect(
-                    obstacle.rect
-                ):  # Simple Rect collision for speed
-                    # For pixel perfect, copy the mask code from your main() loop
-                    # But for training, Rects are often 'good enough' and faster
-                    ge[i].fitness -= 1
-                    if i not in dinos_to_remove:
-                        dinos_to_remove.append(i)
+            # Check Collision, with the same pixel-perfect test as the human
+            # game. Every dino runs at the same x, so an obstacle outside that
+            # column can't hit any of them.
+            rect = obstacle.rect
+            if rect.left < DINO_RIGHT and rect.right > Dino.X_POS:
+                for i, dino in enumerate(dinos):
+                    if collide(dino, obstacle):
+                        ge[i].fitness -= 1
+                        if i not in dinos_to_remove:
+                            dinos_to_remove.append(i)
+            PROFILER.lap("collision")
 
             if obstacle.rect.x < -obstacle.rect.width:
                 rem.append(obstacle)
@@ -188,44 +755,248 @@ def eval_genomes(genomes, config):
             dinos.pop(i)
             nets.pop(i)
             ge.pop(i)
+            actions.pop(i)
+
+        # A dino at the fitness cap is done, no need to keep it running
+        for i in reversed(range(len(dinos))):
+            if ge[i].fitness >= config.fitness_threshold:
+                dinos.pop(i)
+                nets.pop(i)
+                ge.pop(i)
+                actions.pop(i)
+                fitness_capped += 1
 
         score += speed * 0.015
+        PROFILER.lap("other")
         if len(dinos) == 0:
             break
 
-        # --- DRAWING ---
-        win.fill(WHITE)  # noqa: F405
-        pygame.draw.line(
-            win, BLACK, (0, GROUND_Y), (WIN_WIDTH, GROUND_Y), 2  # noqa: F405
-        )  # noqa: F405
+        if not render or not DASHBOARD.due():
+            continue
 
-        for dino in dinos:
-            dino.draw(win)
-        for obs in obstacles:
-            obs.draw(win)
-
-        # UI
-        text = STAT_FONT.render(f"Score: {int(score)}", 1, BLACK)  # noqa: F405
-        win.blit(text, (1000, 10))
-        text_gen = STAT_FONT.render(f"Gen: {GEN}", 1, RED)  # noqa: F405
-        win.blit(text_gen, (10, 10))
-        text_alive = STAT_FONT.render(f"Alive: {len(dinos)}", 1, RED)  # noqa: F405
-        win.blit(text_alive, (10, 50))
-
-        # Visualizer
-        if len(ge) > 0:
-            input_names = ["Speed", "Dist", "Obs Y", "Obs W"]
-            try:
-                visualizer.draw_net(
-                    win, ge[0], config, pos=(950, 100), input_names=input_names
+        # --- DASHBOARD ---
+        herd = []
+        for x in top_rows([g.fitness for g in ge]):
+            state = dinos[x].get_state()
+            herd.append([state["image"], *state["rect"][:2]])
+        DASHBOARD.publish(world_frame(obstacles, herd, len(dinos), score), ge[0])
+        PROFILER.lap("publish")
+
+    return (frame_capped, fitness_capped), snapshot
+
+
+def play_batch(genomes, config, course, render, start=None):
+    """Same rules as play(), but with a DinoBatchEnv and a BatchNetwork."""
+    ge = [g for _, g in genomes]
+    nets = BatchNetwork.create(ge, config)
+    env = DinoBatchEnv(len(ge))
+    fitness = np.zeros(len(ge))
+    PROFILER.lap("create")
+
+    if start is None:
+        obstacles = []
+        score = 0
+    else:
+        # Any stream will do, the snapshot's is the course's
+        obstacles, score = restore_world(start, random.Random(0))
+        env.set_state(start["dino"])
+    spawned = 0  # course rows taken
+    frames = frame_capped = fitness_capped = 0
+    snapshot = None
+    capture = HARD_START_EVERY > 0 and start is None
+    # Obstacle the networks couldn't be proven idle for, no use trying again
+    blocked = None
+    outputs = None  # the decisions the dinos hold, None before the first one
+
+    while len(env) > 0:
+        if MAX_FRAMES and frames >= MAX_FRAMES:
+            frame_capped = len(env)
+            break
+        frames += 1
+        PROFILER.frame(len(env))
+
+        if capture and get_game_speed(score) > HARD_SPEED:
+            rng = course.rng_after(spawned)
+            snapshot = world_state(obstacles, score, rng, env.get_state(0))
+            capture = False
+
+        # --- AI DECISION ---
+        speed = get_game_speed(score)
+
+        alive = env.ids
+        decide = (frames - 1) % ACTION_REPEAT == 0
+        if (
+            FAST_FORWARD
+            and decide
+            and not render
+            and obstacles
+            and next_obstacle(obstacles) is not blocked
+        ):
+            # This frame plus the rest of the stretch (capped so the frame and
+            # fitness caps still land on the right frame)
+            limit = MAX_FRAMES - frames + 1 if MAX_FRAMES else 10**9
+            headroom = (config.fitness_threshold - fitness[alive].max()) / 0.1
+            limit = min(limit, int(headroom) - 1)
+            speeds, proven = idle_frames(nets, obstacles, score, limit, capture)
+            if not speeds:
+                blocked = next_obstacle(obstacles)
+            else:
+                # Exactly what those frames would have done, minus the
+                # networks. Nothing can collide, nothing spawns or leaves.
+                # The proven decisions are also the ones held after it.
+                outputs = proven
+                running = not outputs.any() and env.steady().all()
+                for speed in speeds:
+                    fitness[alive] += 0.1
+                    if not running:
+                        env.update()
+                        env.act(outputs)
+                    for obstacle in obstacles:
+                        obstacle.update(speed)
+                    score += speed * 0.015
+                if running:
+                    env.keep_running(len(speeds))
+                for _ in speeds[1:]:
+                    frames += 1
+                    PROFILER.frame(len(env))
+                PROFILER.lap("fast-forward")
+                continue
+
+        fitness[alive] += 0.1
+        env.update()
+        PROFILER.lap("physics")
+
+        if len(obstacles) > 0:
+            if decide:
+                target = next_obstacle(obstacles)
+                # Every dino shares its x, so they all see the same inputs
+                inputs = (
+                    speed / 100,
+                    (target.rect.x - env.x) / WIN_WIDTH,
+                    target.rect.y / WIN_HEIGHT,
+                    target.rect.width / WIN_WIDTH,
                 )
-            except Exception as e:
-                print(e)
+                outputs = nets.activate(np.tile(inputs, (len(env), 1)))
+                PROFILER.lap("inference")
+            if outputs is not None:
+                env.act(outputs)
+            PROFILER.lap("physics")
+
+        # --- OBSTACLE LOGIC ---
+        if len(obstacles) == 0:
+            obstacles.extend(course_obstacles(course, spawned))
+            spawned += 1
+        PROFILER.lap("other")
+
+        rem = []
+        dead = np.zeros(len(env), dtype=bool)
+
+        for obstacle in obstacles:
+            obstacle.update(speed)
+            PROFILER.lap("physics")
+
+            hits = env.collide(obstacle)
+            if hits is not None:
+                fitness[alive[hits]] -= 1
+                dead |= hits
+            PROFILER.lap("collision")
+
+            if obstacle.rect.x < -obstacle.rect.width:
+                rem.append(obstacle)
+
+        for r in rem:
+            obstacles.remove(r)
+
+        capped = ~dead & (fitness[alive] >= config.fitness_threshold)
+        fitness_capped += int(capped.sum())
+        dead |= capped
+        if dead.any():
+            env.kill(dead)
+            nets = nets.subset(~dead)
+            if outputs is not None:
+                outputs = outputs[~dead]
+
+        score += speed * 0.015
+        PROFILER.lap("other")
+
+        if render and len(env) > 0 and DASHBOARD.due():
+            rows = top_rows(fitness[env.ids])
+            herd = [[f, env.x, y] for f, y in zip(env.frame[rows], env.y[rows])]
+            frame = world_frame(obstacles, herd, len(env), score)
+            DASHBOARD.publish(frame, ge[env.ids[0]])
+            PROFILER.lap("publish")
+
+    for g, f in zip(ge, fitness):
+        g.fitness = float(f)
+
+    return (frame_capped, fitness_capped), snapshot
+
+
+def top_rows(fitness):
+    """Indices of the dinos to draw: the DRAW_TOP fittest, in their order."""
+    if DRAW_TOP <= 0 or len(fitness) <= DRAW_TOP:
+        return np.arange(len(fitness))
+    return np.sort(np.argsort(-np.asarray(fitness), kind="stable")[:DRAW_TOP])
 
-        pygame.display.update()
 
+def world_frame(obstacles, herd, alive, score):
+    """A frame for the dashboard: the obstacles, the dinos to draw as
+    [sprite frame, x, y], how many are alive and the score."""
+    return {
+        "generation": GEN,
+        "obstacles": [obstacle.get_state() for obstacle in obstacles],
+        "dinos": [[int(v) for v in dino] for dino in herd],
+        "alive": alive,
+        "score": score,
+    }
+
+
+def draw_world(win, obstacles, sprites, alive, score, generation):
+    """Everything but the network. `sprites` are the dinos' (image, position)
+    pairs, Dino.sprite() or DinoBatchEnv.sprites(), blitted in one go."""
+    win.fill(WHITE)
+    pygame.draw.line(win, BLACK, (0, GROUND_Y), (WIN_WIDTH, GROUND_Y), 2)
+
+    win.blits(sprites, doreturn=False)
+    for obs in obstacles:
+        obs.draw(win)
+
+    # UI
+    win.blit(text(stat_font(), f"Score: {int(score)}", BLACK), (1000, 10))
+    win.blit(text(stat_font(), f"Gen: {generation}", RED), (10, 10))
+    win.blit(text(stat_font(), f"Alive: {alive}", RED), (10, 50))
+
+
+def draw_frame(win, world, genome, config):
+    """Draws a world_frame() with the network of `genome`, for dashboard.py."""
+    obstacles = [obstacle_from_state(state) for state in world["obstacles"]]
+    images = [converted(img) for img in sprite_frames()]
+    sprites = [(images[f], (x, y)) for f, x, y in world["dinos"]]
+    draw_world(
+        win, obstacles, sprites, world["alive"], world["score"], world["generation"]
+    )
+
+    # Visualizer
+    input_names = ["Speed", "Dist", "Obs Y", "Obs W"]
+    try:
+        visualizer.draw_net(
+            win, genome, config, pos=(950, 100), input_names=input_names
+        )
+    except Exception as e:
+        print(e)
+
+
+def open_dashboard():
+    """Starts publishing frames, and the viewer that shows them."""
+    global DASHBOARD
+    DASHBOARD = Publisher("dino")
+    viewer = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+    subprocess.Popen([sys.executable, viewer])
+
+
+def run(config_path, resume=None):
+    global GEN, HALL_OF_FAME
 
-def run(config_path):
     config = neat.config.Config(
         neat.DefaultGenome,
         neat.DefaultReproduction,
@@ -233,34 +1004,271 @@ def run(config_path):
         neat.DefaultStagnation,
         config_path,
     )
-    p = neat.Population(config)
+
+    HALL_OF_FAME = HallOfFame(
+        HALL_OF_FAME_DIR, config_hash(config_path), HALL_OF_FAME_SIZE
+    )
+
+    # With a fixed seed the whole run (evolution + every world) is reproducible
+    if SEED is not None:
+        random.seed(SEED)
+
+    if resume:
+        # Restores the population, species and NEAT's random state as saved
+        p = neat.Checkpointer.restore_checkpoint(resume)
+        GEN = p.generation
+        restore_state(AsyncCheckpointer.restore_extra(resume))
+        print(f"Resuming from {resume} at generation {p.generation}")
+    else:
+        p = neat.Population(config)
+    if MAX_FITNESS is not None:
+        # The cap is the threshold: NEAT ends the run once a dino reaches it
+        p.config.fitness_threshold = MAX_FITNESS
     p.add_reporter(neat.StdOutReporter(True))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
+    if PROFILER.enabled:
+        p.add_reporter(PROFILER)
+
+    checkpointer = None
+    if CHECKPOINT_EVERY > 0 or CHECKPOINT_MINUTES > 0:
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        checkpointer = AsyncCheckpointer(
+            CHECKPOINT_EVERY or None,
+            CHECKPOINT_MINUTES * 60 or None,
+            filename_prefix=os.path.join(CHECKPOINT_DIR, "neat-checkpoint-"),
+            keep=KEEP_CHECKPOINTS,
+            extra=checkpoint_state,
+        )
+        checkpointer.last_generation_checkpoint = p.generation
+        p.add_reporter(checkpointer)
+
+    evaluator = None
+    evaluate = eval_genomes
+    if WORKERS > 0:
+        evaluator = ParallelEvaluator(WORKERS)
+        evaluate = evaluator.evaluate
+    elif not HEADLESS or RENDER_EVERY > 0:
+        open_dashboard()
 
     try:
-        winner = p.run(eval_genomes, 100)
-        save_winner(winner)
+        p.run(evaluate, 100 - p.generation)
+        save_winner(p.config)
     except KeyboardInterrupt:
         print("\nUser interrupted! Saving best bird found so far...")
-        save_winner(best_genome)
+        save_winner(p.config)
+        # Nothing new to save if the last generation was just checkpointed
+        if checkpointer and checkpointer.last_generation_checkpoint != p.generation:
+            checkpointer.save_checkpoint(
+                p.config, p.population, p.species, p.generation
+            )
     except Exception as e:
         print(f"\nCrash! {e}. Saving best bird found so far...")
-        if best_genome:
-            save_winner(best_genome)
+        save_winner(p.config)
+        if checkpointer and checkpointer.last_generation_checkpoint != p.generation:
+            checkpointer.save_checkpoint(
+                p.config, p.population, p.species, p.generation
+            )
+    finally:
+        if evaluator:
+            evaluator.close()
+        if checkpointer:
+            checkpointer.wait()
+        DASHBOARD.close()
 
 
-def save_winner(winner):
-    if winner:
-        print(f"\nSaving champion with fitness: {winner.fitness}")
-        with open("winner.pkl", "wb") as f:
-            pickle.dump(winner, f)
-        print("Done!")
-    else:
+def save_winner(config):
+    """The run's champion from the hall of fame, compiled into the archive's
+    folder for anything that only wants to run it (NumPy only), and its
+    episode with --record."""
+    entry = HALL_OF_FAME.best(run=HALL_OF_FAME.run)
+    if entry is None:
         print("No valid genome to save.")
+        return
+    winner = HALL_OF_FAME.load(entry, config)
+    path = HALL_OF_FAME.path_for(entry, ".npz")
+    print(f"\nSaving champion with fitness: {winner.fitness}")
+    CompiledNetwork.create(winner, config).save(path)
+    print(f"Done! {path}")
+    if RECORD:
+        record_episode(winner, config, RECORD, SEED)
+
+
+def record_winner(config_path, path):
+    """Records the episode of the hall of fame's best genome, no training."""
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        config_path,
+    )
+    if MAX_FITNESS is not None:
+        config.fitness_threshold = MAX_FITNESS
+    hall = HallOfFame(HALL_OF_FAME_DIR, config_hash(config_path))
+    entry = hall.best()
+    if entry is None:
+        raise SystemExit(f"No genome trained under {config_path} in {HALL_OF_FAME_DIR}")
+    winner = hall.load(entry, config)
+    record_episode(winner, config, path, SEED)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train Dino Run with NEAT")
+    parser.add_argument("--headless", action="store_true", help="no dashboard")
+    parser.add_argument(
+        "--render-every",
+        type=int,
+        default=RENDER_EVERY,
+        metavar="N",
+        help="headless only: preview every Nth generation",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        metavar="N",
+        help="evaluate genomes in N worker processes (implies no dashboard)",
+    )
+    parser.add_argument("--seed", type=int, default=SEED, help="base obstacle seed")
+    parser.add_argument(
+        "--fixed-seed",
+        action="store_true",
+        help="every generation replays --seed (lets the fitness cache hit)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=CACHE_SIZE,
+        metavar="N",
+        help="remember the fitness of N genome/seed pairs (0 = off)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="simulate the dinos and their networks as NumPy arrays",
+    )
+    parser.add_argument(
+        "--fast-forward",
+        action="store_true",
+        help="skip the network calls where none of them can change its mind; "
+        "the world still steps every frame, so only inference time is saved "
+        "(implies --batch)",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=CHECKPOINT_EVERY,
+        metavar="N",
+        help="save a checkpoint every N generations (0 = off)",
+    )
+    parser.add_argument(
+        "--checkpoint-minutes",
+        type=float,
+        default=CHECKPOINT_MINUTES,
+        metavar="M",
+        help="also save a checkpoint every M minutes",
+    )
+    parser.add_argument(
+        "--keep-checkpoints",
+        type=int,
+        default=KEEP_CHECKPOINTS,
+        metavar="N",
+        help="only keep the newest N checkpoints (0 = keep all)",
+    )
+    parser.add_argument(
+        "--hall-of-fame",
+        type=int,
+        default=HALL_OF_FAME_SIZE,
+        metavar="N",
+        help="keep the run's N fittest genomes in hall_of_fame/",
+    )
+    parser.add_argument(
+        "--resume", metavar="PATH", help="continue training from a checkpoint"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="append per-phase timings of every generation to this JSONL file",
+    )
+    parser.add_argument(
+        "--max-frames",
+        type=int,
+        default=MAX_FRAMES,
+        metavar="N",
+        help="end each episode after N frames (0 = no cap)",
+    )
+    parser.add_argument(
+        "--max-fitness",
+        type=float,
+        default=MAX_FITNESS,
+        metavar="F",
+        help="a dino is done at fitness F, and the run stops once one is "
+        "(default: fitness_threshold from config.txt)",
+    )
+    parser.add_argument(
+        "--hard-start-every",
+        type=int,
+        default=HARD_START_EVERY,
+        metavar="N",
+        help="every Nth generation starts where cactus groups show up (0 = off)",
+    )
+    parser.add_argument(
+        "--action-repeat",
+        type=int,
+        default=ACTION_REPEAT,
+        metavar="K",
+        help="the networks only decide every Kth frame",
+    )
+    parser.add_argument(
+        "--draw-top",
+        type=int,
+        default=DRAW_TOP,
+        metavar="K",
+        help="only draw the K fittest dinos (0 = all)",
+    )
+    parser.add_argument(
+        "--record",
+        default=RECORD,
+        metavar="PATH",
+        help="write the champion's episode log here when training ends (replay.py)",
+    )
+    parser.add_argument(
+        "--record-winner",
+        metavar="PATH",
+        help="write the hall of fame's best episode log here and exit, no training",
+    )
+    args = parser.parse_args()
+    HEADLESS = HEADLESS or args.headless
+    RENDER_EVERY = args.render_every
+    WORKERS = args.workers
+    SEED = args.seed
+    FIXED_SEED = FIXED_SEED or args.fixed_seed
+    if FIXED_SEED and SEED is None:
+        parser.error("--fixed-seed needs --seed")
+    FITNESS_CACHE = FitnessCache(args.cache_size)
+    FAST_FORWARD = FAST_FORWARD or args.fast_forward
+    BATCH = BATCH or args.batch or FAST_FORWARD
+    CHECKPOINT_EVERY = args.checkpoint_every
+    CHECKPOINT_MINUTES = args.checkpoint_minutes
+    KEEP_CHECKPOINTS = args.keep_checkpoints
+    if args.hall_of_fame < 1:
+        parser.error("--hall-of-fame must be at least 1")
+    HALL_OF_FAME_SIZE = args.hall_of_fame
+    if args.profile:
+        PROFILER = Profiler(args.profile)
+    MAX_FRAMES = args.max_frames
+    MAX_FITNESS = args.max_fitness
+    HARD_START_EVERY = args.hard_start_every
+    if args.action_repeat < 1:
+        parser.error("--action-repeat must be at least 1")
+    ACTION_REPEAT = args.action_repeat
+    DRAW_TOP = args.draw_top
+    RECORD = args.record
+
     local_dir = os.path.dirname(__file__)
     config_path = os.path.join(local_dir, "config.txt")
-    run(config_path)
+    if args.record_winner:
+        record_winner(config_path, args.record_winner)
+    else:
+        run(config_path, resume=args.resume)
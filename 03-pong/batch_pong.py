@@ -0,0 +1,304 @@
+import random
+
+import numpy as np
+import pygame
+
+from pong import Ball, Paddle, LEVELS, MAX_STEPS, WIN_WIDTH, WIN_HEIGHT, WHITE, BLACK
+from pong import font, text
+
+BOT_SKILL = np.array([level["bot"] for level in LEVELS])
+LEVEL_HITS = np.array([level["hits"] for level in LEVELS])
+LEFT_X = 10
+RIGHT_X = WIN_WIDTH - 30
+PADDLE_MAX_Y = WIN_HEIGHT - Paddle.HEIGHT
+
+
+class WordStreams:
+    """The raw 32-bit output of random.Random(seed), one cursor per match.
+
+    random.Random.random() eats two words and getrandbits(k<=32) one, so
+    reading the same words the same way reproduces exactly what a match's own
+    random.Random(seed) would have drawn. Matches sharing a seed share the
+    words; each only moves its own cursor. Words are generated in chunks as
+    the cursors run ahead.
+
+    With a random.Random.getstate() `state`, every stream picks up from
+    there instead of from its seed.
+    """
+
+    CHUNK = 1 << 14
+
+    def __init__(self, seeds, state=None):
+        unique, self.row = np.unique(seeds, return_inverse=True)
+        self.rngs = [random.Random(int(seed)) for seed in unique]
+        if state is not None:
+            for rng in self.rngs:
+                rng.setstate(state)
+        self.start_states = [rng.getstate() for rng in self.rngs]
+        self.words = np.empty((len(unique), 0), dtype=np.uint64)
+        self.cursor = np.zeros(len(seeds), dtype=np.int64)
+
+    def take(self, rows, count):
+        """`count` words for each match in `rows` (index array)."""
+        end = self.cursor[rows] + count
+        if len(end) and end.max() > self.words.shape[1]:
+            self._grow(end.max())
+        cols = self.cursor[rows, None] + np.arange(count)
+        self.cursor[rows] = end
+        return self.words[self.row[rows, None], cols]
+
+    def getstate(self, match):
+        """random.Random.getstate() of one match's stream, at its cursor."""
+        rng = random.Random()
+        rng.setstate(self.start_states[self.row[match]])
+        rng.getrandbits(32 * int(self.cursor[match]))  # one word per 32 bits
+        return rng.getstate()
+
+    def _grow(self, size):
+        chunks = -(-(size - self.words.shape[1]) // self.CHUNK)
+        n = chunks * self.CHUNK
+        new = [
+            np.frombuffer(rng.getrandbits(32 * n).to_bytes(4 * n, "little"), "<u4")
+            for rng in self.rngs
+        ]
+        self.words = np.concatenate((self.words, np.stack(new)), axis=1)
+
+    def random(self, rows):
+        """random.Random.random() for each match in `rows`."""
+        w = self.take(rows, 2)
+        return ((w[:, 0] >> 5) * 67108864.0 + (w[:, 1] >> 6)) * (
+            1.0 / 9007199254740992.0
+        )
+
+    def uniform(self, rows, a, b):
+        return a + (b - a) * self.random(rows)
+
+    def choice2(self, rows):
+        """random.Random.choice of a 2-item list: the index, 0 or 1."""
+        # _randbelow(2) draws 2 bits and retries on 2 or 3
+        result = self.take(rows, 1)[:, 0] >> 30
+        retry = result >= 2
+        while retry.any():
+            result[retry] = self.take(rows[retry], 1)[:, 0] >> 30
+            retry = result >= 2
+        return result.astype(np.int64)
+
+
+class BatchPong:
+    """N independent pong matches as arrays, one PongTrainer per row.
+
+    Each step does what PongTrainer.step does for every match at once: the
+    AI paddle move, Game.loop (ball, bot with its aim error, walls, paddle
+    hits with the hit-angle formula, scoring) and the reward shaping and
+    level-ups on top. Every match draws from its own random.Random(seed)
+    stream (see WordStreams), so the results are the same as PongTrainer's.
+
+    The arrays only hold living matches; `ids` maps each row back to its
+    index in the population, and kill() drops rows. `fitness` is indexed by
+    population index, so it keeps the scores of dead matches too.
+
+    With a PongTrainer state as `start`, every match starts from there (with
+    a fresh step budget) instead of from the serve.
+    """
+
+    def __init__(self, n, seed=None, start=None):
+        seeds = np.broadcast_to(random.randrange(2**32) if seed is None else seed, (n,))
+        self.rng = WordStreams(seeds)
+        self.ids = np.arange(n)
+        self.fitness = np.zeros(n)
+        self.steps = 0  # all matches start together
+
+        self.left_y = np.full(n, float(WIN_HEIGHT // 2 - 50))
+        self.right_y = np.full(n, float(WIN_HEIGHT // 2 - 50))
+        self.hits = np.zeros(n, dtype=np.int64)
+        self.level = np.zeros(n, dtype=np.int64)
+
+        self.ball_x = np.zeros(n)
+        self.ball_y = np.zeros(n)
+        self.x_vel = np.zeros(n)
+        self.y_vel = np.zeros(n)
+        self.speed = np.zeros(n)
+        if start is None:
+            self.reset_ball(np.ones(n, dtype=bool), np.ones(n))
+        else:
+            self.set_state(start)
+            self.steps = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_state(self, row):
+        """PongTrainer.get_state() of one match."""
+        return {
+            "game": {
+                "left": {"x": LEFT_X, "y": float(self.left_y[row])},
+                "right": {"x": RIGHT_X, "y": float(self.right_y[row])},
+                "ball": {
+                    "x": float(self.ball_x[row]),
+                    "y": float(self.ball_y[row]),
+                    "speed": float(self.speed[row]),
+                    "x_vel": float(self.x_vel[row]),
+                    "y_vel": float(self.y_vel[row]),
+                },
+                "hits": int(self.hits[row]),
+                "rng": self.rng.getstate(self.ids[row]),
+            },
+            "level": int(self.level[row]),
+            "steps": self.steps,
+        }
+
+    def set_state(self, state):
+        """Puts every match in the same PongTrainer.get_state() state."""
+        game = state["game"]
+        seeds = np.zeros(len(self.fitness), dtype=np.int64)
+        self.rng = WordStreams(seeds, game["rng"])
+        self.steps = state["steps"]
+        self.level[:] = state["level"]
+        self.hits[:] = game["hits"]
+        self.left_y[:] = game["left"]["y"]
+        self.right_y[:] = game["right"]["y"]
+        self.ball_x[:] = game["ball"]["x"]
+        self.ball_y[:] = game["ball"]["y"]
+        self.speed[:] = game["ball"]["speed"]
+        self.x_vel[:] = game["ball"]["x_vel"]
+        self.y_vel[:] = game["ball"]["y_vel"]
+
+    def reset_ball(self, mask, difficulty):
+        """Ball.reset for the matches in `mask` (difficulty per match)."""
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return
+        self.ball_x[rows] = WIN_WIDTH // 2
+        self.ball_y[rows] = WIN_HEIGHT // 2
+        self.speed[rows] = 1.0 + difficulty[rows] * 0.1
+        # Same draws and order as Ball.reset: choice([-1, 1]), uniform(-4, 4)
+        sign = self.rng.choice2(self.ids[rows]) * 2 - 1
+        self.x_vel[rows] = sign * Ball.BASE_SPEED
+        self.y_vel[rows] = self.rng.uniform(self.ids[rows], -4, 4)
+
+    def inputs(self):
+        return np.column_stack(
+            (
+                self.left_y / WIN_HEIGHT,
+                self.ball_y / WIN_HEIGHT,
+                np.abs(self.ball_x - LEFT_X) / WIN_WIDTH,
+                self.x_vel / 10,
+                self.y_vel / 10,
+            )
+        )
+
+    def step(self, move_up):
+        """One PongTrainer.step for every match. Returns the bool array of
+        matches that ended (missed the ball, or ran out of steps)."""
+        self.steps += 1
+        bot = BOT_SKILL[self.level]
+        ids = self.ids
+
+        # AI paddle
+        v = float(Paddle.VEL)
+        self.left_y = np.clip(self.left_y + np.where(move_up, -v, v), 0, PADDLE_MAX_Y)
+
+        # --- Game.loop ---
+        self.ball_x += self.x_vel * self.speed
+        self.ball_y += self.y_vel * self.speed
+
+        # Bot paddle, aiming with an error that shrinks with skill
+        error = (1 - bot) * 150
+        target = self.ball_y + self.rng.uniform(ids, -error, error)
+        center = self.right_y + Paddle.HEIGHT / 2
+        down = target > center
+        up = ~down & (target < center)
+        move = Paddle.VEL * bot
+        self.right_y = np.clip(
+            self.right_y + np.where(down, move, np.where(up, -move, 0.0)),
+            0,
+            PADDLE_MAX_Y,
+        )
+
+        # Walls
+        top = self.ball_y <= 0
+        bottom = ~top & (self.ball_y >= WIN_HEIGHT)
+        self.y_vel[top] = np.abs(self.y_vel[top])
+        self.y_vel[bottom] = -np.abs(self.y_vel[bottom])
+
+        # Paddles (only the one the ball flies towards)
+        coming = self.x_vel < 0
+        left_hit = (
+            coming
+            & (self.ball_y >= self.left_y)
+            & (self.ball_y <= self.left_y + Paddle.HEIGHT)
+            & (self.ball_x - Ball.RADIUS <= LEFT_X + Paddle.WIDTH)
+        )
+        right_hit = (
+            ~coming
+            & (self.ball_y >= self.right_y)
+            & (self.ball_y <= self.right_y + Paddle.HEIGHT)
+            & (self.ball_x + Ball.RADIUS >= RIGHT_X)
+        )
+        self.hits += left_hit
+        hit = left_hit | right_hit
+        if hit.any():
+            paddle_y = np.where(left_hit, self.left_y, self.right_y)[hit]
+            diff_y = paddle_y + Paddle.HEIGHT / 2 - self.ball_y[hit]
+            self.x_vel[hit] *= -1
+            self.y_vel[hit] = -1 * (diff_y / (Paddle.HEIGHT / 2) * 5)
+            self.y_vel[hit] += self.rng.uniform(ids[hit], -1, 1)
+
+        # Scoring
+        dead = self.ball_x < 0
+        self.reset_ball(~dead & (self.ball_x > WIN_WIDTH), bot)
+
+        # --- Rewards (PongTrainer.step) ---
+        paddle_center_y = self.left_y + 50
+        attack = self.x_vel < 0
+        diff = np.abs(paddle_center_y - np.where(attack, self.ball_y, WIN_HEIGHT / 2))
+        reward = (1.0 - diff / WIN_HEIGHT) ** 2
+        fitness = self.fitness[ids] + reward * np.where(attack, 0.1, 0.05)
+        fitness += np.where(self.hits > 0, 5, 0)
+
+        # Level up
+        level_up = self.hits >= LEVEL_HITS[self.level]
+        fitness += np.where(level_up, 50, 0)
+        self.fitness[ids] = fitness
+        if level_up.any():
+            self.hits[level_up] = 0
+            self.level[level_up] = np.minimum(self.level[level_up] + 1, len(LEVELS) - 1)
+            self.reset_ball(level_up, BOT_SKILL[self.level])
+
+        if self.steps > MAX_STEPS:
+            dead[:] = True
+        return dead
+
+    def kill(self, dead):
+        keep = ~dead
+        for name in (
+            "ids",
+            "left_y",
+            "right_y",
+            "hits",
+            "level",
+            "ball_x",
+            "ball_y",
+            "x_vel",
+            "y_vel",
+            "speed",
+        ):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def draw(self, win, row=0):
+        """Game.draw for one match."""
+        win.fill(BLACK)
+        for x, y in ((LEFT_X, self.left_y[row]), (RIGHT_X, self.right_y[row])):
+            rect = pygame.Rect(x, 0, Paddle.WIDTH, Paddle.HEIGHT)
+            rect.y = y
+            pygame.draw.rect(win, WHITE, rect)
+        pygame.draw.circle(
+            win,
+            WHITE,
+            (int(self.ball_x[row]), int(self.ball_y[row])),
+            Ball.RADIUS,
+        )
+
+        level_name = LEVELS[self.level[row]]["name"]
+        label = text(font(), f"{level_name} | Hits: {self.hits[row]}", (255, 255, 0))
+        win.blit(label, (10, 10))
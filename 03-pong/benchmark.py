@@ -0,0 +1,13 @@
+"""Frames per second of train_neat.py's training paths, as JSON. See
+common/benchmark.py for the options.
+
+    python benchmark.py --out bench.json
+"""
+
+import os
+
+import common_path  # noqa: F401
+from common.benchmark import main
+
+if __name__ == "__main__":
+    main("pong", "pong", os.path.dirname(os.path.abspath(__file__)))
@@ -1,5 +1,6 @@
 import pygame
 import random
+import functools
 
 # ==================== CONFIG ====================
 WIN_WIDTH = 700
@@ -19,9 +20,18 @@ MAX_STEPS = 6000  # Timeout to kill stuck genomes
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-pygame.init()
-pygame.font.init()
-FONT = pygame.font.SysFont("comicsans", 24)
+
+# Loaded on first use, so importing the game needs no display
+@functools.cache
+def font():
+    pygame.font.init()
+    return pygame.font.SysFont("comicsans", 24)
+
+
+@functools.lru_cache(maxsize=64)
+def text(font, string, color):
+    """font.render() that only renders again when the string changes."""
+    return font.render(string, True, color)
 
 
 # ==================== GAME OBJECTS ====================
@@ -42,12 +52,22 @@ class Paddle:
         self.y = max(0, min(WIN_HEIGHT - self.HEIGHT, self.y))
         self.rect.y = self.y
 
+    def get_state(self):
+        return {"x": self.x, "y": self.y}
+
+    def set_state(self, state):
+        self.x = state["x"]
+        self.y = state["y"]
+        self.rect.x = self.x
+        self.rect.y = self.y
+
 
 class Ball:
     BASE_SPEED = 6
     RADIUS = 7
 
-    def __init__(self):
+    def __init__(self, rng=random):
+        self.rng = rng  # any random.Random, or the module itself
         self.reset(1.0)
 
     def reset(self, difficulty):
@@ -58,28 +78,62 @@ class Ball:
         self.speed = 1.0 + (difficulty * 0.1)
 
         # Ensure it doesn't spawn moving vertically perfectly
-        self.x_vel = random.choice([-1, 1]) * self.BASE_SPEED
-        self.y_vel = random.uniform(-4, 4)
+        self.x_vel = self.rng.choice([-1, 1]) * self.BASE_SPEED
+        self.y_vel = self.rng.uniform(-4, 4)
 
     def move(self):
         self.x += self.x_vel * self.speed
         self.y += self.y_vel * self.speed
 
+    def get_state(self):
+        return {
+            "x": self.x,
+            "y": self.y,
+            "speed": self.speed,
+            "x_vel": self.x_vel,
+            "y_vel": self.y_vel,
+        }
+
+    def set_state(self, state):
+        self.x = state["x"]
+        self.y = state["y"]
+        self.speed = state["speed"]
+        self.x_vel = state["x_vel"]
+        self.y_vel = state["y_vel"]
+
 
 class Game:
-    def __init__(self):
+    def __init__(self, rng=random):
+        self.rng = rng
         self.left = Paddle(10, WIN_HEIGHT // 2 - 50)
         self.right = Paddle(WIN_WIDTH - 30, WIN_HEIGHT // 2 - 50)
-        self.ball = Ball()
+        self.ball = Ball(self.rng)
         self.hits = 0
 
+    def get_state(self):
+        return {
+            "left": self.left.get_state(),
+            "right": self.right.get_state(),
+            "ball": self.ball.get_state(),
+            "hits": self.hits,
+            # The ball shares this stream
+            "rng": self.rng.getstate(),
+        }
+
+    def set_state(self, state):
+        self.left.set_state(state["left"])
+        self.right.set_state(state["right"])
+        self.ball.set_state(state["ball"])
+        self.hits = state["hits"]
+        self.rng.setstate(state["rng"])
+
     def loop(self, bot_skill):
         self.ball.move()
 
         # --- BOT LOGIC (Right Paddle) ---
         # Add error based on skill (1.0 = Perfect, 0.0 = Blind)
         error = (1 - bot_skill) * 150
-        target = self.ball.y + random.uniform(-error, error)
+        target = self.ball.y + self.rng.uniform(-error, error)
 
         if target > self.right.y + Paddle.HEIGHT / 2:
             self.right.move(up=False, speed=bot_skill)
@@ -110,7 +164,7 @@ class Game:
                 self.ball.y_vel = -1 * (diff_y / (Paddle.HEIGHT / 2) * 5)
 
                 # Add randomness to prevent loops
-                self.ball.y_vel += random.uniform(-1, 1)
+                self.ball.y_vel += self.rng.uniform(-1, 1)
 
         # --- RIGHT PADDLE (BOT) ---
         else:
@@ -125,7 +179,7 @@ class Game:
                 middle_y = self.right.y + Paddle.HEIGHT / 2
                 diff_y = middle_y - self.ball.y
                 self.ball.y_vel = -1 * (diff_y / (Paddle.HEIGHT / 2) * 5)
-                self.ball.y_vel += random.uniform(-1, 1)
+                self.ball.y_vel += self.rng.uniform(-1, 1)
 
         # --- SCORING ---
         if self.ball.x < 0:
@@ -144,5 +198,5 @@ class Game:
         )
 
         # UI
-        text = FONT.render(f"{level_name} | Hits: {self.hits}", True, (255, 255, 0))
-        win.blit(text, (10, 10))
+        label = text(font(), f"{level_name} | Hits: {self.hits}", (255, 255, 0))
+        win.blit(label, (10, 10))
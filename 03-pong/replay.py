@@ -0,0 +1,18 @@
+"""Plays an episode log back without the network: the best genome's match of
+a training run (train_neat.py --record). See common/episode_log.py for the
+options.
+
+    python replay.py best.eplog --speed 4
+"""
+
+import pong
+import common_path  # noqa: F401
+import train_neat
+from common.episode_log import main
+
+# The rules a log was played by, and the Episode that plays them again. Pong
+# has no human loop, only the trainer's matches.
+EPISODES = {"trainer": train_neat.PongMatch}
+
+if __name__ == "__main__":
+    main("pong", EPISODES, (pong.WIN_WIDTH, pong.WIN_HEIGHT))
@@ -1,31 +1,162 @@
-import pygame
 import neat
 import os
+import random
+import argparse
+import multiprocessing
+import subprocess
+import sys
+import itertools
+import numpy as np
 import visualizer
+import common_path  # noqa: F401
+from collections import deque
+from common.batch_net import BatchNetwork
+from common.fitness_cache import FitnessCache
+from common.checkpointer import AsyncCheckpointer, node_ids_kept
+from batch_pong import BatchPong
+from common.episode_log import EpisodeLog
+from common.compiled_net import CompiledNetwork
+from common.profiler import Profiler, NullProfiler
+from common.hall_of_fame import HallOfFame, config_hash
+from common.dashboard import Publisher, NullPublisher
 
 # Import specific items from pong so we can use them
 from pong import Game, LEVELS, MAX_STEPS, WIN_WIDTH, WIN_HEIGHT, FPS
 
-# Initialize Font ONCE
-pygame.init()
-pygame.font.init()
-
-
-class PongTrainer:
-    def __init__(self, genome, config):
-        self.genome = genome
-        self.net = neat.nn.FeedForwardNetwork.create(genome, config)
-        self.game = Game()
+GEN = 0
+# Headless: no dashboard. Shown or not, generations train as fast as the CPU allows.
+HEADLESS = os.environ.get("NEAT_HEADLESS", "0") == "1"
+# When headless, still show every Nth generation on the dashboard (0 = never)
+RENDER_EVERY = int(os.environ.get("NEAT_RENDER_EVERY", "0"))
+# Worker processes for genome evaluation (0 = everything on this process)
+WORKERS = int(os.environ.get("NEAT_WORKERS", "0"))
+# Base seed for serves and bot errors; generation N plays SEED + N (None = random)
+SEED = int(os.environ["NEAT_SEED"]) if os.environ.get("NEAT_SEED") else None
+# Replay the same seed every generation (needs a SEED), so the cache can hit
+FIXED_SEED = os.environ.get("NEAT_FIXED_SEED", "0") == "1"
+# Remembers the fitness of genomes already played on the same seed (0 = off)
+CACHE_SIZE = int(os.environ.get("NEAT_CACHE_SIZE", "256"))
+FITNESS_CACHE = FitnessCache(CACHE_SIZE)
+# Play every match as NumPy arrays (BatchPong) and run every network in one
+# batched call (BatchNetwork) instead of PongTrainer objects and activate()
+BATCH = os.environ.get("NEAT_BATCH", "0") == "1"
+# The networks decide every Nth frame and the paddles keep moving that way in
+# between (1 = every frame)
+ACTION_REPEAT = int(os.environ.get("NEAT_ACTION_REPEAT", "1"))
+# Checkpoint every N generations and/or every M minutes (0 = off)
+CHECKPOINT_EVERY = int(os.environ.get("NEAT_CHECKPOINT_EVERY", "10"))
+CHECKPOINT_MINUTES = float(os.environ.get("NEAT_CHECKPOINT_MINUTES", "0"))
+# Only the newest N checkpoints are kept on disk (0 = keep all)
+KEEP_CHECKPOINTS = int(os.environ.get("NEAT_KEEP_CHECKPOINTS", "3"))
+# The hall of fame keeps every run's N fittest genomes of each level reached
+# (common/hall_of_fame.py)
+HALL_OF_FAME_SIZE = int(os.environ.get("NEAT_HALL_OF_FAME", "10"))
+# Every Nth generation starts from a snapshot of a "Pro" match instead of
+# replaying the easy levels (0 = never, and no snapshots are taken)
+HARD_START_EVERY = int(os.environ.get("NEAT_HARD_START_EVERY", "0"))
+# LEVELS index of "Pro", the snapshot is taken as a match gets there
+HARD_LEVEL = 2
+# The newest hard-phase snapshots, taken from earlier matches
+SNAPSHOTS = deque(maxlen=8)
+SNAPSHOT_IDS = itertools.count()
+# Write per-phase timings of every generation to this JSON lines file
+PROFILER = (
+    Profiler(os.environ["NEAT_PROFILE"])
+    if os.environ.get("NEAT_PROFILE")
+    else NullProfiler()
+)
+# Write the best genome's match to this file when training ends, for replay.py
+RECORD = os.environ.get("NEAT_RECORD") or None
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+HALL_OF_FAME_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "hall_of_fame"
+)
+HALL_OF_FAME = None  # opened by run()
+# Where shown generations publish their frames (common/dashboard.py)
+DASHBOARD = NullPublisher()  # opened by run()
+
+
+def should_render():
+    if not HEADLESS:
+        return True
+    return RENDER_EVERY > 0 and GEN % RENDER_EVERY == 0
+
+
+def generation_seed():
+    if SEED is None:
+        return random.randrange(2**32)
+    if FIXED_SEED:
+        return SEED
+    return SEED + GEN
+
+
+def hard_start():
+    """The snapshot this generation starts from, or None for a normal start."""
+    if HARD_START_EVERY <= 0 or not SNAPSHOTS or GEN % HARD_START_EVERY:
+        return None
+    return SNAPSHOTS[GEN // HARD_START_EVERY % len(SNAPSHOTS)]
+
+
+def keep_snapshot(snapshot):
+    if snapshot is not None:
+        # The fitness cache tells episodes apart by this instead of the seed
+        snapshot["key"] = ("snapshot", next(SNAPSHOT_IDS))
+        SNAPSHOTS.append(snapshot)
+
+
+def checkpoint_state():
+    """What a resumed run needs back besides NEAT's own state: the hard-start
+    snapshots, or its generations would start from different worlds."""
+    return {"snapshots": list(SNAPSHOTS)}
+
+
+def restore_state(state):
+    global SNAPSHOT_IDS
+    if state is None:
+        if HARD_START_EVERY > 0:
+            print("No hard-start snapshots in this checkpoint, collecting anew")
+        return
+    SNAPSHOTS.clear()
+    SNAPSHOTS.extend(state["snapshots"])
+    # New snapshots need keys of their own for the fitness cache
+    ids = [snapshot["key"][1] for snapshot in SNAPSHOTS]
+    SNAPSHOT_IDS = itertools.count(max(ids, default=-1) + 1)
+
+
+class PongMatch:
+    """One match with its levels and rewards, a step per frame, whoever moves
+    the left paddle: a network in PongTrainer, an episode log in replay.py."""
+
+    FPS = FPS
+
+    def __init__(self, seed=None, start=None):
+        # Every match gets its own stream, so it plays out the same on any process
+        self.game = Game(random.Random(seed))
         self.level = 0
         self.steps = 0
-        self.genome.fitness = 0
-
-    def step(self):
-        self.steps += 1
-        level_cfg = LEVELS[self.level]
-
-        # 1. Inputs
-        inputs = (
+        self.fitness = 0
+        if start is not None:
+            self.set_state(start)
+            self.steps = 0  # a fresh step budget from the snapshot on
+            self.fitness = 0
+
+    def get_state(self):
+        return {
+            "game": self.game.get_state(),
+            "level": self.level,
+            "steps": self.steps,
+            "fitness": self.fitness,
+        }
+
+    def set_state(self, state):
+        self.game.set_state(state["game"])
+        self.level = state["level"]
+        self.steps = state["steps"]
+        # Snapshots from BatchPong come without one
+        self.fitness = state.get("fitness", 0)
+
+    def inputs(self):
+        return (
             self.game.left.y / WIN_HEIGHT,
             self.game.ball.y / WIN_HEIGHT,
             abs(self.game.ball.x - self.game.left.x) / WIN_WIDTH,
@@ -33,13 +164,17 @@ class PongTrainer:
             self.game.ball.y_vel / 10,
         )
 
-        # 2. Output (Winner Takes All)
-        o1, o2 = self.net.activate(inputs)
-        move_up = o1 > o2
+    def step(self, move_up):
+        """One frame with the left paddle going up or down. False once the
+        ball got past it or the step budget is used up."""
+        self.steps += 1
+        level_cfg = LEVELS[self.level]
         self.game.left.move(up=move_up)
 
         # 3. Game Loop
         alive = self.game.loop(level_cfg["bot"])
+        # Paddle and wall bounces happen inside loop(), so they count here too
+        PROFILER.lap("physics")
 
         # --- 4. SMART REWARDS ---
 
@@ -50,7 +185,7 @@ class PongTrainer:
             # Reward: Align paddle with BALL
             diff = abs(paddle_center_y - self.game.ball.y)
             reward = (1.0 - diff / WIN_HEIGHT) ** 2
-            self.genome.fitness += reward * 0.1
+            self.fitness += reward * 0.1
 
         # Scenario B: Recovery Mode (Ball moving away)
         else:
@@ -60,16 +195,16 @@ class PongTrainer:
             diff = abs(paddle_center_y - screen_center)
             reward = (1.0 - diff / WIN_HEIGHT) ** 2
             # Smaller reward for resetting (we prioritize hitting)
-            self.genome.fitness += reward * 0.05
+            self.fitness += reward * 0.05
 
         # 5. Reward: Hits (The main goal)
         if self.game.hits > 0:
-            self.genome.fitness += 5
+            self.fitness += 5
             # We don't reset hits here; we let the level check handle it below
 
         # 6. Level Up Logic
         if self.game.hits >= level_cfg["hits"]:
-            self.genome.fitness += 50
+            self.fitness += 50
             self.game.hits = 0
             self.level += 1
 
@@ -79,59 +214,340 @@ class PongTrainer:
 
             self.game.ball.reset(LEVELS[self.level]["bot"])
 
+        PROFILER.lap("other")
         if self.steps > MAX_STEPS:
             return False
 
         return alive
 
+    def draw(self, win):
+        self.game.draw(win, LEVELS[self.level]["name"])
+
+
+class PongTrainer(PongMatch):
+    def __init__(self, genome, config, seed=None, start=None):
+        super().__init__(seed, start)
+        self.genome = genome
+        self.net = neat.nn.FeedForwardNetwork.create(genome, config)
+        self.move_up = False  # the decision held between ACTION_REPEAT steps
+        self.genome.fitness = 0
+
+    def step(self):
+        if self.steps % ACTION_REPEAT == 0:
+            # 1. Inputs
+            output = self.net.activate(self.inputs())
+            PROFILER.lap("inference")
+
+            # 2. Output (Winner Takes All)
+            o1, o2 = output
+            self.move_up = o1 > o2
+        alive = super().step(self.move_up)
+        self.genome.fitness = self.fitness
+        return alive
+
+
+def record_episode(genome, config, path, seed=None):
+    """Plays `genome`'s match on seed `seed` (a random one if None), the way
+    play() does, and writes the episode log to `path`."""
+    if seed is None:
+        seed = random.Random().randrange(2**32)  # NEAT's `random` is left alone
+    fitness = genome.fitness
+    trainer = PongTrainer(genome, config, seed)
+    actions = []
+    alive = True
+    while alive:
+        alive = trainer.step()
+        actions.append(trainer.move_up)
+    genome.fitness = fitness  # the one it earned in training stays
+
+    log = EpisodeLog(
+        "pong",
+        "trainer",
+        seed,
+        actions,
+        1,
+        genome=genome.key,
+        fitness=trainer.fitness,
+        action_repeat=ACTION_REPEAT,
+    )
+    log.save(path)
+    print(f"Recorded {len(log)} frames (fitness {trainer.fitness:.1f}) to {path}")
+
 
 # ==================== EVAL ====================
 def eval_genomes(genomes, config):
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-    clock = pygame.time.Clock()
-
-    trainers = [PongTrainer(g, config) for _, g in genomes]
-
-    # Visualizer Names
-    node_names = {
-        -1: "PadY",
-        -2: "BallY",
-        -3: "Dist",
-        -4: "VelX",
-        -5: "VelY",
-        0: "UP",
-        1: "DN",
-    }
+    global GEN
+    GEN += 1
+
+    # Elites that already played this seed keep their fitness
+    seed = generation_seed()
+    start = hard_start()
+    todo, keys = FITNESS_CACHE.split(genomes, seed if start is None else start["key"])
+    PROFILER.lap("cache")
+    levels = []
+    if todo:
+        snapshot, levels = simulate(todo, config, seed, should_render(), start)
+        keep_snapshot(snapshot)
+    FITNESS_CACHE.store(todo, keys)
+    archive(todo, seed, start, levels)
+
+
+def archive(genomes, seed, start, levels):
+    """Offers the genomes just played to the hall of fame, as they are now,
+    with the level each one's match got to."""
+    if HALL_OF_FAME is None:
+        return
+    for (_, g), level in zip(genomes, levels):
+        HALL_OF_FAME.offer(
+            g,
+            GEN,
+            seed,
+            hard_start=start is not None,
+            level=LEVELS[level]["name"],
+        )
+    HALL_OF_FAME.save()
+
+
+def eval_genome(genome, config, seed, start=None):
+    """Plays one genome's match on its own. Matches are independent already.
+
+    Also returns the level it got to, and the match's state when it got to
+    HARD_LEVEL (or None).
+    """
+    trainer = PongTrainer(genome, config, seed, start)
+    snapshot = None
+    capture = HARD_START_EVERY > 0 and start is None
+    while trainer.step():
+        if capture and trainer.level >= HARD_LEVEL:
+            snapshot = trainer.get_state()
+            capture = False
+    return genome.fitness, trainer.level, snapshot
+
+
+# The settings eval_genome() plays by. Workers are handed this process's values:
+# with the spawn start method (Windows, macOS) they import this module afresh
+# and would only see the NEAT_* environment, not the command line.
+WORKER_SETTINGS = (
+    "SEED",
+    "FIXED_SEED",
+    "BATCH",
+    "ACTION_REPEAT",
+    "HARD_START_EVERY",
+    "HARD_LEVEL",
+)
+
+
+def init_worker(settings):
+    """Pool initializer: takes on the trainer's settings (see WORKER_SETTINGS)."""
+    global PROFILER
+    globals().update(settings)
+    PROFILER = NullProfiler()  # the workers' phases aren't timed
+
+
+class ParallelEvaluator:
+    """Like neat.ParallelEvaluator, but every genome gets the generation seed."""
+
+    def __init__(self, num_workers, chunksize=1):
+        self.chunksize = chunksize
+        settings = {name: globals()[name] for name in WORKER_SETTINGS}
+        self.pool = multiprocessing.Pool(
+            num_workers, initializer=init_worker, initargs=(settings,)
+        )
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def evaluate(self, genomes, config):
+        global GEN
+        GEN += 1
+
+        seed = generation_seed()
+        start = hard_start()
+        todo, keys = FITNESS_CACHE.split(
+            genomes, seed if start is None else start["key"]
+        )
+        jobs = [(g, config, seed, start) for _, g in todo]
+        PROFILER.lap("cache")
+        # The phases inside the workers aren't timed, only the wait for them
+        # Every job carries the config, and with it the node counter
+        with node_ids_kept(config):
+            results = self.pool.starmap(eval_genome, jobs, self.chunksize)
+        PROFILER.lap("workers")
+        for (_, g), (fitness, _, _) in zip(todo, results):
+            g.fitness = fitness
+        # Same pick as play(): the first match to get there, lowest index on ties
+        found = [snapshot for _, _, snapshot in results if snapshot is not None]
+        if found:
+            keep_snapshot(min(found, key=lambda snapshot: snapshot["steps"]))
+        FITNESS_CACHE.store(todo, keys)
+        archive(todo, seed, start, [level for _, level, _ in results])
+
+
+def simulate(genomes, config, seed, render=False, start=None):
+    """Plays every genome's match, from the serve or from a snapshot.
+
+    Returns the state of the first match to get to HARD_LEVEL (or None), and
+    the LEVELS index every genome's match got to.
+    """
+    if BATCH:
+        return play_batch(genomes, config, seed, render, start)
+    return play(genomes, config, seed, render, start)
+
+
+# Visualizer Names
+NODE_NAMES = {
+    -1: "PadY",
+    -2: "BallY",
+    -3: "Dist",
+    -4: "VelX",
+    -5: "VelY",
+    0: "UP",
+    1: "DN",
+}
+
+
+def play(genomes, config, seed, render, start=None):
+    trainers = [PongTrainer(g, config, seed, start) for _, g in genomes]
+    matches = list(trainers)
+    PROFILER.lap("create")
+    snapshot = None
+    capture = HARD_START_EVERY > 0 and start is None
 
     running = True
     while running and trainers:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
+        PROFILER.frame(len(trainers))
 
         # Update backwards so we can remove dead ones
         for i in reversed(range(len(trainers))):
             if not trainers[i].step():
                 trainers.pop(i)
+        if capture:
+            ready = [t for t in trainers if t.level >= HARD_LEVEL]
+            if ready:
+                snapshot = ready[0].get_state()
+                capture = False
+        PROFILER.lap("other")
+
+        if render and trainers and DASHBOARD.due():
+            game = trainers[0].game
+            frame = world_frame(
+                game.left.y,
+                game.right.y,
+                (game.ball.x, game.ball.y),
+                game.hits,
+                trainers[0].level,
+            )
+            DASHBOARD.publish(frame, trainers[0].genome)
+            PROFILER.lap("publish")
+
+    return snapshot, [t.level for t in matches]
+
+
+def play_batch(genomes, config, seed, render, start=None):
+    """Same matches as play(), but with a BatchPong and a BatchNetwork."""
+    ge = [g for _, g in genomes]
+    nets = BatchNetwork.create(ge, config)
+    env = BatchPong(len(ge), seed, start)
+    levels = np.zeros(len(ge), dtype=np.int64)
+    PROFILER.lap("create")
+    snapshot = None
+    capture = HARD_START_EVERY > 0 and start is None
+    move_up = None
+
+    while len(env) > 0:
+        PROFILER.frame(len(env))
+
+        if env.steps % ACTION_REPEAT == 0:
+            # Output (Winner Takes All)
+            outputs = nets.activate(env.inputs())
+            move_up = outputs[:, 0] > outputs[:, 1]
+            PROFILER.lap("inference")
+        dead = env.step(move_up)
+        PROFILER.lap("physics")
+
+        if capture:
+            ready = np.flatnonzero(~dead & (env.level >= HARD_LEVEL))
+            if len(ready):
+                snapshot = env.get_state(ready[0])
+                capture = False
+        if dead.any():
+            levels[env.ids[dead]] = env.level[dead]
+            env.kill(dead)
+            nets = nets.subset(~dead)
+            move_up = move_up[~dead]
+        PROFILER.lap("other")
+
+        if render and len(env) > 0 and DASHBOARD.due():
+            frame = world_frame(
+                env.left_y[0],
+                env.right_y[0],
+                (env.ball_x[0], env.ball_y[0]),
+                env.hits[0],
+                env.level[0],
+            )
+            DASHBOARD.publish(frame, ge[env.ids[0]])
+            PROFILER.lap("publish")
+
+    for g, f in zip(ge, env.fitness):
+        g.fitness = float(f)
+
+    return snapshot, levels.tolist()
+
+
+def world_frame(left_y, right_y, ball, hits, level):
+    """A frame for the dashboard: one match, with its LEVELS index."""
+    return {
+        "left": float(left_y),
+        "right": float(right_y),
+        "ball": [float(v) for v in ball],
+        "hits": int(hits),
+        "level": int(level),
+    }
 
-        if trainers:
-            t = trainers[0]
-            t.game.draw(win, LEVELS[t.level]["name"])
-
-            try:
-                visualizer.draw_net(
-                    win, t.genome, config, pos=(400, 350), node_names=node_names
-                )
-            except:  # noqa: E722
-                pass
 
-            pygame.display.update()
+def draw_frame(win, world, genome, config):
+    """Draws a world_frame() with the network of `genome`, for dashboard.py."""
+    game = Game(random.Random(0))
+    game.left.set_state({"x": game.left.x, "y": world["left"]})
+    game.right.set_state({"x": game.right.x, "y": world["right"]})
+    game.ball.x, game.ball.y = world["ball"]
+    game.hits = world["hits"]
+    game.draw(win, LEVELS[world["level"]]["name"])
+    try:
+        visualizer.draw_net(win, genome, config, pos=(400, 350), node_names=NODE_NAMES)
+    except:  # noqa: E722
+        pass
+
+
+def save_best(config):
+    """The run's best genome from the hall of fame, compiled into the archive's
+    folder for anything that only wants to run it (see common/compiled_net.py,
+    NumPy only), and its match log with --record."""
+    entry = HALL_OF_FAME.best(run=HALL_OF_FAME.run)
+    if entry is None:
+        print("No valid genome to save.")
+        return
+    genome = HALL_OF_FAME.load(entry, config)
+    path = HALL_OF_FAME.path_for(entry, ".npz")
+    CompiledNetwork.create(genome, config).save(path)
+    print(f"Saved the best network (fitness {genome.fitness}) to {path}")
+    if RECORD:
+        record_episode(genome, config, RECORD, SEED)
 
 
 # ==================== RUN ====================
-def run(config_path):
+def open_dashboard():
+    """Starts publishing frames, and the viewer that shows them."""
+    global DASHBOARD
+    DASHBOARD = Publisher("pong")
+    viewer = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+    subprocess.Popen([sys.executable, viewer])
+
+
+def run(config_path, resume=None):
+    global GEN, HALL_OF_FAME
+
     config = neat.config.Config(
         neat.DefaultGenome,
         neat.DefaultReproduction,
@@ -140,16 +556,181 @@ def run(config_path):
         config_path,
     )
 
-    pop = neat.Population(config)
+    HALL_OF_FAME = HallOfFame(
+        HALL_OF_FAME_DIR, config_hash(config_path), HALL_OF_FAME_SIZE, ("level",)
+    )
+
+    # With a fixed seed the whole run (evolution + every match) is reproducible
+    if SEED is not None:
+        random.seed(SEED)
+
+    if resume:
+        # Restores the population, species and NEAT's random state as saved
+        pop = neat.Checkpointer.restore_checkpoint(resume)
+        GEN = pop.generation
+        restore_state(AsyncCheckpointer.restore_extra(resume))
+        print(f"Resuming from {resume} at generation {pop.generation}")
+    else:
+        pop = neat.Population(config)
     pop.add_reporter(neat.StdOutReporter(True))
     pop.add_reporter(neat.StatisticsReporter())
+    if PROFILER.enabled:
+        pop.add_reporter(PROFILER)
+
+    checkpointer = None
+    if CHECKPOINT_EVERY > 0 or CHECKPOINT_MINUTES > 0:
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        checkpointer = AsyncCheckpointer(
+            CHECKPOINT_EVERY or None,
+            CHECKPOINT_MINUTES * 60 or None,
+            filename_prefix=os.path.join(CHECKPOINT_DIR, "neat-checkpoint-"),
+            keep=KEEP_CHECKPOINTS,
+            extra=checkpoint_state,
+        )
+        checkpointer.last_generation_checkpoint = pop.generation
+        pop.add_reporter(checkpointer)
+
+    evaluator = None
+    evaluate = eval_genomes
+    if WORKERS > 0:
+        evaluator = ParallelEvaluator(WORKERS)
+        evaluate = evaluator.evaluate
+    elif not HEADLESS or RENDER_EVERY > 0:
+        open_dashboard()
 
     try:
         # Running for 200 generations to give time for God Mode!
-        pop.run(eval_genomes, 200)
+        pop.run(evaluate, 200 - pop.generation)
+        save_best(pop.config)
     except KeyboardInterrupt:
         print("User Exit")
+        save_best(pop.config)
+        # Nothing new to save if the last generation was just checkpointed
+        if checkpointer and checkpointer.last_generation_checkpoint != pop.generation:
+            checkpointer.save_checkpoint(
+                pop.config, pop.population, pop.species, pop.generation
+            )
+    finally:
+        if evaluator:
+            evaluator.close()
+        if checkpointer:
+            checkpointer.wait()
+        DASHBOARD.close()
 
 
 if __name__ == "__main__":
-    run(os.path.join(os.path.dirname(__file__), "config.txt"))
+    parser = argparse.ArgumentParser(description="Train Pong with NEAT")
+    parser.add_argument("--headless", action="store_true", help="no dashboard")
+    parser.add_argument(
+        "--render-every",
+        type=int,
+        default=RENDER_EVERY,
+        metavar="N",
+        help="headless only: preview every Nth generation",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        metavar="N",
+        help="evaluate genomes in N worker processes (implies no dashboard)",
+    )
+    parser.add_argument("--seed", type=int, default=SEED, help="base match seed")
+    parser.add_argument(
+        "--fixed-seed",
+        action="store_true",
+        help="every generation replays --seed (lets the fitness cache hit)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=CACHE_SIZE,
+        metavar="N",
+        help="remember the fitness of N genome/seed pairs (0 = off)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="play every match and its network as NumPy arrays",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=CHECKPOINT_EVERY,
+        metavar="N",
+        help="save a checkpoint every N generations (0 = off)",
+    )
+    parser.add_argument(
+        "--checkpoint-minutes",
+        type=float,
+        default=CHECKPOINT_MINUTES,
+        metavar="M",
+        help="also save a checkpoint every M minutes",
+    )
+    parser.add_argument(
+        "--keep-checkpoints",
+        type=int,
+        default=KEEP_CHECKPOINTS,
+        metavar="N",
+        help="only keep the newest N checkpoints (0 = keep all)",
+    )
+    parser.add_argument(
+        "--hall-of-fame",
+        type=int,
+        default=HALL_OF_FAME_SIZE,
+        metavar="N",
+        help="keep the run's N fittest genomes of each level in hall_of_fame/",
+    )
+    parser.add_argument(
+        "--resume", metavar="PATH", help="continue training from a checkpoint"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="append per-phase timings of every generation to this JSONL file",
+    )
+    parser.add_argument(
+        "--hard-start-every",
+        type=int,
+        default=HARD_START_EVERY,
+        metavar="N",
+        help="every Nth generation starts at the Pro level (0 = off)",
+    )
+    parser.add_argument(
+        "--action-repeat",
+        type=int,
+        default=ACTION_REPEAT,
+        metavar="K",
+        help="the networks only decide every Kth frame",
+    )
+    parser.add_argument(
+        "--record",
+        default=RECORD,
+        metavar="PATH",
+        help="write the best genome's match log here when training ends",
+    )
+    args = parser.parse_args()
+    HEADLESS = HEADLESS or args.headless
+    RENDER_EVERY = args.render_every
+    WORKERS = args.workers
+    SEED = args.seed
+    FIXED_SEED = FIXED_SEED or args.fixed_seed
+    if FIXED_SEED and SEED is None:
+        parser.error("--fixed-seed needs --seed")
+    FITNESS_CACHE = FitnessCache(args.cache_size)
+    BATCH = BATCH or args.batch
+    CHECKPOINT_EVERY = args.checkpoint_every
+    CHECKPOINT_MINUTES = args.checkpoint_minutes
+    KEEP_CHECKPOINTS = args.keep_checkpoints
+    if args.hall_of_fame < 1:
+        parser.error("--hall-of-fame must be at least 1")
+    HALL_OF_FAME_SIZE = args.hall_of_fame
+    if args.profile:
+        PROFILER = Profiler(args.profile)
+    HARD_START_EVERY = args.hard_start_every
+    if args.action_repeat < 1:
+        parser.error("--action-repeat must be at least 1")
+    ACTION_REPEAT = args.action_repeat
+    RECORD = args.record
+
+    run(os.path.join(os.path.dirname(__file__), "config.txt"), resume=args.resume)
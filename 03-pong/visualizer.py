@@ -1,10 +1,54 @@
+import functools
+from collections import OrderedDict
+
 import pygame
 
+import common_path  # noqa: F401
+from common.fitness_cache import genome_hash
+
+# Rendered overlays, least recently drawn first. A preview shows the same
+# genome frame after frame, so its net is drawn once and then just blitted.
+OVERLAYS = OrderedDict()
+OVERLAY_CACHE_SIZE = 32
+
+
+def cached_overlay(win, key, draw, *args):
+    """Blits the overlay draw(surface, *args) draws, rendering it only the
+    first time `key` comes up (and again after it's been evicted)."""
+    key = (key, win.get_size())
+    overlay = OVERLAYS.get(key)
+    if overlay is None:
+        surface = pygame.Surface(win.get_size(), pygame.SRCALPHA)
+        draw(surface, *args)
+        # Only the part that was drawn on is kept
+        rect = surface.get_bounding_rect()
+        image = surface.subsurface(rect).copy()
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()  # the window's pixel format blits faster
+        overlay = OVERLAYS[key] = (image, rect.topleft)
+        if len(OVERLAYS) > OVERLAY_CACHE_SIZE:
+            OVERLAYS.popitem(last=False)
+    else:
+        OVERLAYS.move_to_end(key)
+    win.blit(*overlay)
+
+
+@functools.cache
+def get_font():
+    pygame.font.init()
+    return pygame.font.SysFont("comicsans", 15)
+
 
 def draw_net(win, genome, config, pos, node_names=None):
     """
     Draws a visual representation of a NEAT neural network.
     """
+    names = None if node_names is None else tuple(sorted(node_names.items()))
+    key = (genome.key, genome_hash(genome), pos, names)
+    cached_overlay(win, key, _draw_net, genome, config, pos, node_names)
+
+
+def _draw_net(win, genome, config, pos, node_names):
     node_radius = 10
     layer_spacing = 100
     node_spacing = 40
@@ -26,11 +70,8 @@ def draw_net(win, genome, config, pos, node_names=None):
 
     # --- Hidden Layer ---
     # Nodes that are not inputs or outputs
-    layer_nodes[1] = [
-        n
-        for n in genome.nodes.keys()
-        if n not in layer_nodes[0] and n not in layer_nodes[2]
-    ]
+    known = set(layer_nodes[0]) | set(layer_nodes[2])
+    layer_nodes[1] = [n for n in genome.nodes.keys() if n not in known]
 
     # --- Calculate Positions ---
     node_positions = {}
@@ -63,7 +104,7 @@ def draw_net(win, genome, config, pos, node_names=None):
         pygame.draw.line(win, color, start, end, width)
 
     # --- Draw Nodes & Labels ---
-    font = pygame.font.SysFont("comicsans", 15)
+    font = get_font()
     for node_key, (x, y) in node_positions.items():
         pygame.draw.circle(win, (255, 255, 255), (int(x), int(y)), node_radius)
 
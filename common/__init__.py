@@ -0,0 +1,2 @@
+"""Modules all three games share. Every game folder has a common_path.py
+that puts the repo root on sys.path, so its scripts can import from here."""
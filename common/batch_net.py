@@ -0,0 +1,162 @@
+import numpy as np
+import neat
+
+
+def _sigmoid(z):
+    # Same clamp as neat.activations.sigmoid_activation
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _tanh(z):
+    # Same clamp as neat.activations.tanh_activation
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+ACTIVATIONS = {"sigmoid": _sigmoid, "tanh": _tanh}
+
+
+class BatchNetwork:
+    """A whole generation of feed-forward nets as padded NumPy arrays.
+
+    Every genome gets the same node slots: the inputs first, then its hidden
+    and output nodes in evaluation order, and zero padding after that. A node
+    sits at depth 1 + the deepest node feeding it, and all nodes at a depth
+    are computed with a single batched matmul. activate() runs every network
+    on a stacked input matrix with one NumPy call per layer. Only `sum`
+    aggregation and the activations in ACTIVATIONS are supported.
+
+    Results match FeedForwardNetwork.activate up to float rounding, because
+    the weighted sums are added in a different order.
+    """
+
+    def __init__(self, weights, bias, response, depth, act, outputs, num_inputs):
+        self.weights = weights  # (genomes, nodes, nodes): [g, to, from]
+        self.bias = bias
+        self.response = response
+        self.depth = depth  # 0 = input or padding, 1.. = evaluated node
+        self.act = act  # per depth level: activation name -> bool mask
+        self.outputs = outputs  # (genomes, num_outputs) node slot per output
+        self.num_inputs = num_inputs
+
+    @staticmethod
+    def create(genomes, config):
+        gc = config.genome_config
+        num_inputs = len(gc.input_keys)
+
+        evals = []
+        for g in genomes:
+            net = neat.nn.FeedForwardNetwork.create(g, config)
+            nodes = []
+            for node, _, _, bias, response, links in net.node_evals:
+                ng = g.nodes[node]
+                if ng.aggregation != "sum":
+                    raise ValueError(f"Unsupported aggregation: {ng.aggregation}")
+                if ng.activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation: {ng.activation}")
+                nodes.append((node, ng.activation, bias, response, links))
+            evals.append(nodes)
+
+        # One extra slot at the end that is never written, for outputs the
+        # genome has no path to (FeedForwardNetwork leaves those at 0.0)
+        size = num_inputs + max((len(nodes) for nodes in evals), default=0) + 1
+        zero_slot = size - 1
+
+        n = len(genomes)
+        weights = np.zeros((n, size, size))
+        bias = np.zeros((n, size))
+        response = np.zeros((n, size))
+        depth = np.zeros((n, size), dtype=np.int64)
+        act_names = np.full((n, size), "", dtype=object)
+        outputs = np.full((n, len(gc.output_keys)), zero_slot, dtype=np.int64)
+
+        for row, nodes in enumerate(evals):
+            slot = {key: i for i, key in enumerate(gc.input_keys)}
+            for node, activation, b, r, links in nodes:
+                i = slot[node] = len(slot)
+                bias[row, i] = b
+                response[row, i] = r
+                act_names[row, i] = activation
+                d = 0
+                for src, w in links:
+                    weights[row, i, slot[src]] += w
+                    d = max(d, depth[row, slot[src]])
+                depth[row, i] = d + 1
+
+            for j, key in enumerate(gc.output_keys):
+                if key in slot:
+                    outputs[row, j] = slot[key]
+
+        act = []
+        for level in range(1, int(depth.max(initial=0)) + 1):
+            at_level = depth == level
+            act.append(
+                {
+                    name: at_level & (act_names == name)
+                    for name in ACTIVATIONS
+                    if (at_level & (act_names == name)).any()
+                }
+            )
+
+        return BatchNetwork(weights, bias, response, depth, act, outputs, num_inputs)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def subset(self, keep):
+        """Network for only the rows in `keep` (bool mask or index array)."""
+        return BatchNetwork(
+            self.weights[keep],
+            self.bias[keep],
+            self.response[keep],
+            self.depth[keep],
+            [{name: mask[keep] for name, mask in level.items()} for level in self.act],
+            self.outputs[keep],
+            self.num_inputs,
+        )
+
+    def activate(self, inputs):
+        """inputs: (genomes, num_inputs). Returns (genomes, num_outputs)."""
+        n, size = self.bias.shape
+        values = np.zeros((n, size))
+        values[:, : self.num_inputs] = inputs
+
+        for level in self.act:
+            z = np.matmul(self.weights, values[:, :, None])[:, :, 0]
+            z = self.bias + self.response * z
+            for name, mask in level.items():
+                values[mask] = ACTIVATIONS[name](z[mask])
+
+        return np.take_along_axis(values, self.outputs, axis=1)
+
+    def bounds(self, low, high):
+        """Interval bounds of every output for any inputs between `low` and
+        `high` (same shapes as for activate, or one row for all genomes).
+
+        Returns (low, high) output arrays. Sound because both activations
+        only ever go up with their input: positive weights take the low end
+        to the low end, negative ones the high end.
+        """
+        n, size = self.bias.shape
+        lo = np.zeros((n, size))
+        hi = np.zeros((n, size))
+        lo[:, : self.num_inputs] = low
+        hi[:, : self.num_inputs] = high
+        pos = np.maximum(self.weights, 0.0)
+        neg = np.minimum(self.weights, 0.0)
+
+        for level in self.act:
+            z_lo = np.matmul(pos, lo[:, :, None]) + np.matmul(neg, hi[:, :, None])
+            z_hi = np.matmul(pos, hi[:, :, None]) + np.matmul(neg, lo[:, :, None])
+            # A negative response flips the interval
+            a = self.bias + self.response * z_lo[:, :, 0]
+            b = self.bias + self.response * z_hi[:, :, 0]
+            z_lo, z_hi = np.minimum(a, b), np.maximum(a, b)
+            for name, mask in level.items():
+                lo[mask] = ACTIVATIONS[name](z_lo[mask])
+                hi[mask] = ACTIVATIONS[name](z_hi[mask])
+
+        return (
+            np.take_along_axis(lo, self.outputs, axis=1),
+            np.take_along_axis(hi, self.outputs, axis=1),
+        )
@@ -0,0 +1,422 @@
+"""Frames per second of the training paths, for tracking speed between commits.
+
+Plays fixed-seed episodes with random genomes (a fresh NEAT population, so
+also seeded) through every path of a game's train_neat and writes the numbers
+as JSON. Every game's benchmark.py runs main() from here, from the game's
+folder:
+
+    python benchmark.py --out bench.json
+    python benchmark.py --pop-sizes 30 300 --paths headless batch
+
+Episodes end after --frames frames even if players are still alive,
+otherwise a lucky random genome could play forever. Progress goes to stderr.
+
+With --action-repeats every path is measured once per action repeat K (the
+networks decide every Kth frame), and --generations G adds what it does to
+learning: a G-generation training run per K on the batch path, from the same
+seed, with the best fitness of every generation:
+
+    python benchmark.py --paths batch --action-repeats 1 2 4 --generations 20
+
+The report also has the time it takes a fresh interpreter (a spawned worker,
+say) to import the game and the trainer, and the latency of one network call:
+NEAT's activate() against compiled_net.py's, on mutated genomes so they
+have hidden nodes (--net-calls 0 to skip).
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import neat
+import numpy as np
+
+from common.checkpointer import node_ids_kept
+from common.compiled_net import CompiledNetwork
+from common.dashboard import Publisher, NullPublisher
+from common.fitness_cache import FitnessCache
+from common.profiler import NullProfiler
+
+# The game being measured, see setup()
+GAME = None
+GAME_MODULE = None
+GAME_DIR = None
+train_neat = None
+# serial = a shown generation (frames for the dashboard), headless =
+# the same loop without them, batch = NumPy arrays, parallel = one process per CPU
+PATHS = ["serial", "headless", "batch", "parallel"]
+POP_SIZES = [30, 300, 3000]
+
+
+def setup(game, game_module, directory):
+    """Measures `game`: the module `game_module` and the train_neat.py in the
+    folder `directory`. Also the pool's initializer, a spawned worker starts
+    out without any of it."""
+    global GAME, GAME_MODULE, GAME_DIR, train_neat
+    GAME, GAME_MODULE, GAME_DIR = game, game_module, directory
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    train_neat = importlib.import_module("train_neat")
+
+
+class EpisodeOver(Exception):
+    pass
+
+
+class FrameBudget(NullProfiler):
+    """Hooks into the trainer's PROFILER.frame() calls to count frames and
+    agent steps, and stops the episode once `limit` frames have run."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.frames = 0
+        self.steps = 0
+
+    def frame(self, alive):
+        if self.frames >= self.limit:
+            raise EpisodeOver
+        self.frames += 1
+        self.steps += alive
+
+
+def load_config(pop_size=None):
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        os.path.join(GAME_DIR, "config.txt"),
+    )
+    if pop_size:
+        config.pop_size = pop_size
+    return config
+
+
+def random_genomes(config, seed):
+    random.seed(seed)
+    return list(neat.Population(config).population.items())
+
+
+def run_capped(genomes, config, seed, frames, render=False):
+    budget = train_neat.PROFILER = FrameBudget(frames)
+    if render:
+        # A ring of its own, a run being watched keeps its dashboard
+        train_neat.DASHBOARD = Publisher(f"{GAME}-benchmark")
+    try:
+        train_neat.simulate(genomes, config, seed, render=render)
+    except EpisodeOver:
+        pass
+    finally:
+        train_neat.PROFILER = NullProfiler()
+        train_neat.DASHBOARD.close()
+        train_neat.DASHBOARD = NullPublisher()
+    return budget.frames, budget.steps
+
+
+def eval_capped(genome, config, seed, frames):
+    """One genome alone in its world, the way the parallel path plays it."""
+    return run_capped([(genome.key, genome)], config, seed, frames)
+
+
+def bench(path, genomes, config, seed, frames, workers, action_repeat=1):
+    train_neat.BATCH = path == "batch"
+    train_neat.ACTION_REPEAT = action_repeat
+    start = time.perf_counter()
+    if path == "parallel":
+        jobs = [(g, config, seed, frames) for _, g in genomes]
+        pool = multiprocessing.Pool(
+            workers, initializer=setup, initargs=(GAME, GAME_MODULE, GAME_DIR)
+        )
+        start = time.perf_counter()  # not counting the pool start-up
+        with node_ids_kept(config):  # every job pickles the config
+            results = pool.starmap(eval_capped, jobs)
+        seconds = time.perf_counter() - start
+        # close() rather than terminate(): workers that imported pygame
+        # don't always go down on SIGTERM
+        pool.close()
+        pool.join()
+        # Every genome had a world of its own
+        world_frames = sum(f for f, _ in results)
+        steps = sum(s for _, s in results)
+    else:
+        world_frames, steps = run_capped(
+            genomes, config, seed, frames, render=path == "serial"
+        )
+        seconds = time.perf_counter() - start
+    train_neat.BATCH = False
+    train_neat.ACTION_REPEAT = 1
+
+    return {
+        "game": GAME,
+        "path": path,
+        "pop_size": len(genomes),
+        "action_repeat": action_repeat,
+        "seconds": seconds,
+        "frames": world_frames,
+        "env_steps": steps,
+        "frames_per_s": world_frames / seconds,
+        "env_steps_per_s": steps / seconds,
+        "genome_evals_per_s": len(genomes) / seconds,
+    }
+
+
+def evolve(config, seed, generations, action_repeat):
+    """A short headless training run on the batch path, with the trainer's
+    own episode limits. Every action repeat starts from the same population
+    and plays the same seeds."""
+    random.seed(seed)
+    population = neat.Population(config)
+    best = []
+
+    def evaluate(genomes, config):
+        train_neat.eval_genomes(genomes, config)
+        best.append(max(g.fitness for _, g in genomes))
+
+    train_neat.GEN = 0
+    train_neat.SEED = seed
+    train_neat.HEADLESS = True
+    train_neat.BATCH = True
+    train_neat.ACTION_REPEAT = action_repeat
+    # Fitness from another action repeat on the same seed would be wrong
+    train_neat.FITNESS_CACHE = FitnessCache(train_neat.CACHE_SIZE)
+    budget = train_neat.PROFILER = FrameBudget(float("inf"))
+    start = time.perf_counter()
+    try:
+        # The trainer's generation logs would end up in the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            population.run(evaluate, generations)
+    finally:
+        seconds = time.perf_counter() - start
+        train_neat.PROFILER = NullProfiler()
+        train_neat.BATCH = False
+        train_neat.ACTION_REPEAT = 1
+
+    return {
+        "game": GAME,
+        "action_repeat": action_repeat,
+        "pop_size": config.pop_size,
+        "generations": len(best),
+        "seconds": seconds,
+        "frames": budget.frames,
+        "env_steps": budget.steps,
+        "frames_per_s": budget.frames / seconds,
+        "env_steps_per_s": budget.steps / seconds,
+        "best_fitness": best,
+    }
+
+
+def import_times():
+    """Milliseconds a fresh interpreter takes to import the game module and
+    then train_neat. pygame, NumPy and NEAT are imported (and timed) first,
+    nothing in this repo can make those faster."""
+    modules = ["pygame, numpy, neat", GAME_MODULE, "train_neat"]
+    code = "import json, time\nt = [time.perf_counter()]\n"
+    for module in modules:
+        code += f"import {module}\nt.append(time.perf_counter())\n"
+    code += "print(json.dumps([(b - a) * 1000 for a, b in zip(t, t[1:])]))"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=GAME_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # pygame says hello on stdout first
+    times = json.loads(out.stdout.splitlines()[-1])
+    return dict(zip(["third_party", *modules[1:]], times))
+
+
+def net_latency(seed, calls, genomes=20, mutations=30):
+    """Microseconds per input row of every way to run a network: one call per
+    row for activate() and the compiled function, one call for all rows for
+    the NumPy program. Also how far the compiled ones are from activate(): 0
+    for the generated function, it sums with the same builtin sum(), and
+    rounding for the NumPy program."""
+    config = load_config(genomes)
+    random.seed(seed)
+    nets = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "net.npz")
+        for _, g in random_genomes(config, seed):
+            for _ in range(random.randrange(mutations)):
+                g.mutate(config.genome_config)
+            CompiledNetwork.create(g, config).save(path)
+            start = time.perf_counter()
+            compiled = CompiledNetwork.load(path)
+            nets.append(
+                (
+                    neat.nn.FeedForwardNetwork.create(g, config),
+                    compiled,
+                    time.perf_counter() - start,
+                )
+            )
+
+    rng = np.random.default_rng(seed)
+    inputs = rng.uniform(-1, 1, (calls, nets[0][1].num_inputs))
+    rows = inputs.tolist()
+    seconds = {"activate": 0.0, "compiled": 0.0, "compiled_array": 0.0}
+    diff = {"compiled": 0.0, "compiled_array": 0.0}
+    for net, compiled, _ in nets:
+        for name, run in (
+            ("activate", lambda: [net.activate(x) for x in rows]),
+            ("compiled", lambda: [compiled.activate(x) for x in rows]),
+            ("compiled_array", lambda: compiled.activate_array(inputs)),
+        ):
+            start = time.perf_counter()
+            out = run()
+            seconds[name] += time.perf_counter() - start
+            if name == "activate":
+                expected = np.array(out)
+            else:
+                error = np.abs(np.reshape(out, expected.shape) - expected).max()
+                diff[name] = max(diff[name], float(error))
+
+    per_call = len(nets) * calls / 1e6
+    return {
+        "game": GAME,
+        "genomes": len(nets),
+        "mean_nodes": sum(len(c.program) for _, c, _ in nets) / len(nets),
+        "calls": calls,
+        "load_ms": 1000 * sum(t for _, _, t in nets) / len(nets),
+        **{f"{name}_us": s / per_call for name, s in seconds.items()},
+        **{f"{name}_max_diff": d for name, d in diff.items()},
+    }
+
+
+def commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=GAME_DIR,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def main(game, game_module, directory):
+    """The benchmark.py command line, for `game` (see setup())."""
+    setup(game, game_module, directory)
+    parser = argparse.ArgumentParser(description=f"Benchmark {game} training")
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=PATHS)
+    parser.add_argument("--pop-sizes", nargs="+", type=int, default=POP_SIZES)
+    parser.add_argument(
+        "--frames", type=int, default=300, help="max frames per episode"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="course + genome seed")
+    parser.add_argument(
+        "--action-repeats",
+        nargs="+",
+        type=int,
+        default=[1],
+        metavar="K",
+        help="measure every path with the networks deciding every Kth frame",
+    )
+    parser.add_argument(
+        "--generations",
+        type=int,
+        default=0,
+        metavar="G",
+        help="also train G generations per action repeat, for the fitness",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=multiprocessing.cpu_count(), metavar="N"
+    )
+    parser.add_argument(
+        "--net-calls",
+        type=int,
+        default=2000,
+        metavar="N",
+        help="network calls per genome for the latency numbers (0 = skip)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="keep the fastest of N runs"
+    )
+    parser.add_argument("--out", metavar="PATH", help="write JSON here, not stdout")
+    args = parser.parse_args()
+    if min(args.action_repeats) < 1:
+        parser.error("--action-repeats must be at least 1")
+
+    results = []
+    for pop_size in args.pop_sizes:
+        config = load_config(pop_size)
+        genomes = random_genomes(config, args.seed)
+        for k in args.action_repeats:
+            for path in args.paths:
+                runs = [
+                    bench(
+                        path, genomes, config, args.seed, args.frames, args.workers, k
+                    )
+                    for _ in range(args.repeat)
+                ]
+                best = min(runs, key=lambda r: r["seconds"])
+                print(
+                    f"{GAME} {path:>8} pop {pop_size:>5} k {k:>2}: "
+                    f"{best['frames_per_s']:9.1f} frames/s "
+                    f"{best['env_steps_per_s']:11.1f} steps/s "
+                    f"{best['genome_evals_per_s']:9.1f} evals/s",
+                    file=sys.stderr,
+                )
+                results.append(best)
+
+    imports = min(
+        (import_times() for _ in range(args.repeat)), key=lambda t: sum(t.values())
+    )
+    print(
+        f"{GAME} imports: "
+        + ", ".join(f"{name} {ms:.1f} ms" for name, ms in imports.items()),
+        file=sys.stderr,
+    )
+
+    latency = None
+    if args.net_calls > 0:
+        latency = min(
+            (net_latency(args.seed, args.net_calls) for _ in range(args.repeat)),
+            key=lambda r: r["compiled_us"],
+        )
+        print(
+            f"{GAME} network call: activate {latency['activate_us']:.2f} us, "
+            f"compiled {latency['compiled_us']:.2f} us, "
+            f"NumPy {latency['compiled_array_us']:.2f} us/row "
+            f"({latency['mean_nodes']:.1f} nodes)",
+            file=sys.stderr,
+        )
+
+    evolution = []
+    for k in args.action_repeats if args.generations > 0 else []:
+        run = evolve(load_config(), args.seed, args.generations, k)
+        print(
+            f"{GAME} training k {k:>2}: best fitness {max(run['best_fitness']):.1f} "
+            f"after {run['generations']} generations, "
+            f"{run['env_steps_per_s']:.1f} steps/s",
+            file=sys.stderr,
+        )
+        evolution.append(run)
+
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "cpus": multiprocessing.cpu_count(),
+        "frames": args.frames,
+        "seed": args.seed,
+        "import_ms": imports,
+        "net_latency": latency,
+        "results": results,
+        "evolution": evolution,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
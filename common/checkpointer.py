@@ -0,0 +1,124 @@
+import contextlib
+import glob
+import gzip
+import itertools
+import os
+import pickle
+import random
+import threading
+
+import neat
+
+
+@contextlib.contextmanager
+def node_ids_kept(config):
+    """Pickling a genome config takes an id off its node counter, to save
+    where it's at. Inside this, `config` may be pickled any number of times
+    (into a checkpoint, into every job of a pool) and the run still numbers
+    its new nodes as if it never had been."""
+    genome_config = config.genome_config
+    if getattr(genome_config, "node_indexer", None) is None:
+        yield  # nothing counted yet, and pickling doesn't start it
+        return
+    next_id = next(genome_config.node_indexer)
+    genome_config.node_indexer = itertools.count(next_id)
+    try:
+        yield
+    finally:
+        genome_config.node_indexer = itertools.count(next_id)
+
+
+class AsyncCheckpointer(neat.Checkpointer):
+    """neat.Checkpointer that writes in the background and keeps the last N.
+
+    The population is pickled right away (it gets changed by the next
+    generation), but compressing and writing the file happen on a thread, so
+    evaluation isn't held up. Files have the same format as neat.Checkpointer,
+    so neat.Checkpointer.restore_checkpoint() loads them.
+
+    Whatever `extra()` returns (the trainer's own state that a resumed run
+    needs back) is pickled right after NEAT's tuple in the same file, where
+    restore_checkpoint() doesn't look. restore_extra() reads it back.
+    """
+
+    def __init__(
+        self,
+        generation_interval,
+        time_interval_seconds=None,
+        filename_prefix="neat-checkpoint-",
+        keep=3,
+        extra=None,
+    ):
+        super().__init__(generation_interval, time_interval_seconds, filename_prefix)
+        self.keep = keep
+        self.extra = extra
+        self.thread = None
+
+        # Earlier runs' checkpoints count towards `keep` too
+        self.saved = sorted(
+            (
+                name
+                for name in glob.glob(glob.escape(filename_prefix) + "*")
+                if name[len(filename_prefix) :].isdigit()
+            ),
+            key=lambda name: int(name[len(filename_prefix) :]),
+        )
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        # This run and a run resumed from the file number new nodes the same
+        with node_ids_kept(config):
+            data = pickle.dumps(
+                (generation, config, population, species_set, random.getstate()),
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        if self.extra is not None:
+            data += pickle.dumps(self.extra(), protocol=pickle.HIGHEST_PROTOCOL)
+        filename = f"{self.filename_prefix}{generation}"
+
+        self.wait()  # one write at a time
+        self.thread = threading.Thread(
+            target=self._write, args=(filename, data), daemon=True
+        )
+        self.thread.start()
+
+    def __getstate__(self):
+        # The species set holds the reporters, so this object ends up inside
+        # its own checkpoints. A running thread can't be pickled, and `extra`
+        # may be a function of a __main__ that a later run doesn't have.
+        state = self.__dict__.copy()
+        state["thread"] = None
+        state["extra"] = None
+        return state
+
+    @staticmethod
+    def restore_extra(filename):
+        """What `extra()` returned when `filename` was saved, or None for a
+        checkpoint without it."""
+        with gzip.open(filename) as f:
+            pickle.load(f)  # NEAT's part, see restore_checkpoint()
+            try:
+                return pickle.load(f)
+            except EOFError:
+                return None
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _write(self, filename, data):
+        # Write next to the target and rename, so a crash mid-write never
+        # leaves a broken checkpoint behind
+        tmp = filename + ".tmp"
+        with gzip.open(tmp, "wb", compresslevel=5) as f:
+            f.write(data)
+        os.replace(tmp, filename)
+        print(f"Saved checkpoint {filename}")
+
+        if filename in self.saved:
+            self.saved.remove(filename)
+        self.saved.append(filename)
+        while self.keep and len(self.saved) > self.keep:
+            old = self.saved.pop(0)
+            if os.path.exists(old):
+                os.remove(old)
@@ -0,0 +1,209 @@
+"""A trained network on its own, without NEAT: the genome flattened into
+arrays in evaluation order, saved as a small versioned .npz, and a loader
+that only needs NumPy. The trainers save their champion's in the hall of
+fame's folder, named after its entry (HallOfFame.path_for()).
+
+    python ../common/compiled_net.py             # the hall of fame's best, from
+                                                 # a game's folder
+    python ../common/compiled_net.py --out winner.npz
+
+    net = CompiledNetwork.load("winner.npz")
+    net.activate(inputs)                         # like FeedForwardNetwork's
+
+Loading turns the arrays into straight-line Python (one assignment per node,
+weights as literals), so a single activate() call does no dict lookups. It
+sums every node's inputs with the builtin sum(), like NEAT's sum aggregation,
+so its outputs are FeedForwardNetwork's to the bit on any Python (3.12's sum()
+rounds differently from a chain of +). activate_array() runs the same program
+on a whole matrix of inputs with NumPy instead, to within rounding.
+
+The .npz holds, with node slots numbered inputs first, then every evaluated
+node in order:
+
+    format        version of this layout
+    num_inputs    input slots
+    activations   activation names, `act` indexes into them
+    act, bias, response         one per evaluated node
+    link_start    node i's links are link_start[i]:link_start[i + 1]
+    link_src, link_weight       source slot and weight of every link
+    outputs       slot of every output, -1 for one the genome doesn't reach
+    genome, fitness             where it came from
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+FORMAT = 1
+
+# What neat.activations computes, as source for the generated function and
+# as NumPy for activate_array()
+ACTIVATION_CODE = {
+    "sigmoid": "1.0 / (1.0 + exp(-max(-60.0, min(60.0, 5.0 * ({})))))",
+    "tanh": "tanh(max(-60.0, min(60.0, 2.5 * ({}))))",
+}
+ACTIVATIONS = {
+    "sigmoid": lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    "tanh": lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+}
+
+
+class CompiledNetwork:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.num_inputs = int(arrays["num_inputs"])
+        self.program = list(self.nodes())
+        self.activate = self._compile()
+
+    @staticmethod
+    def create(genome, config):
+        """Flattens `genome` the way FeedForwardNetwork.create evaluates it."""
+        import neat  # only exporting needs NEAT
+
+        gc = config.genome_config
+        net = neat.nn.FeedForwardNetwork.create(genome, config)
+        slot = {key: i for i, key in enumerate(gc.input_keys)}
+        names = sorted(ACTIVATIONS)
+        act, bias, response, link_start, link_src, link_weight = [], [], [], [0], [], []
+        for node, _, _, b, r, links in net.node_evals:
+            ng = genome.nodes[node]
+            if ng.aggregation != "sum":
+                raise ValueError(f"Unsupported aggregation: {ng.aggregation}")
+            if ng.activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {ng.activation}")
+            act.append(names.index(ng.activation))
+            bias.append(b)
+            response.append(r)
+            for src, w in links:
+                link_src.append(slot[src])
+                link_weight.append(w)
+            link_start.append(len(link_src))
+            slot[node] = len(slot)
+
+        return CompiledNetwork(
+            {
+                "format": np.array(FORMAT),
+                "num_inputs": np.array(len(gc.input_keys)),
+                "activations": np.array(names),
+                "act": np.array(act, dtype=np.int8),
+                "bias": np.array(bias, dtype=np.float64),
+                "response": np.array(response, dtype=np.float64),
+                "link_start": np.array(link_start, dtype=np.int32),
+                "link_src": np.array(link_src, dtype=np.int32),
+                "link_weight": np.array(link_weight, dtype=np.float64),
+                "outputs": np.array([slot.get(k, -1) for k in gc.output_keys]),
+                "genome": np.array(genome.key),
+                "fitness": np.array(
+                    np.nan if genome.fitness is None else genome.fitness
+                ),
+            }
+        )
+
+    @staticmethod
+    def load(path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = dict(data)
+        if int(arrays["format"]) != FORMAT:
+            raise ValueError(
+                f"{path} is network format {arrays['format']}, not {FORMAT}"
+            )
+        return CompiledNetwork(arrays)
+
+    def save(self, path):
+        with open(path, "wb") as f:  # np.savez would add ".npz" to any other name
+            np.savez(f, **self.arrays)
+
+    def nodes(self):
+        """(activation name, bias, response, source slots, weights) of every
+        evaluated node, in order."""
+        a = self.arrays
+        start = a["link_start"]
+        for i, code in enumerate(a["act"]):
+            links = slice(start[i], start[i + 1])
+            yield (
+                str(a["activations"][code]),
+                float(a["bias"][i]),
+                float(a["response"][i]),
+                a["link_src"][links].tolist(),
+                a["link_weight"][links].tolist(),
+            )
+
+    def _compile(self):
+        # Same sums as FeedForwardNetwork.activate: the builtin sum() of the
+        # products in link order. Not a chain of +, which Python 3.12's sum()
+        # (compensated) would round differently.
+        n = self.num_inputs
+        lines = ["def activate(inputs):"]
+        lines.append(f"    {''.join(f'v{i}, ' for i in range(n))}= inputs")
+        for i, (name, b, r, src, weights) in enumerate(self.program, n):
+            total = "".join(f"v{s} * {w!r}, " for s, w in zip(src, weights))
+            z = f"{b!r} + {r!r} * sum(({total}))"
+            lines.append(f"    v{i} = {ACTIVATION_CODE[name].format(z)}")
+        outputs = ", ".join(
+            f"v{s}" if s >= 0 else "0.0" for s in self.arrays["outputs"]
+        )
+        lines.append(f"    return [{outputs}]")
+
+        namespace = {"exp": math.exp, "tanh": math.tanh}
+        exec(compile("\n".join(lines), "<compiled network>", "exec"), namespace)
+        return namespace["activate"]
+
+    def activate_array(self, inputs):
+        """inputs: (rows, num_inputs). Returns (rows, num_outputs), equal to
+        activate() up to rounding: NumPy sums in an order of its own, and its
+        exp/tanh may differ in the last bit."""
+        inputs = np.asarray(inputs, dtype=np.float64)
+        n = self.num_inputs
+        values = np.zeros((len(inputs), n + len(self.arrays["act"]) + 1))
+        values[:, :n] = inputs
+        for i, (name, b, r, src, weights) in enumerate(self.program, n):
+            total = values[:, src] @ np.array(weights) if src else 0.0
+            values[:, i] = ACTIVATIONS[name](b + r * total)
+        # -1 picks the last column, which stays 0 like an unreached output
+        return values[:, self.arrays["outputs"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a hall of fame genome")
+    parser.add_argument(
+        "archive", nargs="?", default="hall_of_fame", help="the game's hall of fame"
+    )
+    parser.add_argument("--genome", type=int, help="its key (default: the fittest)")
+    parser.add_argument("--run", help="only look at this run's genomes")
+    parser.add_argument(
+        "--out", help="where to write it (default: in the archive, see path_for())"
+    )
+    parser.add_argument(
+        "--config", default="config.txt", help="the game's NEAT config (config.txt)"
+    )
+    args = parser.parse_args()
+
+    import neat
+    from hall_of_fame import HallOfFame, config_hash  # run as a script from here
+
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        args.config,
+    )
+    hall = HallOfFame(args.archive, config_hash(args.config))
+    where = {}
+    if args.genome is not None:
+        where["genome"] = args.genome
+    if args.run:
+        where["run"] = args.run
+    entry = hall.best(**where)
+    if entry is None:
+        raise SystemExit(
+            f"No such genome trained under {args.config} in {args.archive}"
+        )
+    out = args.out or hall.path_for(entry, ".npz")
+    CompiledNetwork.create(hall.load(entry, config), config).save(out)
+    print(f"Wrote {out} (genome {entry['genome']}, fitness {entry['fitness']})")
+
+
+if __name__ == "__main__":
+    main()
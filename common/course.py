@@ -0,0 +1,166 @@
+"""A world's obstacle course, materialized once and shared with the workers.
+
+The obstacles of a world don't depend on the players, only on its seed (or
+the snapshot it starts from). A game's course generator plays that out ahead:
+row i of the course is the i-th thing the world spawns, as `width` ints (a
+pipe's height, a group of cacti). The episodes take their obstacles from the
+rows instead of rolling them.
+
+    lock = worker_lock()                                    # before the pool
+    course = Course.create(lambda: PipeCourse(seed), lock)  # the trainer
+    jobs = [(genome, ..., course.name) for genome in genomes]
+    course = attach(name, lambda: PipeCourse(seed), lock)   # a worker
+    height = course.row(i)[0]
+    course.close()                                          # the trainer
+
+The rows live in a shared memory block, little-endian:
+
+    header    b"NEATCRSE", width, capacity, rows ready
+    rows      capacity x width int32s
+
+Workers read them in place, nothing is pickled per task but the block's
+name. The trainer fills the first rows; an episode that gets further extends
+the course under the pool's lock, for everyone after it. Past the block's
+capacity, or without a block at all (Course(make) on its own, the serial
+trainer), every process generates the rows it needs locally, which gives the
+same rows: a generator is deterministic.
+"""
+
+import contextlib
+import multiprocessing
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = b"NEATCRSE"
+HEADER = struct.Struct("<8sIIQ")
+READY = struct.Struct("<Q")
+READY_AT = 16  # offset of the rows ready in HEADER
+# Rows the trainer fills before the workers start, and that an extension adds
+CHUNK = 64
+CAPACITY = 4096
+
+
+class Course:
+    """The rows of the generator `make()` returns: an iterator of lists of
+    `width` ints, with the `rng` it rolls them from. `shm` is the shared
+    block, if any."""
+
+    def __init__(self, make, shm=None, lock=None):
+        self.make = make
+        self.generator = make()
+        self.made = 0  # rows self.generator has produced
+        self.width = self.generator.width
+        self.shm = shm
+        self.owner = False  # create() made the block, close() unlinks it
+        self.lock = lock or contextlib.nullcontext()
+        self.capacity = 0
+        if shm is not None:
+            magic, width, self.capacity, _ = HEADER.unpack_from(shm.buf)
+            if magic != MAGIC or width != self.width:
+                raise ValueError(f"{shm.name} is not a course of width {self.width}")
+            self.rows = np.ndarray(
+                (self.capacity, width), np.int32, shm.buf, offset=HEADER.size
+            )
+        self.local = []  # the rows past the capacity
+
+    @property
+    def name(self):
+        return None if self.shm is None else self.shm.name
+
+    @classmethod
+    def create(cls, make, lock=None, capacity=CAPACITY):
+        """A course in a new shared block, its first CHUNK rows filled. Just a
+        local one if there's no shared memory to be had."""
+        width = make().width
+        size = HEADER.size + capacity * width * 4
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=size)
+        except OSError:
+            return cls(make)
+        shm.buf[: HEADER.size] = HEADER.pack(MAGIC, width, capacity, 0)
+        course = cls(make, shm, lock)
+        course.owner = True
+        course.extend(min(CHUNK, capacity))
+        return course
+
+    def ready(self):
+        return READY.unpack_from(self.shm.buf, READY_AT)[0] if self.shm else 0
+
+    def _next(self):
+        self.made += 1
+        return next(self.generator)
+
+    def extend(self, rows):
+        """Makes sure at least `rows` rows (up to the capacity) are in the
+        block. Whoever gets there first writes them, the others just wait for
+        the lock and find them ready."""
+        with self.lock:
+            ready = self.ready()
+            if ready >= rows:
+                return
+            while self.made < ready:  # rows another process wrote
+                self._next()
+            end = min(max(rows, ready + CHUNK), self.capacity)
+            for i in range(ready, end):
+                self.rows[i] = self._next()
+            READY.pack_into(self.shm.buf, READY_AT, end)  # after the rows
+
+    def row(self, i):
+        """Row i, as a list of ints."""
+        if i < self.capacity:
+            if i >= self.ready():
+                self.extend(i + 1)
+            return self.rows[i].tolist()
+        while self.made < self.capacity:
+            self._next()
+        while len(self.local) <= i - self.capacity:
+            self.local.append(list(self._next()))
+        return self.local[i - self.capacity]
+
+    def rng_after(self, rows):
+        """A random stream where the generator's stands after `rows` rows, for
+        a snapshot of the world taken then."""
+        generator = self.make()
+        for _ in range(rows):
+            next(generator)
+        return generator.rng
+
+    def close(self):
+        """Unlinks the block too if this is the process that created it."""
+        if self.shm is None:
+            return
+        self.rows = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def worker_lock():
+    """The lock a pool's workers extend courses under, made before the pool.
+    Starts this process's resource tracker too, so that forked workers share
+    it (see attach()) instead of each starting one that knows nothing of the
+    trainer unlinking the blocks."""
+    resource_tracker.ensure_running()
+    return multiprocessing.Lock()
+
+
+# The course this worker process last attached to
+_attached = None
+
+
+def attach(name, make, lock=None):
+    """The course in the block `name`, mapped once per worker process for all
+    the episodes played on it. A local one if `name` is None."""
+    global _attached
+    if name is None:
+        return Course(make)
+    if _attached is not None and _attached.name == name:
+        return _attached
+    if _attached is not None:
+        _attached.close()
+    # Plain attach: pool workers share the trainer's resource tracker, and
+    # the trainer unlinks the block
+    _attached = Course(make, shared_memory.SharedMemory(name), lock)
+    return _attached
@@ -0,0 +1,297 @@
+"""A live view of a training run, drawn by a process of its own.
+
+The trainer doesn't draw. A shown generation publishes a small frame (the
+world as JSON, and the leading genome) into a ring of slots in shared memory,
+at most Publisher.FPS times a second, and carries on. Every game's
+dashboard.py runs main() from here: it maps the ring, draws the newest frame
+with the game's own drawing code and visualizer.draw_net(), and can come and
+go at any time. Closing its window only ends the viewer, training carries on.
+
+    python train_neat.py               # opens the dashboard by itself
+    python dashboard.py                # watch a run again after closing it
+
+The ring is a shared memory block named "neat-<game>", little-endian:
+
+    header    b"NEATRING", slots, slot size, frames published, closed flag,
+              the trainer's pid
+    slots     each a u64 sequence number, a u32 length and the frame bytes
+
+Frame N goes into slot N % slots. The writer makes the slot's sequence number
+odd, writes the frame and makes it even again (a seqlock): a reader copies the
+newest slot and keeps the copy only if the number was even and unchanged
+across it. Nobody ever waits for anybody, a reader the writer lapped
+mid-copy just tries again.
+"""
+
+import argparse
+import functools
+import json
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import neat
+import pygame
+
+from common.episode_log import draw_label
+from common.hall_of_fame import genome_from_dict, genome_to_dict
+
+MAGIC = b"NEATRING"
+HEADER = struct.Struct("<8sIIQII")
+FRAMES = struct.Struct("<Q")
+FRAMES_AT = 16  # offset of the frame count in HEADER
+CLOSED = struct.Struct("<I")
+CLOSED_AT = 24
+SLOT = struct.Struct("<QI")
+SLOTS = 4
+SLOT_SIZE = 1 << 18
+# A viewer that gets no new frame for this long maps the ring again, in case a
+# new run took the name over
+STALE_SECONDS = 5
+
+
+def ring_name(game):
+    return f"neat-{game}"
+
+
+# The rings this process created, and is the one to unlink
+_OWNED = set()
+
+
+def _untrack(shm):
+    if os.name == "posix":
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def _attach(name, track=False):
+    # Python registers every block a process maps with its resource tracker,
+    # which unlinks them all when the process ends. Only the owner may, so
+    # anyone else maps untracked (a block about to be unlinked is tracked).
+    if track or name in _OWNED:
+        return shared_memory.SharedMemory(name)
+    try:
+        return shared_memory.SharedMemory(name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        _untrack(shm)
+        return shm
+
+
+class FrameRing:
+    """The ring of frame slots in the shared memory block `shm`. create() it
+    in the trainer, attach() to it in a viewer."""
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.buf = shm.buf
+        self.owner = owner
+        magic, self.slots, self.slot_size, _, _, self.pid = HEADER.unpack_from(self.buf)
+        if magic != MAGIC:
+            raise ValueError(f"{shm.name} is not a frame ring")
+        self.frames = 0  # published so far, the writer's count
+
+    @classmethod
+    def create(cls, name, slots=SLOTS, slot_size=SLOT_SIZE):
+        size = HEADER.size + slots * (SLOT.size + slot_size)
+        try:
+            shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a run that was killed, or another run's: either
+            # way the newest run gets the name
+            stale = _attach(name, track=True)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name, create=True, size=size)
+        shm.buf[: HEADER.size] = HEADER.pack(MAGIC, slots, slot_size, 0, 0, os.getpid())
+        _OWNED.add(name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """The ring named `name`, None if there's none (yet)."""
+        try:
+            shm = _attach(name)
+        except FileNotFoundError:
+            return None
+        try:
+            return cls(shm)
+        except (ValueError, struct.error):  # still being set up
+            shm.close()
+            return None
+
+    def _slot(self, frame):
+        return HEADER.size + frame % self.slots * (SLOT.size + self.slot_size)
+
+    def write(self, data):
+        """Publishes `data` as the newest frame. False if it doesn't fit a slot."""
+        if len(data) > self.slot_size:
+            return False
+        buf = self.buf
+        at = self._slot(self.frames)
+        seq = FRAMES.unpack_from(buf, at)[0]
+        SLOT.pack_into(buf, at, seq + 1, len(data))  # odd: being written
+        buf[at + SLOT.size : at + SLOT.size + len(data)] = data
+        FRAMES.pack_into(buf, at, seq + 2)
+        self.frames += 1
+        FRAMES.pack_into(buf, FRAMES_AT, self.frames)
+        return True
+
+    def published(self):
+        return FRAMES.unpack_from(self.buf, FRAMES_AT)[0]
+
+    @property
+    def closed(self):
+        return CLOSED.unpack_from(self.buf, CLOSED_AT)[0] != 0
+
+    def latest(self, tries=10):
+        """(number, bytes) of the newest frame, None if there's none yet."""
+        buf = self.buf
+        for _ in range(tries):
+            frames = self.published()
+            if frames == 0:
+                return None
+            at = self._slot(frames - 1)
+            seq, length = SLOT.unpack_from(buf, at)
+            if seq % 2:
+                continue  # the writer is on it
+            length = min(length, self.slot_size)
+            data = bytes(buf[at + SLOT.size : at + SLOT.size + length])
+            if FRAMES.unpack_from(buf, at)[0] == seq:
+                return frames, data
+        return None
+
+    def close(self):
+        """The trainer's side: tells the viewers the run is over and removes
+        the block, unless a newer run has taken the name over meanwhile."""
+        self.buf = None
+        if not self.owner:
+            self.shm.close()
+            return
+        CLOSED.pack_into(self.shm.buf, CLOSED_AT, 1)
+        name = self.shm.name
+        self.shm.close()
+        current = FrameRing.attach(name)
+        if current is not None:
+            current.shm.close()
+        if current is not None and current.pid == self.pid:
+            self.shm.unlink()
+        else:
+            _untrack(self.shm)
+        _OWNED.discard(name)
+
+
+class Publisher:
+    """The trainer's end: due() says whether a frame would go out now, so the
+    trainer only builds the frames that do, publish() sends one."""
+
+    FPS = 60
+
+    def __init__(self, game):
+        self.ring = FrameRing.create(ring_name(game))
+        self.interval = 1 / self.FPS
+        self.next = 0
+        self.net = None, b""  # the leading genome, encoded once
+        self.too_big = False
+
+    def due(self):
+        return time.perf_counter() >= self.next
+
+    def publish(self, world, genome):
+        """Sends `world`, anything JSON can hold, with the leading `genome`."""
+        self.next = time.perf_counter() + self.interval
+        if self.net[0] is not genome:
+            self.net = genome, json.dumps(genome_to_dict(genome)).encode()
+        data = json.dumps(world).encode() + b"\n" + self.net[1]
+        if not self.ring.write(data) and not self.too_big:
+            self.too_big = True
+            print(
+                f"Dashboard frames of {len(data)} bytes don't fit its slots, "
+                "try fewer birds with --draw-top"
+            )
+
+    def close(self):
+        self.ring.close()
+
+
+class NullPublisher:
+    """Stands in for a Publisher when nothing is shown: no frame is ever due."""
+
+    def due(self):
+        return False
+
+    def publish(self, world, genome):
+        pass
+
+    def close(self):
+        pass
+
+
+@functools.cache
+def load_config(path):
+    return neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        path,
+    )
+
+
+def main(game, draw, size, config_path):
+    """The dashboard.py command line. draw(win, world, genome, config) draws
+    one frame: `world` as the trainer published it, `genome` the leading one,
+    built for the game's config.txt."""
+    parser = argparse.ArgumentParser(description=f"Watch a {game} training run")
+    parser.add_argument(
+        "--fps", type=int, default=Publisher.FPS, help="redraws per second"
+    )
+    args = parser.parse_args()
+    config = load_config(config_path)
+    name = ring_name(game)
+
+    pygame.init()
+    win = pygame.display.set_mode(size)
+    pygame.display.set_caption(f"Training: {game}")
+    clock = pygame.time.Clock()
+    ring = None
+    shown = genome = None
+    last_new = time.monotonic()
+
+    try:
+        while True:
+            clock.tick(args.fps)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return  # only the viewer goes, training carries on
+
+            if ring is None:
+                ring = FrameRing.attach(name)
+                if ring is None:
+                    win.fill((0, 0, 0))
+                    draw_label(win, f"Waiting for a {game} training run...", (10, 10))
+                    pygame.display.update()
+                    continue
+                shown, last_new = None, time.monotonic()
+            if ring.closed:
+                print("Training is over")
+                return
+
+            latest = ring.latest()
+            if latest is None or latest[0] == shown:
+                if time.monotonic() - last_new > STALE_SECONDS:
+                    ring.close()
+                    ring = None
+                continue
+            shown, data = latest
+            last_new = time.monotonic()
+            world, net = data.split(b"\n", 1)
+            net = json.loads(net)
+            if genome is None or genome.key != net["key"]:
+                genome = genome_from_dict(net, config)
+            draw(win, json.loads(world), genome, config)
+            pygame.display.update()
+    finally:
+        if ring is not None:
+            ring.close()
+        pygame.quit()
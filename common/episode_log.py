@@ -0,0 +1,264 @@
+"""Episodes as a course seed plus the action of every frame, in a small binary
+file, and the replayer that plays them back without a network.
+
+Every game's replay.py has the Episode classes to play a log through (one
+player in its world, a frame per step(action), by the rules of the loop that
+recorded it) and runs main() from here:
+
+    python replay.py winner.eplog                     # window, game speed
+    python replay.py winner.eplog --speed 16 --start 20000
+    python replay.py winner.eplog --sheet run.png     # offscreen, no window
+    python replay.py winner.eplog --check             # same result again?
+
+In the window SPACE pauses, LEFT/RIGHT seek a keyframe back or ahead and
+UP/DOWN double or halve the speed.
+
+File layout, little-endian:
+
+    8 bytes   b"NEATLOG\\0"
+    u16       format version
+    u8        bits per frame
+    u8        unused
+    u32       frames
+    u32       length of the JSON header
+    ...       JSON header: game, rules, seed and whatever the recorder added
+    ...       the actions, `bits` per frame, packed least significant bit first
+"""
+
+import argparse
+import functools
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+import pygame
+
+MAGIC = b"NEATLOG\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHBxII")
+# A keyframe every N frames, so a seek re-simulates at most N frames
+KEYFRAME_EVERY = 500
+# Thumbnails on a --sheet when there's no --every
+SHEET_THUMBS = 48
+
+
+class EpisodeLog:
+    """A recorded episode: the game, the loop whose rules it was played by
+    ("human" or "trainer"), the course seed and every frame's action, an int
+    of `bits` bits. Anything else (fitness, genome key, ...) goes into the
+    header as `meta`."""
+
+    def __init__(self, game, rules, seed, actions, bits, **meta):
+        self.game = game
+        self.rules = rules
+        self.seed = seed
+        self.actions = np.asarray(actions, dtype=np.uint8)
+        self.bits = bits
+        self.meta = meta
+
+    def __len__(self):
+        return len(self.actions)
+
+    def save(self, path):
+        header = {"game": self.game, "rules": self.rules, "seed": self.seed}
+        header = json.dumps({**header, **self.meta}).encode()
+        planes = (self.actions[:, None] >> np.arange(self.bits, dtype=np.uint8)) & 1
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.bits, len(self), len(header)))
+            f.write(header)
+            f.write(np.packbits(planes.ravel(), bitorder="little").tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, bits, frames, size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an episode log")
+        if version != VERSION:
+            raise ValueError(f"{path} is episode log version {version}, not {VERSION}")
+        meta = json.loads(data[HEADER.size : HEADER.size + size])
+        packed = np.frombuffer(data, np.uint8, offset=HEADER.size + size)
+        planes = np.unpackbits(packed, count=frames * bits, bitorder="little")
+        actions = planes.reshape(frames, bits) @ (1 << np.arange(bits))
+        game, rules, seed = meta.pop("game"), meta.pop("rules"), meta.pop("seed")
+        return cls(game, rules, seed, actions, bits, **meta)
+
+
+class Replay:
+    """Plays a log through an episode. The episode's get_state() is kept as a
+    keyframe every `keyframe_every` frames on the way, so seek() only
+    re-simulates from the nearest keyframe before the target."""
+
+    def __init__(self, log, episode, keyframe_every=KEYFRAME_EVERY):
+        self.log = log
+        self.episode = episode
+        self.every = keyframe_every
+        self.frame = 0  # frames played so far
+        self.alive = True
+        self.keyframes = [episode.get_state()]
+
+    def __len__(self):
+        return len(self.log)
+
+    def step(self):
+        """Plays the next frame. False once the log is over."""
+        if self.frame >= len(self.log):
+            return False
+        self.alive = self.episode.step(int(self.log.actions[self.frame]))
+        self.frame += 1
+        if self.frame == len(self.keyframes) * self.every:
+            self.keyframes.append(self.episode.get_state())
+        return True
+
+    def seek(self, frame):
+        frame = max(0, min(frame, len(self.log)))
+        nearest = min(frame // self.every, len(self.keyframes) - 1)
+        if not nearest * self.every <= self.frame <= frame:
+            self.episode.set_state(self.keyframes[nearest])
+            self.frame = nearest * self.every
+            self.alive = True
+        while self.frame < frame:
+            self.step()
+
+
+@functools.cache
+def label_font():
+    pygame.font.init()
+    return pygame.font.Font(None, 24)
+
+
+def draw_label(win, string, pos):
+    label = label_font().render(string, True, (255, 255, 255), (0, 0, 0))
+    win.blit(label, pos)
+
+
+def play(replay, size, fps, speed=1):
+    """Shows the replay in a window at `speed` frames per drawn frame."""
+    pygame.init()
+    win = pygame.display.set_mode(size)
+    pygame.display.set_caption(f"Replay: {replay.log.game}")
+    clock = pygame.time.Clock()
+    paused = False
+
+    while True:
+        clock.tick(fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_LEFT:
+                    replay.seek(replay.frame - replay.every)
+                elif event.key == pygame.K_RIGHT:
+                    replay.seek(replay.frame + replay.every)
+                elif event.key == pygame.K_UP:
+                    speed *= 2
+                elif event.key == pygame.K_DOWN:
+                    speed = max(1, speed // 2)
+
+        if not paused:
+            for _ in range(speed):
+                if not replay.step():
+                    break
+        replay.episode.draw(win)
+        status = f"frame {replay.frame}/{len(replay)}  x{speed}"
+        draw_label(win, status + ("  paused" if paused else ""), (10, size[1] - 24))
+        pygame.display.update()
+
+
+def offscreen(replay, size, every):
+    """Every `every`th frame and the last one, drawn without a window. Yields
+    (frame, surface), the surface is reused."""
+    surface = pygame.Surface(size)
+    replay.seek(0)
+    while True:
+        if replay.frame % every == 0 or replay.frame == len(replay):
+            replay.episode.draw(surface)
+            yield replay.frame, surface
+        if not replay.step():
+            return
+
+
+def contact_sheet(replay, size, path, every, columns=8, scale=0.25):
+    """Thumbnails of every `every`th frame in one image, for looking over a
+    long run at a glance."""
+    thumb = (int(size[0] * scale), int(size[1] * scale))
+    thumbs = []
+    for frame, surface in offscreen(replay, size, every):
+        small = pygame.transform.smoothscale(surface, thumb)
+        draw_label(small, str(frame), (2, 2))
+        thumbs.append(small)
+
+    rows = -(-len(thumbs) // columns)
+    sheet = pygame.Surface((thumb[0] * min(columns, len(thumbs)), thumb[1] * rows))
+    for i, small in enumerate(thumbs):
+        sheet.blit(small, (i % columns * thumb[0], i // columns * thumb[1]))
+    pygame.image.save(sheet, path)
+    return len(thumbs)
+
+
+def check(replay):
+    """Replays the whole log without drawing. True if the episode ends the
+    way it was recorded: over on the last frame (or cut there by a cap),
+    with the recorded fitness."""
+    replay.seek(0)
+    alive = []
+    while replay.step():
+        alive.append(replay.alive)
+    fitness = getattr(replay.episode, "fitness", None)
+    recorded = replay.log.meta.get("fitness")
+    print(f"{len(replay)} frames, fitness {fitness} (recorded {recorded})")
+    return all(alive[:-1]) and fitness == recorded
+
+
+def main(game, episodes, size):
+    """The replay.py command line. `episodes` maps the rules a log can be
+    recorded by to the Episode class that plays them."""
+    parser = argparse.ArgumentParser(description=f"Replay a recorded {game} episode")
+    parser.add_argument("log", help="episode log to play")
+    parser.add_argument(
+        "--speed", type=int, default=1, metavar="N", help="frames per drawn frame"
+    )
+    parser.add_argument("--start", type=int, default=0, metavar="FRAME")
+    parser.add_argument(
+        "--sheet", metavar="PNG", help="draw thumbnails into one image and exit"
+    )
+    parser.add_argument("--frames", metavar="DIR", help="save frames as PNGs and exit")
+    parser.add_argument(
+        "--every", type=int, metavar="N", help="--sheet/--frames: every Nth frame"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="replay without drawing, exit with 1 if it doesn't end as recorded",
+    )
+    args = parser.parse_args()
+
+    log = EpisodeLog.load(args.log)
+    if log.game != game:
+        parser.error(f"{args.log} is a {log.game} episode, not {game}")
+    if log.rules not in episodes:
+        parser.error(f"{args.log} was recorded by unknown rules: {log.rules}")
+    episode = episodes[log.rules]
+    replay = Replay(log, episode(log.seed))
+
+    if args.check:
+        sys.exit(0 if check(replay) else 1)
+    if args.sheet or args.frames:
+        every = args.every or max(1, len(log) // (SHEET_THUMBS - 1))
+        if args.sheet:
+            count = contact_sheet(replay, size, args.sheet, every)
+            print(f"{count} frames of {len(log)} on {args.sheet}")
+        else:
+            os.makedirs(args.frames, exist_ok=True)
+            for frame, surface in offscreen(replay, size, every):
+                name = os.path.join(args.frames, f"frame-{frame:07d}.png")
+                pygame.image.save(surface, name)
+        return
+    replay.seek(args.start)
+    play(replay, size, episode.FPS, max(1, args.speed))
@@ -0,0 +1,62 @@
+import hashlib
+from collections import OrderedDict
+
+
+def genome_hash(genome):
+    """Hash of everything that changes how a genome plays: its node genes and
+    its connection genes, weights included. The genome key is left out, so a
+    copy of an elite hashes the same as the original."""
+    h = hashlib.blake2b(digest_size=16)
+    for key in sorted(genome.nodes):
+        ng = genome.nodes[key]
+        h.update(
+            repr((key, ng.bias, ng.response, ng.activation, ng.aggregation)).encode()
+        )
+    for key in sorted(genome.connections):
+        cg = genome.connections[key]
+        h.update(repr((key, cg.weight, cg.enabled)).encode())
+    return h.hexdigest()
+
+
+class FitnessCache:
+    """LRU map from (genome hash, world seed) to fitness.
+
+    Only valid while episodes are deterministic for a seed, which they are:
+    every world runs on its own seeded random.Random.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def split(self, genomes, seed):
+        """Fills in the fitness of every genome already seen on this seed.
+
+        Returns the (genome_id, genome) pairs that still need simulating,
+        and their cache keys for store().
+        """
+        if self.maxsize <= 0:
+            return list(genomes), []
+
+        todo, keys = [], []
+        for genome_id, g in genomes:
+            key = (genome_hash(g), seed)
+            fitness = self.entries.get(key)
+            if fitness is None:
+                self.misses += 1
+                todo.append((genome_id, g))
+                keys.append(key)
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                g.fitness = fitness
+        return todo, keys
+
+    def store(self, genomes, keys):
+        for (_, g), key in zip(genomes, keys):
+            self.entries[key] = g.fitness
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
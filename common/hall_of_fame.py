@@ -0,0 +1,287 @@
+"""The fittest genomes of every training run, kept on disk without pickle.
+
+    hall = HallOfFame("hall_of_fame", config_hash("config.txt"))
+    hall.offer(genome, generation=12, seed=1012, level="GOD MODE")
+    hall.save()
+    entry = hall.best(level="GOD MODE")  # reads the index only
+    genome = hall.load(entry, config)
+
+A run keeps its `size` fittest genomes, or that many for every value of the
+`group` fields (pong keeps some for every level, so there's a best genome
+that got to GOD MODE even if the fittest ones never did). offer() copies the genome right away,
+so the archive holds it as it was evaluated, with its fitness, generation,
+world seed, the hash of the config it was trained under and whatever else the
+trainer passes along. Queries only look at the index, and load() reads the one
+line of the genome it wants.
+
+The archive is a folder with two JSON lines files:
+
+    index.jsonl    {"format": FORMAT} first, then one entry per archived
+                   genome: run, genome, fitness, generation, seed, config, the
+                   trainer's extra fields, and the offset and length of its
+                   line in genomes.jsonl
+    genomes.jsonl  one genome per line: key, fitness, and the attributes of
+                   every node and connection gene
+
+genomes.jsonl is only appended to. A genome pushed out of its run's top N
+leaves its line behind until compact() rewrites the file. What's made from an
+archived genome (the trainers' compiled champion) goes into the folder too,
+named after its entry: see path_for().
+
+The archive is local to a checkout (.gitignore). A game can ship genomes with
+the repository in a starter archive, the folder's name plus STARTER: an
+archive that doesn't exist yet starts out as a copy of it.
+
+    python ../common/hall_of_fame.py                    # from a game's folder
+    python ../common/hall_of_fame.py --where level="GOD MODE" --config config.txt
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+FORMAT = 1
+INDEX = "index.jsonl"
+GENOMES = "genomes.jsonl"
+STARTER = ".dist"  # hall_of_fame.dist/ for hall_of_fame/
+
+
+def config_hash(path):
+    """Fingerprint of a NEAT config file. A genome only loads into the config
+    it was trained under."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def genome_to_dict(genome):
+    def attributes(gene):
+        # What the gene has, like pickle would keep (older NEAT versions lack
+        # some of today's attributes)
+        return {k: v for k, v in vars(gene).items() if k != "key"}
+
+    return {
+        "key": genome.key,
+        "fitness": None if genome.fitness is None else float(genome.fitness),
+        "nodes": [[k, attributes(g)] for k, g in genome.nodes.items()],
+        "connections": [
+            [list(k), attributes(g)] for k, g in genome.connections.items()
+        ],
+    }
+
+
+def genome_from_dict(data, config):
+    def gene(cls, key, attributes):
+        # Built the way pickle builds it, so a gene comes back as it was saved
+        # whatever attributes today's constructor wants
+        gene = cls.__new__(cls)
+        gene.__dict__.update(attributes, key=key)
+        return gene
+
+    gc = config.genome_config
+    genome = config.genome_type(data["key"])
+    genome.fitness = data["fitness"]
+    for key, attributes in data["nodes"]:
+        genome.nodes[key] = gene(gc.node_gene_type, key, attributes)
+    for key, attributes in data["connections"]:
+        key = tuple(key)
+        genome.connections[key] = gene(gc.connection_gene_type, key, attributes)
+    return genome
+
+
+class HallOfFame:
+    """The archive in the folder `path`, for runs under the config with hash
+    `config` (None = any config, e.g. to browse it)."""
+
+    def __init__(self, path, config=None, size=10, group=(), run=None):
+        self.path = path
+        self.config = config
+        self.size = size
+        self.group = group
+        # Resuming from a checkpoint starts a run of its own
+        self.run = run or time.strftime("%Y%m%d-%H%M%S")
+        self._start(os.path.normpath(path) + STARTER)
+        self.entries = self.read_index()
+        self.changed = False
+
+    def _start(self, starter):
+        if os.path.exists(self.path) or not os.path.isdir(starter):
+            return
+        # Copied aside and renamed, so another run starting at the same time
+        # never sees half an archive
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        shutil.copytree(starter, tmp)
+        try:
+            os.rename(tmp, self.path)
+        except OSError:  # that other run was first
+            shutil.rmtree(tmp)
+
+    def read_index(self):
+        path = os.path.join(self.path, INDEX)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT:
+                raise ValueError(
+                    f"{path} is archive format {header.get('format')}, not {FORMAT}"
+                )
+            return [json.loads(line) for line in f]
+
+    def run_entries(self):
+        return [e for e in self.entries if e["run"] == self.run]
+
+    def offer(self, genome, generation, seed, **fields):
+        """Archives `genome` if it's among the run's `size` fittest so far in
+        its group (a genome already archived only again with a higher
+        fitness)."""
+        if genome.fitness is None:
+            return False
+        # The entries it competes with: the run's, with the same group fields
+        mine = [
+            e
+            for e in self.run_entries()
+            if all(e.get(k) == fields.get(k) for k in self.group)
+        ]
+        same = [e for e in mine if e["genome"] == genome.key]
+        if same:
+            if same[0]["fitness"] >= genome.fitness:
+                return False
+        elif len(mine) >= self.size and genome.fitness <= min(
+            e["fitness"] for e in mine
+        ):
+            return False
+
+        line = (json.dumps(genome_to_dict(genome)) + "\n").encode()
+        entry = {
+            "run": self.run,
+            "genome": genome.key,
+            "fitness": float(genome.fitness),
+            "generation": generation,
+            "seed": seed,
+            "config": self.config,
+            **fields,
+            "offset": self._append(line),
+            "length": len(line),
+        }
+        mine = [e for e in mine if e not in same] + [entry]
+        mine.sort(key=lambda e: e["fitness"], reverse=True)
+        self.entries = [e for e in self.entries if e not in mine + same]
+        self.entries += mine[: self.size]
+        self.changed = True
+        return True
+
+    def _append(self, line):
+        os.makedirs(self.path, exist_ok=True)
+        # O_APPEND: other runs may be writing to the same archive
+        fd = os.open(
+            os.path.join(self.path, GENOMES), os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        )
+        try:
+            os.write(fd, line)
+            return os.lseek(fd, 0, os.SEEK_CUR) - len(line)
+        finally:
+            os.close(fd)
+
+    def save(self):
+        """Writes the index if offer() changed it. Other runs' entries are read
+        again first, in case they were saved meanwhile."""
+        if not self.changed:
+            return
+        others = [e for e in self.read_index() if e["run"] != self.run]
+        self.entries = others + self.run_entries()
+        self._write_index()
+        self.changed = False
+
+    def _write_index(self):
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, INDEX)
+        with open(path + ".tmp", "w") as f:
+            f.write(json.dumps({"format": FORMAT}) + "\n")
+            for e in self.entries:
+                f.write(json.dumps(e) + "\n")
+        os.replace(path + ".tmp", path)  # readers never see half an index
+
+    def find(self, **where):
+        """Entries with every field equal to `where`'s, fittest first. Only
+        the ones for this config, unless `where` names another."""
+        if self.config is not None:
+            where.setdefault("config", self.config)
+        found = [
+            e for e in self.entries if all(e.get(k) == v for k, v in where.items())
+        ]
+        return sorted(found, key=lambda e: e["fitness"], reverse=True)
+
+    def best(self, **where):
+        found = self.find(**where)
+        return found[0] if found else None
+
+    def path_for(self, entry, extension):
+        """Where a file made from the genome of `entry` goes: in the archive's
+        folder, named after its run and key."""
+        name = f"{entry['run']}-genome-{entry['genome']}{extension}"
+        return os.path.join(self.path, name)
+
+    def load(self, entry, config):
+        """The genome of an index entry, built for `config`."""
+        with open(os.path.join(self.path, GENOMES), "rb") as f:
+            f.seek(entry["offset"])
+            return genome_from_dict(json.loads(f.read(entry["length"])), config)
+
+    def compact(self):
+        """Rewrites genomes.jsonl with only the indexed genomes. No run may be
+        writing to the archive meanwhile."""
+        path = os.path.join(self.path, GENOMES)
+        self.entries = self.read_index()
+        with open(path, "rb") as src, open(path + ".tmp", "wb") as dst:
+            for e in self.entries:
+                src.seek(e["offset"])
+                line = src.read(e["length"])
+                e["offset"] = dst.tell()
+                dst.write(line)
+        os.replace(path + ".tmp", path)
+        self._write_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List a hall of fame")
+    parser.add_argument("archive", nargs="?", default="hall_of_fame")
+    parser.add_argument("--config", help="only genomes trained under this config file")
+    parser.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        metavar="FIELD=VALUE",
+        help="only entries with this field (value as JSON, else as a string)",
+    )
+    parser.add_argument("--top", type=int, default=10, help="how many to list")
+    parser.add_argument(
+        "--compact", action="store_true", help="drop genomes no entry points to"
+    )
+    args = parser.parse_args()
+
+    hall = HallOfFame(args.archive, args.config and config_hash(args.config))
+    if args.compact:
+        hall.compact()
+    where = {}
+    for condition in args.where:
+        field, value = condition.split("=", 1)
+        try:
+            where[field] = json.loads(value)
+        except json.JSONDecodeError:
+            where[field] = value
+    for e in hall.find(**where)[: args.top]:
+        extra = {
+            k: v
+            for k, v in e.items()
+            if k not in ("run", "genome", "fitness", "offset", "length")
+        }
+        print(
+            f"{e['run']}  genome {e['genome']:>5}  fitness {e['fitness']:10.2f}  {extra}"
+        )
+
+
+if __name__ == "__main__":
+    main()
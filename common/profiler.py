@@ -0,0 +1,88 @@
+import json
+import time
+from collections import defaultdict
+
+import neat
+
+
+class Profiler(neat.reporting.BaseReporter):
+    """Where a generation's time goes, phase by phase.
+
+    The training loop calls lap(phase) at the end of each phase, and the time
+    since the previous lap gets added to that phase. Nothing falls between
+    two phases, so the phases add up to the whole evaluation. frame(alive) is
+    called once per simulated frame.
+
+    As a NEAT reporter it writes one JSON line per generation to `path` and
+    prints a short summary.
+    """
+
+    enabled = True
+
+    def __init__(self, path):
+        self.path = path
+        self.generation = None
+        self.reset()
+
+    def reset(self):
+        self.times = defaultdict(float)
+        self.frames = 0
+        self.alive = []  # [alive count, frames in a row with that count]
+        self.last = time.perf_counter()
+        self.started = self.evaluated = self.last
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.times[phase] += now - self.last
+        self.last = now
+
+    def frame(self, alive):
+        self.frames += 1
+        if self.alive and self.alive[-1][0] == alive:
+            self.alive[-1][1] += 1
+        else:
+            self.alive.append([alive, 1])
+
+    # ---- Reporter
+    def start_generation(self, generation):
+        self.generation = generation
+        self.reset()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.evaluated = time.perf_counter()
+
+    def end_generation(self, config, population, species_set):
+        total = time.perf_counter() - self.started
+        evaluate = self.evaluated - self.started
+        record = {
+            "generation": self.generation,
+            "total": total,
+            "evaluate": evaluate,
+            # speciation + reproduction
+            "neat": total - evaluate,
+            "phases": dict(self.times),
+            "frames": self.frames,
+            "alive": self.alive,
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+        timed = sum(self.times.values()) or 1.0
+        phases = ", ".join(
+            f"{name} {100 * t / timed:.0f}%"
+            for name, t in sorted(self.times.items(), key=lambda kv: -kv[1])
+        )
+        fps = self.frames / evaluate if evaluate > 0 else 0.0
+        print(f"Profile: {self.frames} frames ({fps:.0f}/s), {phases}")
+
+
+class NullProfiler:
+    """Stand-in when profiling is off: every call does nothing."""
+
+    enabled = False
+
+    def lap(self, phase):
+        pass
+
+    def frame(self, alive):
+        pass